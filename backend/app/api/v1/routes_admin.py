@@ -0,0 +1,54 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from app.core.config import get_settings
+from app.core.profiling import get_profile_store, to_collapsed, to_speedscope
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Admin routes need X-Admin-Token equal to PROFILING_ADMIN_TOKEN; no token, no access."""
+    token = get_settings().profiling_admin_token
+    if not token or x_admin_token is None or not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/admin/profiles")
+async def list_profiles_endpoint() -> dict:
+    """
+    Stored request profiles, newest first: id, method, path, status,
+    duration, trigger (header/sampled) and sample count.
+    """
+    return {"profiles": get_profile_store().list()}
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile_endpoint(
+    profile_id: str,
+    format: str = Query("speedscope", description="speedscope | collapsed"),
+) -> Response:
+    """
+    Download one profile as speedscope JSON (open at speedscope.app) or as
+    collapsed stacks for flamegraph.pl.
+    """
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=422, detail="format must be one of ['speedscope', 'collapsed']")
+    try:
+        profile = get_profile_store().load(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id!r}") from None
+
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(profile),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+        )
+    return JSONResponse(
+        to_speedscope(profile),
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+
+from app.core.chat_history import get_history_compactor
+from app.core.chat_sessions import get_chat_sessions
+from app.core.llm_cache import get_response_cache
+from app.core.llm_scheduler import get_llm_scheduler
+from app.core.model_routing import get_model_router
+from app.core.semantic_cache import get_semantic_cache
+from app.core.ollama_pool import get_worker_pool
+from app.core.singleflight import get_single_flight
+from app.core.startup import startup_timings
+from app.core.streaming import stream_timings
+from app.core.structured_output import structured_stats
+from app.services.checklist_templates import get_checklist_templates
+from app.services.financial_analysis_service import analysis_stats
+
+router = APIRouter()
+
+
+@router.get("/ai/stats")
+async def ai_stats_endpoint() -> dict:
+    """
+    Runtime statistics for the local model layer (scheduler queue depth and
+    wait times, per-task model routes and latencies, daemon health,
+    streaming time-to-first-token, response cache hits/misses, shared
+    in-flight generations, chat prompt sizes, server-side chat sessions,
+    semantic answer cache hit rate, /analyze_financials stage hit rates, structured-output success rates,
+    checklist template hits, startup phases and first-request times).
+    """
+    return {
+        "scheduler": get_llm_scheduler().stats(),
+        "model_routing": get_model_router().stats(),
+        "worker_pool": get_worker_pool().stats(),
+        "response_cache": get_response_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "chat_history": get_history_compactor().stats(),
+        "chat_sessions": get_chat_sessions().stats(),
+        "semantic_cache": get_semantic_cache().stats(),
+        "streams": stream_timings.stats(),
+        "analyze_financials": analysis_stats.stats(),
+        "structured_output": structured_stats.stats(),
+        "checklists": get_checklist_templates().stats(),
+        "startup": startup_timings.stats(),
+    }
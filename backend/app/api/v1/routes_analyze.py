@@ -1,29 +1,61 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
+from app.core.cancellation import cancel_on_disconnect
+from app.core.llm_scheduler import get_llm_scheduler
+from app.core.streaming import NDJSON_MEDIA_TYPE, ndjson_stream
 from app.models.financial import AnalyzeFinancialsRequest, AnalyzeFinancialsResponse
 from app.models.checklist import FilingChecklistRequest, FilingChecklistResponse
-from app.services.financial_analysis_service import analyze_financials
-from app.services.checklist_service import generate_filing_checklist
+from app.services.financial_analysis_service import analyze_financials, stream_analyze_financials
+from app.services.checklist_service import generate_filing_checklist, stream_filing_checklist
 
 router = APIRouter()
 
 
 @router.post("/analyze_financials", response_model=AnalyzeFinancialsResponse)
-async def analyze_financials_endpoint(payload: AnalyzeFinancialsRequest) -> AnalyzeFinancialsResponse:
+async def analyze_financials_endpoint(
+    payload: AnalyzeFinancialsRequest,
+    request: Request,
+) -> AnalyzeFinancialsResponse:
     """
     Analyze free-form user financial description using the AI layer.
     """
-    return analyze_financials(payload)
+    return await cancel_on_disconnect(request, analyze_financials(payload))
+
+
+@router.post("/analyze_financials/stream")
+async def analyze_financials_stream_endpoint(payload: AnalyzeFinancialsRequest) -> StreamingResponse:
+    """
+    Same as /analyze_financials, but streams NDJSON: one "structured" event
+    followed by the explanation as token events.
+    """
+    # Reject up-front: once streaming starts the status code is already 200
+    get_llm_scheduler().check_capacity()
+    return StreamingResponse(
+        ndjson_stream("analyze_financials", stream_analyze_financials(payload)),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
 
 
 @router.post("/filing_checklist", response_model=FilingChecklistResponse)
 async def filing_checklist_endpoint(
     payload: FilingChecklistRequest,
+    request: Request,
 ) -> FilingChecklistResponse:
     """
     Generate a step-by-step filing checklist based on the user's financial profile.
     """
-    return generate_filing_checklist(payload)
-
+    return await cancel_on_disconnect(request, generate_filing_checklist(payload))
 
 
+@router.post("/filing_checklist/stream")
+async def filing_checklist_stream_endpoint(payload: FilingChecklistRequest) -> StreamingResponse:
+    """
+    Same as /filing_checklist, but streams the checklist as NDJSON token events.
+    """
+    # Reject up-front: once streaming starts the status code is already 200
+    get_llm_scheduler().check_capacity()
+    return StreamingResponse(
+        ndjson_stream("filing_checklist", stream_filing_checklist(payload)),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -1,17 +1,73 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-from app.models.chat import ChatRequest, ChatResponse
-from app.services.chat_service import handle_chat
+from app.core.cancellation import cancel_on_disconnect
+from app.core.chat_sessions import get_chat_sessions
+from app.core.llm_scheduler import get_llm_scheduler
+from app.core.streaming import NDJSON_MEDIA_TYPE, ndjson_stream
+from app.models.chat import ChatRequest, ChatResponse, ChatSessionCreateRequest, ChatSessionResponse
+from app.services.chat_service import handle_chat, session_info, stream_chat, stream_session_chat
 
 router = APIRouter()
 
 
+def _check_session_payload(payload: ChatRequest) -> None:
+    if payload.session_id and payload.history:
+        raise HTTPException(
+            status_code=422, detail="history must be empty when session_id is set"
+        )
+
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
+async def chat_endpoint(payload: ChatRequest, request: Request) -> ChatResponse:
+    """
+    Simple chat interface to the AI assistant. Either send the full
+    `history` every turn, or a `session_id` from POST /chat/sessions and
+    only the new message.
+    """
+    _check_session_payload(payload)
+    return await cancel_on_disconnect(request, handle_chat(payload))
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest) -> StreamingResponse:
     """
-    Simple chat interface to the AI assistant.
+    Same as /chat, but streams the reply as NDJSON token events.
     """
-    return handle_chat(payload)
+    _check_session_payload(payload)
+    # Reject up-front: once streaming starts the status code is already 200
+    get_llm_scheduler().check_capacity()
+    if payload.session_id:
+        session = get_chat_sessions().get(payload.session_id)
+        events = stream_session_chat(session, payload.user_input)
+    else:
+        events = stream_chat(payload)
+    return StreamingResponse(ndjson_stream("chat", events), media_type=NDJSON_MEDIA_TYPE)
 
 
+@router.post("/chat/sessions", response_model=ChatSessionResponse, status_code=201)
+async def create_chat_session_endpoint(payload: ChatSessionCreateRequest) -> ChatSessionResponse:
+    """
+    Start a server-side chat session, optionally seeded with earlier turns.
+    Later turns send only the new message, and the model reuses the
+    conversation context it already holds instead of re-reading it.
+    """
+    session = get_chat_sessions().create([m.model_dump() for m in payload.history])
+    return session_info(session)
 
+
+@router.get("/chat/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_chat_session_endpoint(session_id: str) -> ChatSessionResponse:
+    """
+    The session's turns so far.
+    """
+    return session_info(get_chat_sessions().get(session_id))
+
+
+@router.delete("/chat/sessions/{session_id}", status_code=204)
+async def delete_chat_session_endpoint(session_id: str) -> Response:
+    """
+    End a session and free its stored context.
+    """
+    get_chat_sessions().delete(session_id)
+    return Response(status_code=204)
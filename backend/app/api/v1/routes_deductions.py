@@ -1,6 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
-from app.models.tax import DeductionSuggestionRequest, DeductionSuggestionResponse
+from app.core.cancellation import cancel_on_disconnect
+from app.models.tax import (
+    DeductionOptimizationRequest,
+    DeductionOptimizationResponse,
+    DeductionSuggestionRequest,
+    DeductionSuggestionResponse,
+)
+from app.services.deduction_optimizer import optimize_deductions
 from app.services.deduction_service import suggest_deductions
 
 router = APIRouter()
@@ -9,11 +16,21 @@ router = APIRouter()
 @router.post("/suggest_deductions", response_model=DeductionSuggestionResponse)
 async def suggest_deductions_endpoint(
     payload: DeductionSuggestionRequest,
+    request: Request,
 ) -> DeductionSuggestionResponse:
     """
     Suggest possible deductions based on the user's financial profile.
     """
-    return suggest_deductions(payload)
-
+    return await cancel_on_disconnect(request, suggest_deductions(payload))
 
 
+@router.post("/optimize_deductions", response_model=DeductionOptimizationResponse)
+async def optimize_deductions_endpoint(
+    payload: DeductionOptimizationRequest,
+) -> DeductionOptimizationResponse:
+    """
+    Tax-minimizing allocation of an optional budget across 80C, 80D,
+    80CCD(1B) and 24(b). Pure computation (no LLM), cheap enough to call
+    on every form change.
+    """
+    return optimize_deductions(payload.profile, payload.budget, payload.regime)
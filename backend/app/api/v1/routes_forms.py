@@ -1,9 +1,19 @@
-from fastapi import APIRouter
+import io
+import tempfile
+from typing import IO, Any, List
 
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.fast_routes import FastJSONRoute
 from app.models.financial import FinancialProfile
+from app.services.bulk_forms import FORMATS, stream_bulk_forms
 from app.services.form_service import autofill_form_fields
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 @router.post("/fill_form")
@@ -15,4 +25,81 @@ async def fill_form_endpoint(profile: FinancialProfile) -> dict:
     return {"fields": autofill_form_fields(profile)}
 
 
+_MEDIA_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+# Request bodies above this size are spooled to a temporary file
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Received chunks are collected up to this size per (threadpool) spool write
+_SPOOL_WRITE_BYTES = 1024 * 1024
+
+
+class _SpooledStreamingResponse(StreamingResponse):
+    """Closes the spooled upload once the response is over, however it ends."""
+
+    def __init__(self, content: Any, spool: IO[Any], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.spool = spool
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.spool.close()
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+
+
+async def _spool_body(request: Request, spool: IO[bytes], limit: int) -> None:
+    """Copy the request body into `spool` off the event loop, up to `limit` bytes."""
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise _too_large(limit)
+    received = 0
+    pending: List[bytes] = []
+    pending_bytes = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _too_large(limit)
+        pending.append(chunk)
+        pending_bytes += len(chunk)
+        if pending_bytes >= _SPOOL_WRITE_BYTES:
+            await run_in_threadpool(spool.write, b"".join(pending))
+            pending, pending_bytes = [], 0
+    if pending:
+        await run_in_threadpool(spool.write, b"".join(pending))
+
+
+@router.post("/fill_form/bulk")
+async def fill_form_bulk_endpoint(
+    request: Request,
+    output: str = Query("jsonl", description="Output format: jsonl | csv"),
+) -> StreamingResponse:
+    """
+    Stream auto-filled form fields and tax summaries for many profiles.
+    The body is JSONL (one FinancialProfile per line) or, with a text/csv
+    Content-Type, CSV with flat column names. The upload is spooled (to
+    disk when large), then rows are computed and streamed back in chunks.
+    Uploads over FILL_FORM_BULK_MAX_BYTES are rejected with 413.
+    """
+    if output not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"output must be one of {list(FORMATS)}")
+    input_format = "csv" if "csv" in request.headers.get("content-type", "") else "jsonl"
+
+    # The body has to be read before the response starts streaming
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    try:
+        await _spool_body(request, spool, get_settings().fill_form_bulk_max_bytes)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    except BaseException:
+        spool.close()
+        raise
+
+    async def body():
+        async for text in stream_bulk_forms(lines, input_format, output):
+            yield text
 
+    return _SpooledStreamingResponse(body(), lines, media_type=_MEDIA_TYPES[output])
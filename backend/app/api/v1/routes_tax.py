@@ -1,15 +1,17 @@
 from fastapi import APIRouter
 
-from app.models.tax import TaxComputationRequest, TaxComputationResponse
-from app.services.tax_logic import (
-    compute_tax_old_regime,
-    compute_tax_new_regime,
-    _apply_deduction_caps_old_regime,
-    _apply_deduction_caps_new_regime,
-    _compute_gross_total_income,
+from app.core.fast_routes import FastJSONRoute
+from app.models.tax import (
+    BatchTaxComputationRequest,
+    BatchTaxComputationResponse,
+    RegimeSweepRequest,
+    RegimeSweepResponse,
+    TaxComputationRequest,
+    TaxComputationResponse,
 )
+from app.services.tax_logic import compare_regimes
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 @router.post("/calculate_tax", response_model=TaxComputationResponse)
@@ -17,48 +19,34 @@ async def calculate_tax_endpoint(payload: TaxComputationRequest) -> TaxComputati
     """
     Compute tax for old/new regime for the given financial profile.
     """
-    profile = payload.profile
-    response = TaxComputationResponse()
-    warnings: list[str] = []
+    return compare_regimes(payload.profile, payload.regime)
 
-    # Run validation / cap logic once up-front for warnings
-    gross_total_income = _compute_gross_total_income(profile)
-    old_deductions, old_warnings = _apply_deduction_caps_old_regime(profile)
-    new_deductions, new_warnings = _apply_deduction_caps_new_regime(profile)
 
-    # Only attach warnings that are actually relevant to selected regimes
-    if payload.regime in (None, "old"):
-        warnings.extend(old_warnings)
-    if payload.regime in (None, "new"):
-        warnings.extend(new_warnings)
-
-    # Simple informational note about age band
-    if profile.age >= 60:
-        warnings.append(
-            "Senior/super-senior handling is included only at a high level in this demo. "
-            "Please cross-check slab and deduction rules before relying on these numbers."
-        )
-
-    if payload.regime in (None, "old"):
-        response.old_regime = compute_tax_old_regime(profile)
-    if payload.regime in (None, "new"):
-        response.new_regime = compute_tax_new_regime(profile)
-
-    if response.old_regime and response.new_regime:
-        response.recommended_regime = (
-            "old"
-            if response.old_regime.total_tax < response.new_regime.total_tax
-            else "new"
-        )
-        response.note = (
-            "Comparison based on simplified FY 2024-25 India income-tax rules "
-            f"for FY 2024-25. Gross total income considered: ₹{gross_total_income:.0f}. "
-            "This is an educational estimate, not legal or financial advice."
-        )
-
-    response.warnings = warnings
+@router.post("/calculate_tax/batch", response_model=BatchTaxComputationResponse)
+def calculate_tax_batch_endpoint(
+    payload: BatchTaxComputationRequest,
+) -> BatchTaxComputationResponse:
+    """
+    Compute old/new regime tax for many profiles in one vectorized pass.
+    A plain `def`, so parsing and computing a large batch run in the
+    threadpool instead of on the event loop.
+    """
+    # NumPy-backed; imported on first use (or by the startup warmup) so
+    # importing the app stays cheap
+    from app.services.tax_batch import compute_tax_for_profiles
 
-    return response
+    return BatchTaxComputationResponse(
+        results=compute_tax_for_profiles(payload.profiles, payload.regime)
+    )
 
 
+@router.post("/calculate_tax/sweep", response_model=RegimeSweepResponse)
+def calculate_tax_sweep_endpoint(payload: RegimeSweepRequest) -> RegimeSweepResponse:
+    """
+    What-if sweep: vary one or two fields over a grid and return both
+    regimes' total tax plus the exact old/new breakeven points along x.
+    Runs in the threadpool; the grid is capped at MAX_SWEEP_CELLS points.
+    """
+    from app.services.regime_sweep import sweep_regimes
 
+    return sweep_regimes(payload)
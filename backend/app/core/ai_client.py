@@ -1,91 +1,697 @@
 """
-Thin wrapper around local Ollama models.
+Thin async wrapper around local Ollama models.
 
-This module ensures we only ever talk to local, free models via the
-`ollama` Python package (preferred) or subprocess fallback.
+This module ensures we only ever talk to local, free models, either over
+the Ollama HTTP API through a pooled `httpx.AsyncClient` (preferred) or by
+shelling out to `ollama run` per call (legacy fallback, kept for latency
+comparisons). Generation never blocks the event loop, so other routes keep
+serving while a model is running, and every generation is admitted by the
+priority-aware `LLMScheduler`. Each call names its task (classify,
+explain, chat, checklist), which `app.core.model_routing` maps to a model,
+output limits and a latency budget. Completed generations are stored in a
+content-addressed response cache, so repeated prompts skip the model,
+and concurrent identical prompts share a single in-flight generation.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
-import subprocess
-from typing import Any, Dict, List
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 
+import httpx
+from pydantic import ValidationError
+
+from app.core import metrics
 from app.core.config import get_settings
+from app.core.llm_cache import get_response_cache, make_cache_key
+from app.core.llm_scheduler import Priority, SchedulerBusyError, get_llm_scheduler
+from app.core.model_routing import TaskRoute, get_model_router
+from app.core.ollama_pool import get_worker_pool
+from app.core.singleflight import get_single_flight
+from app.core.structured_output import JsonObjectScanner, structured_stats
 from app.core.prompts import (
     build_simple_explanation_prompt,
     build_classification_prompt,
+    build_json_repair_prompt,
     build_chat_prompt,
+    build_chat_turn_prompt,
+    build_history_summary_prompt,
 )
+from app.models.financial import FinancialClassification
+
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """
+    Shared, connection-pooled HTTP client for the Ollama API.
+    Created lazily so importing this module stays cheap.
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        settings = get_settings()
+        _HTTP_CLIENT = httpx.AsyncClient(
+            base_url=settings.ollama_host,
+            timeout=httpx.Timeout(settings.ollama_timeout, connect=settings.ollama_connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.ollama_max_connections,
+                max_keepalive_connections=settings.ollama_max_connections,
+            ),
+        )
+    return _HTTP_CLIENT
+
+
+async def close_http_client() -> None:
+    """Close the pooled client; called from the app lifespan on shutdown."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
+
+async def preload_model(model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load `model` into Ollama without generating anything (an empty prompt),
+    kept loaded for OLLAMA_KEEP_ALIVE. Also opens the pooled connection.
+    Returns Ollama's reply; `load_duration` is in nanoseconds.
+    """
+    payload = _generate_payload("", model or get_settings().ollama_model, False, None)
+    response = await _get_http_client().post("/api/generate", json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def _generate_payload(
+    prompt: str,
+    model: str,
+    stream: bool,
+    options: Optional[Dict[str, Any]],
+    output_format: Optional[Any] = None,
+    context: Optional[Sequence[int]] = None,
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "keep_alive": get_settings().ollama_keep_alive,
+    }
+    if options:
+        payload["options"] = options
+    if output_format is not None:
+        payload["format"] = output_format
+    if context:
+        payload["context"] = list(context)
+    return payload
+
+
+async def _ollama_generate_http(
+    prompt: str, model: str, options: Optional[Dict[str, Any]] = None
+) -> str:
+    data = await _post_generate(_generate_payload(prompt, model, False, options))
+    return data.get("response", "")
+
+
+async def _post_generate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Non-streaming /api/generate; returns Ollama's whole reply."""
+    try:
+        response = await _get_http_client().post("/api/generate", json=payload)
+        response.raise_for_status()
+    except httpx.TransportError as exc:
+        get_worker_pool().report_connection_failure()
+        raise RuntimeError(f"Ollama HTTP request failed: {exc!r}") from exc
+    except httpx.HTTPError as exc:
+        raise RuntimeError(f"Ollama HTTP request failed: {exc!r}") from exc
+    data = response.json()
+    metrics.record_ollama_eval(payload["model"], data)
+    return data
+
+
+class EmbeddingModelNotFoundError(RuntimeError):
+    """Ollama does not have the embedding model (not pulled)."""
+
+
+async def embed_text(text: str, model: Optional[str] = None) -> List[float]:
+    """Embedding of `text` from Ollama /api/embeddings (OLLAMA_EMBED_MODEL)."""
+    payload = {
+        "model": model or get_settings().ollama_embed_model,
+        "prompt": text,
+        "keep_alive": get_settings().ollama_keep_alive,
+    }
+    try:
+        response = await _get_http_client().post("/api/embeddings", json=payload)
+        response.raise_for_status()
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code == 404:
+            raise EmbeddingModelNotFoundError(
+                f"Ollama has no embedding model {payload['model']!r}"
+            ) from exc
+        raise RuntimeError(f"Ollama embedding request failed: {exc!r}") from exc
+    except httpx.HTTPError as exc:
+        raise RuntimeError(f"Ollama embedding request failed: {exc!r}") from exc
+    return response.json().get("embedding") or []
+
+
+async def _ollama_stream_http(
+    prompt: str,
+    model: str,
+    options: Optional[Dict[str, Any]] = None,
+    output_format: Optional[Any] = None,
+    context: Optional[Sequence[int]] = None,
+    final: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield response fragments from a streaming /api/generate call. The last
+    chunk (eval counts, `context`) is copied into `final` when given.
+    """
+    payload = _generate_payload(prompt, model, True, options, output_format, context)
+    try:
+        async with _get_http_client().stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama stream failed: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    metrics.record_ollama_eval(model, chunk)
+                    if final is not None:
+                        final.update(chunk)
+                    break
+    except httpx.TransportError as exc:
+        get_worker_pool().report_connection_failure()
+        raise RuntimeError(f"Ollama HTTP request failed: {exc!r}") from exc
+    except httpx.HTTPError as exc:
+        raise RuntimeError(f"Ollama HTTP request failed: {exc!r}") from exc
+
+
+async def _ollama_generate_json_http(
+    prompt: str, model: str, options: Optional[Dict[str, Any]], output_format: Any
+) -> str:
+    """
+    Format-constrained generation that stops reading as soon as the first
+    top-level JSON object closes; closing the stream makes Ollama abort
+    whatever the model would have generated after it.
+    """
+    scanner = JsonObjectScanner()
+    fragments = _ollama_stream_http(prompt, model, options, output_format)
+    try:
+        async for fragment in fragments:
+            if scanner.feed(fragment) is not None:
+                break
+    finally:
+        await fragments.aclose()
+    return scanner.text
+
+
+async def _ollama_generate_cli(prompt: str, model: str) -> str:
+    """Fallback: `ollama run <model>` (OLLAMA_BINARY) as a non-blocking subprocess."""
+    process = await asyncio.create_subprocess_exec(
+        get_settings().ollama_binary,
+        "run",
+        model,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await process.communicate(prompt.encode("utf-8"))
+    except BaseException:
+        # Timeout or client disconnect: don't leave the model process running
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        detail = stderr.decode("utf-8", errors="ignore")
+        raise RuntimeError(f"Ollama process failed with code {process.returncode}: {detail}")
+    return stdout.decode("utf-8", errors="ignore")
+
+
+def _failure_outcome(exc: BaseException) -> str:
+    """`llm_requests_total` outcome label for a failed or abandoned call."""
+    if isinstance(exc, SchedulerBusyError):
+        return "busy"
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    return "error"
+
 
-try:
-    import ollama  # type: ignore
+def _task_options(route: TaskRoute, options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The task's generation limits, overridden by per-call `options`."""
+    return {**route.options(), **(options or {})} or None
 
-    HAS_OLLAMA_PY = True
-except Exception:  # pragma: no cover - fallback path
-    HAS_OLLAMA_PY = False
 
+def _cache_key(
+    route: TaskRoute,
+    prompt: str,
+    options: Optional[Dict[str, Any]],
+    output_format: Optional[Any] = None,
+) -> str:
+    key_options = options
+    if output_format is not None:
+        key_options = {**(options or {}), "format": output_format}
+    return make_cache_key(route.model, prompt, key_options)
 
-def _ollama_generate(prompt: str) -> str:
+
+async def _ollama_generate(
+    prompt: str,
+    task: str = "explain",
+    timeout: Optional[float] = None,
+    options: Optional[Dict[str, Any]] = None,
+    priority: Priority = Priority.DEFAULT,
+    output_format: Optional[Any] = None,
+    final: Optional[Dict[str, Any]] = None,
+) -> str:
     """
     Internal helper that calls a local Ollama model and returns the raw text.
-    Prefers the Python package if installed; otherwise uses subprocess.
+    Uses the HTTP API unless OLLAMA_BACKEND=cli. The model and generation
+    limits come from `task`'s route. The whole generation,
+    including time queued in the scheduler at `priority`, is bounded by `timeout` (defaults
+    to OLLAMA_TIMEOUT) and is cancelled if the awaiting task is cancelled,
+    e.g. when the HTTP client disconnects. Identical concurrent prompts
+    (same cache key) await one shared generation. With `output_format`
+    ("json" or a JSON schema) the HTTP backend constrains the output and
+    returns only the first complete JSON object. The model that produced
+    the output is put in `final["model"]` when `final` is given.
     """
-    model = get_settings().ollama_model
+    settings = get_settings()
+    router = get_model_router()
+    route = router.route(task)
+    options = _task_options(route, options)
+    mode = "json" if output_format is not None else "plain"
+    if settings.ollama_backend == "cli":
+        mode = "cli"
+
+    cache_key = _cache_key(route, prompt, options, output_format)
+    if settings.llm_cache_enabled:
+        cached = await get_response_cache().get(cache_key)
+        if cached is not None:
+            metrics.llm_requests.inc(mode, "cache_hit")
+            if final is not None:
+                final["model"] = route.model
+            return cached
+
+    async def call(model: str) -> str:
+        if settings.ollama_backend == "cli":
+            return await _ollama_generate_cli(prompt, model)
+        if output_format is not None:
+            return await _ollama_generate_json_http(prompt, model, options, output_format)
+        return await _ollama_generate_http(prompt, model, options)
+
+    async def generation() -> Tuple[str, str]:
+        queued_at = time.perf_counter()
+        async with get_llm_scheduler().slot(priority):
+            metrics.llm_queue_wait.observe(time.perf_counter() - queued_at, priority.name.lower())
+            return await router.run(route, call)
 
-    if HAS_OLLAMA_PY:
-        response = ollama.generate(model=model, prompt=prompt)
-        return response.get("response", "")
+    async def generate_and_store() -> Tuple[str, str]:
+        metrics.llm_prompt_chars.observe(len(prompt), mode)
+        started = time.perf_counter()
+        try:
+            output, model = await asyncio.wait_for(generation(), timeout or settings.ollama_timeout)
+        except asyncio.TimeoutError as exc:
+            metrics.llm_requests.inc(mode, "timeout")
+            raise RuntimeError(
+                f"Ollama generation timed out after {timeout or settings.ollama_timeout:.0f}s"
+            ) from exc
+        except BaseException as exc:
+            metrics.llm_requests.inc(mode, _failure_outcome(exc))
+            raise
+        metrics.llm_latency.observe(time.perf_counter() - started, mode)
+        metrics.llm_requests.inc(mode, "ok")
+        if settings.llm_cache_enabled and model == route.model:
+            await get_response_cache().set(cache_key, output)
+        return output, model
 
-    # Subprocess fallback: `ollama run <model>`
-    result = subprocess.run(
-        ["ollama", "run", model],
-        input=prompt.encode("utf-8"),
-        capture_output=True,
-        check=False,
+    async def cached_by_other_worker() -> Optional[Tuple[str, str]]:
+        if not settings.llm_cache_enabled:
+            return None
+        cached = await get_response_cache().get(cache_key)
+        return (cached, route.model) if cached is not None else None
+
+    output, model = await get_single_flight().do(
+        cache_key, generate_and_store, cached_by_other_worker
     )
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"Ollama process failed with code {result.returncode}: {result.stderr.decode('utf-8', errors='ignore')}"
-        )
-    return result.stdout.decode("utf-8", errors="ignore")
+    if final is not None:
+        final["model"] = model
+    return output
 
 
-def generate_simple_explanation(text: str) -> str:
+async def _ollama_generate_stream(
+    prompt: str,
+    task: str = "explain",
+    options: Optional[Dict[str, Any]] = None,
+    priority: Priority = Priority.DEFAULT,
+    final: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of `_ollama_generate`: yields text fragments as
+    Ollama produces them. Each read is bounded by OLLAMA_TIMEOUT; closing
+    the iterator (e.g. on client disconnect) aborts the generation.
+    The cli backend cannot stream and yields the whole output at once.
+    A cached response is replayed as a single fragment, and a stream that
+    runs to completion on the task's primary model is added to the cache,
+    unless Ollama stopped it at the `num_predict` cap. The last chunk of a
+    live stream (`done_reason` etc.) is copied into `final` when given,
+    and `final["model"]` is the model that produced the output.
+    """
+    settings = get_settings()
+    router = get_model_router()
+    route = router.route(task)
+    options = _task_options(route, options)
+    mode = "cli" if settings.ollama_backend == "cli" else "stream"
+
+    cache_key = _cache_key(route, prompt, options)
+    if settings.llm_cache_enabled:
+        cached = await get_response_cache().get(cache_key)
+        if cached is not None:
+            metrics.llm_requests.inc(mode, "cache_hit")
+            if final is not None:
+                final["model"] = route.model
+            yield cached
+            return
+
+    async def cli_stream(model: str) -> AsyncIterator[str]:
+        yield await _ollama_generate_cli(prompt, model)
+
+    def open_stream(model: str) -> AsyncIterator[str]:
+        if settings.ollama_backend == "cli":
+            return cli_stream(model)
+        return _ollama_stream_http(prompt, model, options, final=done)
+
+    metrics.llm_prompt_chars.observe(len(prompt), mode)
+    done: Dict[str, Any] = {}
+    parts: List[str] = []
+    model = route.model
+    started = time.perf_counter()
+    try:
+        async with get_llm_scheduler().slot(priority):
+            metrics.llm_queue_wait.observe(time.perf_counter() - started, priority.name.lower())
+            async for model, fragment in router.stream(route, open_stream):
+                parts.append(fragment)
+                yield fragment
+    except BaseException as exc:
+        metrics.llm_requests.inc(mode, _failure_outcome(exc))
+        raise
+    metrics.llm_latency.observe(time.perf_counter() - started, mode)
+    metrics.llm_requests.inc(mode, "ok")
+    if final is not None:
+        final.update(done, model=model)
+
+    truncated = done.get("done_reason") == "length"
+    if settings.llm_cache_enabled and model == route.model and not truncated:
+        await get_response_cache().set(cache_key, "".join(parts))
+
+
+async def generate_simple_explanation(
+    text: str, priority: Priority = Priority.DEFAULT, task: str = "explain"
+) -> str:
     """
     Use the local model to explain complex tax terms or outputs in simple language.
     """
     prompt = build_simple_explanation_prompt(text)
-    return _ollama_generate(prompt).strip()
+    return (await _ollama_generate(prompt, task, priority=priority)).strip()
 
 
-def classify_financial_info(raw_input: str) -> Dict[str, Any]:
+async def cached_simple_explanation(text: str, task: str = "explain") -> Optional[str]:
     """
-    Ask the model to classify user financial information into structured JSON.
+    The cached `generate_simple_explanation` output for `text`, if any,
+    without generating. Lets callers skip regenerating an unchanged explanation.
     """
-    prompt = build_classification_prompt(raw_input)
-    output = _ollama_generate(prompt).strip()
+    settings = get_settings()
+    if not settings.llm_cache_enabled:
+        return None
+    route = get_model_router().route(task)
+    key = _cache_key(route, build_simple_explanation_prompt(text), _task_options(route, None))
+    cached = await get_response_cache().get(key)
+    return cached.strip() if cached is not None else None
+
+
+@lru_cache(maxsize=1)
+def _classification_format() -> Any:
+    """Ollama `format` value for classification: the output model's schema or plain JSON."""
+    if get_settings().ollama_structured_format == "json":
+        return "json"
+    return FinancialClassification.model_json_schema()
+
 
-    # Defensive parsing
+def _parse_classification(output: str) -> Optional[Dict[str, Any]]:
+    """First JSON object in `output`, validated against `FinancialClassification`."""
+    text = JsonObjectScanner().feed(output)
+    if text is None:
+        return None
     try:
-        data = json.loads(output)
-        if isinstance(data, dict):
-            return data
-    except json.JSONDecodeError:
-        # Fallback: wrap as a note
-        return {"notes": f"Model returned non-JSON classification: {output}"}
+        return FinancialClassification.model_validate_json(text).model_dump(exclude_none=True)
+    except ValidationError:
+        return None
+
+
+async def classify_financial_info(raw_input: str) -> Dict[str, Any]:
+    """
+    Ask the model to classify user financial information into structured JSON.
+    Generation is constrained to the `FinancialClassification` schema and
+    stops once the object is complete; malformed output gets one repair
+    attempt before falling back to a "notes" blob.
+    """
+    output_format = _classification_format()
+    output = await _ollama_generate(
+        build_classification_prompt(raw_input), "classify", output_format=output_format
+    )
+    attempts, output_chars = 1, len(output)
+    data = _parse_classification(output)
+    outcome = "ok"
 
-    return {"notes": f"Unexpected classification output: {output}"}
+    if data is None:
+        schema = json.dumps(FinancialClassification.model_json_schema())
+        repaired = await _ollama_generate(
+            build_json_repair_prompt(output, schema), "classify", output_format=output_format
+        )
+        attempts, output_chars = 2, output_chars + len(repaired)
+        data = _parse_classification(repaired)
+        outcome = "repaired" if data is not None else "failed"
+
+    structured_stats.record("classification", outcome, attempts, output_chars)
+    if data is None:
+        # Fallback: wrap as a note
+        return {"notes": f"Model returned non-JSON classification: {output.strip()}"}
+    return data
 
 
-def chat_with_assistant(history: List[Dict[str, Any]], user_input: str) -> str:
+async def chat_with_assistant(
+    history: List[Dict[str, Any]],
+    user_input: str,
+    summary: Optional[str] = None,
+    final: Optional[Dict[str, Any]] = None,
+) -> str:
     """
     Simple chat helper that uses our prompt-templating to generate responses.
     History format:
         [{"role": "user" | "assistant", "content": "..."}, ...]
+    `summary` replaces turns already compacted out of `history`; see
+    `_ollama_generate` for `final`.
+    """
+    prompt = build_chat_prompt(history, user_input, summary)
+    output = await _ollama_generate(prompt, "chat", priority=Priority.INTERACTIVE, final=final)
+    return output.strip()
+
+
+def stream_simple_explanation(
+    text: str,
+    priority: Priority = Priority.DEFAULT,
+    task: str = "explain",
+    final: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `generate_simple_explanation`; see
+    `_ollama_generate_stream` for `final`.
     """
-    prompt = build_chat_prompt(history, user_input)
-    return _ollama_generate(prompt).strip()
+    return _ollama_generate_stream(
+        build_simple_explanation_prompt(text), task, priority=priority, final=final
+    )
+
+
+def stream_chat_with_assistant(
+    history: List[Dict[str, Any]],
+    user_input: str,
+    summary: Optional[str] = None,
+    final: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `chat_with_assistant`.
+    """
+    return _ollama_generate_stream(
+        build_chat_prompt(history, user_input, summary),
+        "chat",
+        priority=Priority.INTERACTIVE,
+        final=final,
+    )
+
 
+@dataclass
+class ChatTurn:
+    """One chat session turn: the reply plus what the next turn needs."""
 
+    reply: str
+    prompt: str
+    model: str
+    # Ollama context after this turn (None on the cli backend)
+    context: Optional[List[int]]
+    reused_context: bool
+    # Prompt tokens Ollama actually evaluated (prompt_eval_count), if reported
+    prefill_tokens: Optional[int]
 
+
+def _session_prompt(
+    user_input: str,
+    model: str,
+    context: Optional[Sequence[int]],
+    context_model: Optional[str],
+    standalone_prompt: str,
+) -> Tuple[str, Optional[Sequence[int]]]:
+    """New message + context when `model` produced the context, else the full prompt."""
+    if context and model == context_model and get_settings().ollama_backend != "cli":
+        return build_chat_turn_prompt(user_input), context
+    return standalone_prompt, None
+
+
+async def chat_session_turn(
+    user_input: str,
+    context: Optional[Sequence[int]],
+    context_model: Optional[str],
+    standalone_prompt: str,
+) -> ChatTurn:
+    """
+    A chat session turn. When the model picked by the "chat" route is the one
+    that produced `context`, only the new message is sent with that context,
+    so Ollama prefills just the new tokens; otherwise `standalone_prompt`
+    (the whole conversation, compacted) is sent and a new context starts.
+    Session turns are never cached or shared: the context makes them unique.
+    """
+    settings = get_settings()
+    router = get_model_router()
+    route = router.route("chat")
+    options = _task_options(route, None)
+    mode = "cli" if settings.ollama_backend == "cli" else "session"
+
+    async def call(model: str) -> ChatTurn:
+        prompt, turn_context = _session_prompt(
+            user_input, model, context, context_model, standalone_prompt
+        )
+        metrics.llm_prompt_chars.observe(len(prompt), mode)
+        if settings.ollama_backend == "cli":
+            reply = await _ollama_generate_cli(prompt, model)
+            return ChatTurn(reply.strip(), prompt, model, None, False, None)
+        payload = _generate_payload(prompt, model, False, options, context=turn_context)
+        data = await _post_generate(payload)
+        return ChatTurn(
+            reply=data.get("response", "").strip(),
+            prompt=prompt,
+            model=model,
+            context=data.get("context"),
+            reused_context=turn_context is not None,
+            prefill_tokens=data.get("prompt_eval_count"),
+        )
+
+    async def generation() -> ChatTurn:
+        queued_at = time.perf_counter()
+        async with get_llm_scheduler().slot(Priority.INTERACTIVE):
+            metrics.llm_queue_wait.observe(
+                time.perf_counter() - queued_at, Priority.INTERACTIVE.name.lower()
+            )
+            turn, _model = await router.run(route, call)
+            return turn
+
+    started = time.perf_counter()
+    try:
+        turn = await asyncio.wait_for(generation(), settings.ollama_timeout)
+    except asyncio.TimeoutError as exc:
+        metrics.llm_requests.inc(mode, "timeout")
+        raise RuntimeError(
+            f"Ollama generation timed out after {settings.ollama_timeout:.0f}s"
+        ) from exc
+    except BaseException as exc:
+        metrics.llm_requests.inc(mode, _failure_outcome(exc))
+        raise
+    metrics.llm_latency.observe(time.perf_counter() - started, mode)
+    metrics.llm_requests.inc(mode, "ok")
+    return turn
+
+
+async def stream_chat_session_turn(
+    user_input: str,
+    context: Optional[Sequence[int]],
+    context_model: Optional[str],
+    standalone_prompt: str,
+) -> AsyncIterator[Union[str, ChatTurn]]:
+    """
+    Streaming `chat_session_turn`: yields text fragments, then the
+    completed `ChatTurn` as the last item.
+    """
+    settings = get_settings()
+    router = get_model_router()
+    route = router.route("chat")
+    options = _task_options(route, None)
+    mode = "cli" if settings.ollama_backend == "cli" else "session_stream"
+    sent: Dict[str, Tuple[str, Optional[Sequence[int]], Dict[str, Any]]] = {}
+
+    async def cli_stream(prompt: str, model: str) -> AsyncIterator[str]:
+        yield await _ollama_generate_cli(prompt, model)
+
+    def open_stream(model: str) -> AsyncIterator[str]:
+        prompt, turn_context = _session_prompt(
+            user_input, model, context, context_model, standalone_prompt
+        )
+        metrics.llm_prompt_chars.observe(len(prompt), mode)
+        final: Dict[str, Any] = {}
+        sent[model] = (prompt, turn_context, final)
+        if settings.ollama_backend == "cli":
+            return cli_stream(prompt, model)
+        return _ollama_stream_http(prompt, model, options, context=turn_context, final=final)
+
+    parts: List[str] = []
+    model = route.model
+    started = time.perf_counter()
+    try:
+        async with get_llm_scheduler().slot(Priority.INTERACTIVE):
+            metrics.llm_queue_wait.observe(
+                time.perf_counter() - started, Priority.INTERACTIVE.name.lower()
+            )
+            async for model, fragment in router.stream(route, open_stream):
+                parts.append(fragment)
+                yield fragment
+    except BaseException as exc:
+        metrics.llm_requests.inc(mode, _failure_outcome(exc))
+        raise
+    metrics.llm_latency.observe(time.perf_counter() - started, mode)
+    metrics.llm_requests.inc(mode, "ok")
+
+    prompt, turn_context, final = sent[model]
+    yield ChatTurn(
+        reply="".join(parts).strip(),
+        prompt=prompt,
+        model=model,
+        context=final.get("context"),
+        reused_context=turn_context is not None,
+        prefill_tokens=final.get("prompt_eval_count"),
+    )
+
+
+async def summarize_chat_history(
+    previous_summary: Optional[str],
+    turns: List[Dict[str, Any]],
+    max_words: int,
+) -> str:
+    """
+    Fold older chat turns into a rolling summary (see `app.core.chat_history`).
+    Runs at interactive priority since a chat turn is waiting on it.
+    """
+    prompt = build_history_summary_prompt(previous_summary, turns, max_words)
+    return (await _ollama_generate(prompt, "summarize", priority=Priority.INTERACTIVE)).strip()
@@ -0,0 +1,40 @@
+"""
+Helpers for tying long-running work to the lifetime of an HTTP request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+T = TypeVar("T")
+
+# nginx's "client closed request"; the response is never actually delivered
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def cancel_on_disconnect(
+    request: Request,
+    awaitable: Awaitable[T],
+    poll_interval: float = 0.25,
+) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    Used around LLM calls so an abandoned `/chat` or `/analyze_financials`
+    request stops its generation instead of running to completion.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _pending = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
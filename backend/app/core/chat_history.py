@@ -0,0 +1,195 @@
+"""
+Chat history compaction so prompt size stays bounded over long sessions.
+
+The last K turns are kept verbatim; older turns are folded into a rolling
+summary. Summaries are cached by a hash chain over the folded turns, so on
+the next request the previous summary is found and only the newly folded
+turns are summarized on top of it, instead of regenerating from scratch.
+The whole chat prompt is kept within a configurable token budget.
+Callers that keep history themselves (server-side sessions) can `fold` old
+turns into a summary and pass it back in as the summary of the turns
+before the history they still hold.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.ai_client import summarize_chat_history
+from app.core.config import get_settings
+from app.core.prompts import build_chat_prompt
+
+Summarizer = Callable[[Optional[str], List[Dict[str, Any]], int], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class CompactedHistory:
+    summary: Optional[str]
+    recent: List[Dict[str, Any]]
+    folded_turns: int
+    prompt_tokens: int
+
+
+class HistoryCompactor:
+    def __init__(
+        self,
+        summarize: Summarizer,
+        keep_last: int = 6,
+        token_budget: int = 3000,
+        summary_max_tokens: int = 300,
+        cache_size: int = 512,
+    ) -> None:
+        self.summarize = summarize
+        self.keep_last = max(0, keep_last)
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.cache_size = max(1, cache_size)
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+        self.requests = 0
+        self.summaries_generated = 0
+        self.summaries_reused = 0
+        self.prompt_tokens_sum = 0
+        self.prompt_tokens_max = 0
+        self.last_prompt_tokens = 0
+
+    def _kept_turns(
+        self, history: List[Dict[str, Any]], user_input: str, reserve: int, summarized: bool = False
+    ) -> int:
+        """
+        Length of the longest suffix of at most `keep_last` turns that fits the
+        budget, leaving `reserve` tokens for a summary whenever something is
+        dropped (always, if earlier turns are already `summarized`).
+        """
+        base_tokens = estimate_tokens(build_chat_prompt([], user_input))
+        turn_tokens = [estimate_tokens(self._render(turn)) + 1 for turn in history]
+        keep = min(self.keep_last, len(history))
+        while keep > 0:
+            needed = reserve if keep < len(history) or summarized else 0
+            if base_tokens + needed + sum(turn_tokens[len(history) - keep :]) <= self.token_budget:
+                break
+            keep -= 1
+        return keep
+
+    async def compact(
+        self, history: List[Dict[str, Any]], user_input: str, summary: Optional[str] = None
+    ) -> CompactedHistory:
+        """`summary`, if given, covers the turns before `history`."""
+        keep = self._kept_turns(history, user_input, self.summary_max_tokens, bool(summary))
+        older = history[: len(history) - keep]
+        recent = history[len(history) - keep :]
+        if older:
+            summary = await self._summary_for(older, summary)
+
+        prompt_tokens = estimate_tokens(build_chat_prompt(recent, user_input, summary))
+        if summary and prompt_tokens > self.token_budget:
+            overflow_chars = (prompt_tokens - self.token_budget) * 4
+            summary = summary[: max(0, len(summary) - overflow_chars)].rstrip() or None
+            prompt_tokens = estimate_tokens(build_chat_prompt(recent, user_input, summary))
+
+        self._record(prompt_tokens)
+        return CompactedHistory(
+            summary=summary,
+            recent=recent,
+            folded_turns=len(older),
+            prompt_tokens=prompt_tokens,
+        )
+
+    def truncate(
+        self, history: List[Dict[str, Any]], user_input: str, summary: Optional[str] = None
+    ) -> CompactedHistory:
+        """
+        Like `compact`, but older turns are dropped instead of summarized, so
+        the model is never called. For callers that cannot wait on a summary.
+        A given `summary` is kept as it is.
+        """
+        reserve = estimate_tokens(summary) if summary else 0
+        keep = self._kept_turns(history, user_input, reserve, bool(summary))
+        recent = history[len(history) - keep :]
+        prompt_tokens = estimate_tokens(build_chat_prompt(recent, user_input, summary))
+        return CompactedHistory(
+            summary=summary,
+            recent=recent,
+            folded_turns=len(history) - keep,
+            prompt_tokens=prompt_tokens,
+        )
+
+    @staticmethod
+    def _render(turn: Dict[str, Any]) -> str:
+        speaker = "User" if turn.get("role", "user") == "user" else "Assistant"
+        return f"{speaker}: {turn.get('content', '')}"
+
+    async def fold(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> Optional[str]:
+        """Rolling summary of `summary` followed by `turns`."""
+        return await self._summary_for(turns, summary) if turns else summary
+
+    async def _summary_for(self, turns: List[Dict[str, Any]], summary: Optional[str] = None) -> str:
+        # chain[i] identifies `summary` plus the first i + 1 turns
+        chain: List[str] = []
+        digest = hashlib.sha256(summary.encode("utf-8")).digest() if summary else b""
+        for turn in turns:
+            digest = hashlib.sha256(digest + self._render(turn).encode("utf-8")).digest()
+            chain.append(digest.hex())
+
+        start, previous = 0, summary
+        for i in range(len(chain), 0, -1):
+            cached = self._summaries.get(chain[i - 1])
+            if cached is not None:
+                self._summaries.move_to_end(chain[i - 1])
+                start, previous = i, cached
+                break
+
+        if start == len(turns) and previous is not None:
+            self.summaries_reused += 1
+            return previous
+
+        max_words = max(20, int(self.summary_max_tokens * 0.75))
+        summary = (await self.summarize(previous, turns[start:], max_words)).strip()
+        self.summaries_generated += 1
+        self._summaries[chain[-1]] = summary
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+        return summary
+
+    def _record(self, prompt_tokens: int) -> None:
+        self.requests += 1
+        self.prompt_tokens_sum += prompt_tokens
+        self.prompt_tokens_max = max(self.prompt_tokens_max, prompt_tokens)
+        self.last_prompt_tokens = prompt_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "token_budget": self.token_budget,
+            "keep_last_turns": self.keep_last,
+            "summaries_generated": self.summaries_generated,
+            "summaries_reused": self.summaries_reused,
+            "cached_summaries": len(self._summaries),
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens_sum / self.requests, 1)
+            if self.requests
+            else 0.0,
+            "max_prompt_tokens": self.prompt_tokens_max,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_history_compactor() -> HistoryCompactor:
+    settings = get_settings()
+    return HistoryCompactor(
+        summarize=summarize_chat_history,
+        keep_last=settings.chat_keep_last_turns,
+        token_budget=settings.chat_prompt_token_budget,
+        summary_max_tokens=settings.chat_summary_max_tokens,
+        cache_size=settings.chat_summary_cache_size,
+    )
@@ -0,0 +1,170 @@
+"""
+Server-side chat sessions.
+
+A stateless /chat request resends the whole history, and the model
+re-prefills the system preamble and every earlier turn on each call. A
+session instead keeps the turns on the server together with the `context`
+Ollama returned for the last generation (the conversation's tokens). The
+next turn sends only the new message plus that context, so Ollama can
+reuse its KV cache and prefill just the new tokens.
+
+The context is specific to the model that produced it. When a turn is
+served by another model (a latency fallback, a changed route) or the
+context grows past CHAT_PROMPT_TOKEN_BUDGET tokens, it is dropped and the
+next turn rebuilds a compacted prompt from the stored turns (see
+`app.core.chat_history`), which starts a fresh context.
+
+A session stores at most twice CHAT_KEEP_LAST_TURNS turns: once it
+reaches that, all but the last CHAT_KEEP_LAST_TURNS are folded into the
+session's rolling summary in the background after the turn.
+
+Sessions live in process memory: a bounded LRU of CHAT_SESSION_MAX_SESSIONS
+entries, each dropped after CHAT_SESSION_IDLE_SECONDS without a turn. With
+several workers a session only exists in the worker that created it, so
+run one worker or route by session id. A client whose session is gone
+gets 404 and can start a new one (seeded with its own copy of the
+history) or fall back to stateless /chat.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.config import get_settings
+
+
+class ChatSessionNotFoundError(KeyError):
+    """Unknown, deleted or idle-evicted chat session."""
+
+    def __str__(self) -> str:
+        return f"Chat session {self.args[0]!r} does not exist or has expired; start a new one."
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    # Rolling summary of the turns already trimmed from `history`
+    summary: Optional[str] = None
+    # Ollama `context` of the last turn and the model it belongs to; 4 bytes per token
+    context: Optional[array] = None
+    context_model: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.monotonic)
+    # One turn at a time: a turn reads and replaces `context`
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Background fold of old turns into `summary`, if one is pending
+    trim_task: Optional[asyncio.Task] = None
+
+    def set_context(self, context: Optional[Sequence[int]], model: str, max_tokens: int) -> None:
+        if context and len(context) <= max_tokens:
+            self.context, self.context_model = array("i", context), model
+        else:
+            self.context, self.context_model = None, None
+
+    def context_tokens(self) -> int:
+        return len(self.context) if self.context is not None else 0
+
+
+class ChatSessionStore:
+    """Bounded LRU of sessions with idle expiry, swept on every access."""
+
+    def __init__(self, max_sessions: int = 1000, idle_seconds: float = 1800.0) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.turns = 0
+        self.context_turns = 0
+        # [turns with a known prompt_eval_count, its sum] by "context" / "rebuilt"
+        self._prefill: Dict[str, List[int]] = {"context": [0, 0], "rebuilt": [0, 0]}
+
+    def _sweep(self, now: float) -> None:
+        # Oldest first, so stop at the first session that is still fresh
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self, history: Optional[List[Dict[str, Any]]] = None) -> ChatSession:
+        session = ChatSession(session_id=uuid.uuid4().hex, history=list(history or []))
+        with self._lock:
+            self._sweep(session.last_used)
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            self.created += 1
+        return session
+
+    def get(self, session_id: str) -> ChatSession:
+        """The session, marked as used; raises `ChatSessionNotFoundError`."""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise ChatSessionNotFoundError(session_id)
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                raise ChatSessionNotFoundError(session_id)
+
+    def record_turn(self, reused_context: bool, prefill_tokens: Optional[int]) -> None:
+        """`prefill_tokens` is Ollama's prompt_eval_count for the turn, when known."""
+        with self._lock:
+            self.turns += 1
+            self.context_turns += int(reused_context)
+            if prefill_tokens is not None:
+                entry = self._prefill["context" if reused_context else "rebuilt"]
+                entry[0] += 1
+                entry[1] += prefill_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep(time.monotonic())
+            active = len(self._sessions)
+            context_tokens = sum(s.context_tokens() for s in self._sessions.values())
+            prefill = {kind: list(entry) for kind, entry in self._prefill.items()}
+        return {
+            "active": active,
+            "max_sessions": self.max_sessions,
+            "idle_seconds": self.idle_seconds,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "turns": self.turns,
+            "context_reuse_rate": round(self.context_turns / self.turns, 4) if self.turns else 0.0,
+            "avg_prefill_tokens": {
+                kind: round(total / count, 1) if count else 0.0
+                for kind, (count, total) in prefill.items()
+            },
+            "context_tokens_held": context_tokens,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_chat_sessions() -> ChatSessionStore:
+    settings = get_settings()
+    return ChatSessionStore(
+        max_sessions=settings.chat_session_max_sessions,
+        idle_seconds=settings.chat_session_idle_seconds,
+    )
@@ -1,5 +1,7 @@
 import os
+import tempfile
 from functools import lru_cache
+from typing import Dict
 
 
 class Settings:
@@ -15,6 +17,193 @@ class Settings:
         self.app_host: str = os.getenv("APP_HOST", "0.0.0.0")
         self.app_port: int = int(os.getenv("APP_PORT", "8000"))
         self.ollama_model: str = os.getenv("OLLAMA_MODEL", "llama3")
+        self.ollama_host: str = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+        # "http" talks to the Ollama HTTP API; "cli" shells out to `ollama run`
+        self.ollama_backend: str = os.getenv("OLLAMA_BACKEND", "http")
+        # Total seconds allowed for one generation, and for opening a connection
+        self.ollama_timeout: float = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+        self.ollama_connect_timeout: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+        self.ollama_max_connections: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))
+        # Parallel model sessions served by the (managed) Ollama daemon
+        self.ollama_pool_size: int = int(os.getenv("OLLAMA_POOL_SIZE", "2"))
+        # Keep the model loaded between calls instead of reloading per request
+        self.ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        # Start and supervise a local `ollama serve` daemon if none is reachable
+        self.ollama_manage_daemon: bool = os.getenv("OLLAMA_MANAGE_DAEMON", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.ollama_binary: str = os.getenv("OLLAMA_BINARY", "ollama")
+        self.ollama_health_interval: float = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+        # Load the model into Ollama in the background at startup (HTTP backend only)
+        self.ollama_warmup_enabled: bool = os.getenv("OLLAMA_WARMUP_ENABLED", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
+        # Constrained classification output: "schema" sends the JSON schema as
+        # `format` (Ollama >= 0.5), "json" only requests plain JSON mode
+        self.ollama_structured_format: str = os.getenv("OLLAMA_STRUCTURED_FORMAT", "schema")
+
+        # LLM scheduler: concurrent generations (defaults to the pool size),
+        # bounded wait queue, and the Retry-After hint when the queue is full
+        self.llm_max_concurrency: int = int(
+            os.getenv("LLM_MAX_CONCURRENCY", str(self.ollama_pool_size))
+        )
+        self.llm_max_queue: int = int(os.getenv("LLM_MAX_QUEUE", "32"))
+        self.llm_retry_after_seconds: int = int(os.getenv("LLM_RETRY_AFTER_SECONDS", "5"))
+
+        # Per-task model routing (see app.core.model_routing): LLM_<TASK>_MODEL,
+        # _NUM_PREDICT, _NUM_CTX, _STOP, _LATENCY_BUDGET and _FALLBACK_MODEL for
+        # TASK in CLASSIFY, EXPLAIN, CHAT, SUMMARIZE, CHECKLIST; unset = the task default
+        self.llm_task_overrides: Dict[str, Dict[str, str]] = {
+            task: {
+                name: os.environ[f"LLM_{task.upper()}_{name.upper()}"]
+                for name in (
+                    "model",
+                    "num_predict",
+                    "num_ctx",
+                    "stop",
+                    "latency_budget",
+                    "fallback_model",
+                )
+                if f"LLM_{task.upper()}_{name.upper()}" in os.environ
+            }
+            for task in ("classify", "explain", "chat", "summarize", "checklist")
+        }
+        # Smaller model a task switches to when its primary exceeds the latency budget
+        self.llm_fallback_model: str = os.getenv("LLM_FALLBACK_MODEL", "")
+        # Seconds a task stays on its fallback before the primary is tried again
+        self.llm_fallback_cooldown: float = float(os.getenv("LLM_FALLBACK_COOLDOWN", "60"))
+
+        # Chat history compaction: recent turns kept verbatim, older ones summarized
+        self.chat_keep_last_turns: int = int(os.getenv("CHAT_KEEP_LAST_TURNS", "6"))
+        self.chat_prompt_token_budget: int = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "3000"))
+        self.chat_summary_max_tokens: int = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+        self.chat_summary_cache_size: int = int(os.getenv("CHAT_SUMMARY_CACHE_SIZE", "512"))
+        # Server-side chat sessions (see app.core.chat_sessions): how many are kept,
+        # and after how many idle seconds one is dropped
+        self.chat_session_max_sessions: int = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", "1000"))
+        self.chat_session_idle_seconds: float = float(
+            os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800")
+        )
+
+        # Semantic answer cache for chat questions asked without history
+        # (see app.core.semantic_cache); needs OLLAMA_EMBED_MODEL pulled
+        self.semantic_cache_enabled: bool = os.getenv(
+            "SEMANTIC_CACHE_ENABLED", "false"
+        ).lower() in ("1", "true", "yes")
+        self.ollama_embed_model: str = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+        # Minimum cosine similarity for a stored answer to be reused
+        self.semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.semantic_cache_max_entries: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+        # Empty keeps the vector index on the heap; otherwise a NumPy memmap file
+        self.semantic_cache_mmap_path: str = os.getenv("SEMANTIC_CACHE_MMAP_PATH", "")
+
+        # LLM response cache (in-memory LRU + optional shared sqlite file)
+        self.llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+        self.llm_cache_ttl_seconds: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+        # Empty disables the on-disk backend
+        self.llm_cache_db_path: str = os.getenv("LLM_CACHE_DB_PATH", "")
+        self.llm_cache_disk_max_entries: int = int(
+            os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000")
+        )
+        # Directory for cross-worker single-flight lock files; empty = in-process only.
+        # Requires LLM_CACHE_DB_PATH, where waiting workers find the result
+        self.llm_singleflight_lock_dir: str = os.getenv("LLM_SINGLEFLIGHT_LOCK_DIR", "")
+        # Seconds a worker waits for another worker's generation before running its own
+        self.llm_singleflight_lock_timeout: float = float(
+            os.getenv("LLM_SINGLEFLIGHT_LOCK_TIMEOUT", str(self.ollama_timeout))
+        )
+
+        # /analyze_financials: rule-based extraction first, LLM only below this confidence
+        self.analyze_fast_path_enabled: bool = os.getenv(
+            "ANALYZE_FAST_PATH_ENABLED", "true"
+        ).lower() in ("1", "true", "yes")
+        self.analyze_fast_path_min_confidence: float = float(
+            os.getenv("ANALYZE_FAST_PATH_MIN_CONFIDENCE", "0.8")
+        )
+
+        # Largest /fill_form/bulk upload accepted; bigger bodies get 413
+        self.fill_form_bulk_max_bytes: int = int(
+            os.getenv("FILL_FORM_BULK_MAX_BYTES", str(256 * 1024 * 1024))
+        )
+
+        # Validate/serialize hot JSON routes (/calculate_tax, /fill_form) with
+        # prebuilt pydantic TypeAdapters instead of FastAPI's generic handler
+        self.fast_json_routes_enabled: bool = os.getenv(
+            "FAST_JSON_ROUTES_ENABLED", "true"
+        ).lower() in ("1", "true", "yes")
+
+        # Preload tax rules, prime the engines/schemas and the Ollama client in
+        # the lifespan, so the first requests after a deploy are not slow
+        self.startup_warmup_enabled: bool = os.getenv(
+            "STARTUP_WARMUP_ENABLED", "true"
+        ).lower() in ("1", "true", "yes")
+
+        # Prometheus metrics on /metrics (HTTP middleware, LLM and tax-engine timings)
+        self.metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
+        # Opt-in per-request profiling (see app.core.profiling); off = no middleware
+        self.profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        # Requests carrying this header are profiled
+        self.profiling_header: str = os.getenv("PROFILING_HEADER", "X-Profile")
+        # Fraction of requests to the profiled routes that are profiled anyway
+        self.profiling_sample_rate: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+        # Comma-separated path prefixes eligible for profiling
+        self.profiling_routes: str = os.getenv(
+            "PROFILING_ROUTES", "/api/v1/calculate_tax,/api/v1/analyze_financials"
+        )
+        self.profiling_interval_ms: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+        self.profiling_dir: str = os.getenv(
+            "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "tax-assistant", "profiles")
+        )
+        self.profiling_max_profiles: int = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+        # Required with PROFILING_ENABLED: the profiling header value and X-Admin-Token on admin routes
+        self.profiling_admin_token: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+
+        # Filing checklist templates keyed by profile shape; empty path = memory only
+        self.checklist_template_db_path: str = os.getenv(
+            "CHECKLIST_TEMPLATE_DB_PATH",
+            os.path.join(tempfile.gettempdir(), "tax-assistant", "checklist_templates.sqlite3"),
+        )
+        # Templates kept in memory (LRU) in front of the sqlite file
+        self.checklist_template_memory_entries: int = int(
+            os.getenv("CHECKLIST_TEMPLATE_MEMORY_ENTRIES", "256")
+        )
+        # Pre-generate templates for the most common shapes at startup
+        self.checklist_warmup_enabled: bool = os.getenv(
+            "CHECKLIST_WARMUP_ENABLED", "true"
+        ).lower() in ("1", "true", "yes")
+        self.checklist_warmup_max_shapes: int = int(os.getenv("CHECKLIST_WARMUP_MAX_SHAPES", "30"))
+
+        # Tax rule registry: one JSON file per (jurisdiction, fy) under this dir
+        self.tax_rules_dir: str = os.getenv(
+            "TAX_RULES_DIR",
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"),
+        )
+        self.tax_default_jurisdiction: str = os.getenv("TAX_DEFAULT_JURISDICTION", "india")
+        self.tax_default_fy: str = os.getenv("TAX_DEFAULT_FY", "2024-25")
+        self.tax_rules_cache_size: int = int(os.getenv("TAX_RULES_CACHE_SIZE", "8"))
+        # Seconds between mtime checks of a cached rule file (hot reload)
+        self.tax_rules_check_interval: float = float(
+            os.getenv("TAX_RULES_CHECK_INTERVAL", "1.0")
+        )
 
 
 @lru_cache(maxsize=1)
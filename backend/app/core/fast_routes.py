@@ -0,0 +1,139 @@
+"""
+Leaner request/response path for hot JSON endpoints.
+
+FastAPI's default handler runs `json.loads` on the body, validates the
+resulting dict field by field through the dependency solver, then
+re-validates the returned model against a cloned response model and
+serializes it with `model_dump` + `json.dumps`. For the small, pure
+computations behind /calculate_tax and /fill_form, that overhead costs
+more than the tax maths itself.
+
+`FastJSONRoute` keeps the endpoint signatures (so the OpenAPI schema is
+unchanged). For routes whose only parameter is a single JSON body, it
+validates the raw bytes in one `TypeAdapter.validate_json` call and
+writes the result with `TypeAdapter.dump_json`. Both are prebuilt per
+route. Anything unusual goes through FastAPI's own handler, so behaviour
+and error responses stay the same: a non-JSON content type, a body that
+fails validation, or a route with query/path/header parameters,
+dependencies or custom response options.
+
+A plain `def` endpoint (CPU-heavy work such as the batch and sweep tax
+routes) has its validation, call and serialization run together in the
+threadpool, so a large body never blocks the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.message
+from typing import Any, Callable, Coroutine, Optional
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import get_settings
+
+Handler = Callable[[Request], Coroutine[Any, Any, Response]]
+
+
+def _is_json_content_type(value: Optional[str]) -> bool:
+    """Same rule FastAPI uses to decide whether to parse a body as JSON."""
+    if not value or value == "application/json":
+        return True
+    message = email.message.Message()
+    message["content-type"] = value
+    if message.get_content_maintype() != "application":
+        return False
+    subtype = message.get_content_subtype()
+    return subtype == "json" or subtype.endswith("+json")
+
+
+class FastJSONRoute(APIRoute):
+    """`APIRoute` with a direct validate_json / dump_json path (see module docstring)."""
+
+    def _fast_path_supported(self) -> bool:
+        dependant = self.dependant
+        return (
+            get_settings().fast_json_routes_enabled
+            and len(dependant.body_params) == 1
+            and not self._embed_body_fields
+            and dependant.body_params[0].required
+            and not (
+                dependant.path_params
+                or dependant.query_params
+                or dependant.header_params
+                or dependant.cookie_params
+                or dependant.dependencies
+            )
+            and dependant.request_param_name is None
+            and dependant.response_param_name is None
+            and dependant.background_tasks_param_name is None
+            and isinstance(self.response_class, DefaultPlaceholder)
+            and self.response_class.value is JSONResponse
+            and self.response_model_include is None
+            and self.response_model_exclude is None
+            and self.response_model_by_alias
+            and not (
+                self.response_model_exclude_unset
+                or self.response_model_exclude_defaults
+                or self.response_model_exclude_none
+            )
+        )
+
+    def get_route_handler(self) -> Handler:
+        default_handler = super().get_route_handler()
+        if not self._fast_path_supported():
+            return default_handler
+
+        body_param = self.dependant.body_params[0]
+        argument_name = body_param.name
+        request_adapter: TypeAdapter[Any] = TypeAdapter(body_param.field_info.annotation)
+        response_type = self.response_model
+        response_adapter: TypeAdapter[Any] = TypeAdapter(
+            response_type if response_type is not None else Any
+        )
+        exact_response_type = response_type if isinstance(response_type, type) else None
+        endpoint = self.endpoint
+        status_code = self.status_code or 200
+        is_coroutine = asyncio.iscoroutinefunction(endpoint)
+
+        def render(result: Any) -> Response:
+            if isinstance(result, Response):
+                return result
+            if exact_response_type is None or type(result) is not exact_response_type:
+                result = response_adapter.validate_python(result)
+            return Response(
+                content=response_adapter.dump_json(result),
+                status_code=status_code,
+                media_type="application/json",
+            )
+
+        def run_sync(body: bytes) -> Optional[Response]:
+            try:
+                payload = request_adapter.validate_json(body)
+            except ValidationError:
+                return None
+            return render(endpoint(**{argument_name: payload}))
+
+        async def handler(request: Request) -> Response:
+            if not _is_json_content_type(request.headers.get("content-type")):
+                return await default_handler(request)
+            body = await request.body()
+            if not is_coroutine:
+                response = await run_in_threadpool(run_sync, body)
+                # None: invalid body, answered by FastAPI's handler below
+                return response if response is not None else await default_handler(request)
+            try:
+                payload = request_adapter.validate_json(body)
+            except ValidationError:
+                # Empty/invalid JSON and field errors: let FastAPI build the
+                # usual 422 (the body is cached on the request)
+                return await default_handler(request)
+            return render(await endpoint(**{argument_name: payload}))
+
+        return handler
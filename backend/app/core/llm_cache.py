@@ -0,0 +1,201 @@
+"""
+Content-addressed cache for LLM responses.
+
+Entries are keyed on a hash of (model, normalized prompt, generation
+options). A bounded in-memory LRU with TTL sits in front of an optional
+sqlite file, which survives restarts and is shared by every uvicorn worker
+pointing at the same path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace runs so cosmetic differences share one entry."""
+    return " ".join(prompt.split())
+
+
+def make_cache_key(model: str, prompt: str, options: Optional[Mapping[str, Any]] = None) -> str:
+    material = json.dumps(
+        [model, normalize_prompt(prompt), dict(options or {})],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class _SqliteStore:
+    """
+    Shared on-disk entries. WAL mode lets several worker processes read
+    while one writes; rows beyond `max_entries` are evicted by last access.
+    """
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        # Bumped from worker threads; next() on a count is atomic
+        self._writes = itertools.count(1)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def set(self, key: str, value: str, expires_at: float, now: float) -> None:
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access)"
+            " VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, now),
+        )
+        if next(self._writes) % 64 == 0:
+            self._trim(conn, now)
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM llm_cache")
+
+    def _trim(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class ResponseCache:
+    """
+    In-memory LRU with TTL, optionally backed by a shared sqlite file.
+    Disk I/O runs in a worker thread so the event loop never blocks on it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        db_path: str = "",
+        disk_max_entries: int = 10000,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._disk = _SqliteStore(db_path, disk_max_entries) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._memory[key]
+            self.expirations += 1
+
+        if self._disk is not None:
+            found = await asyncio.to_thread(self._disk.get, key, now)
+            if found is not None:
+                self._remember(key, found[0], found[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return found[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, value, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, expires_at, now)
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    async def clear(self) -> None:
+        """Drop every entry, in memory and in the shared sqlite file."""
+        self._memory.clear()
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.clear)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_backend": self._disk.path if self._disk is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    settings = get_settings()
+    return ResponseCache(
+        max_entries=settings.llm_cache_max_entries,
+        ttl_seconds=settings.llm_cache_ttl_seconds,
+        db_path=settings.llm_cache_db_path,
+        disk_max_entries=settings.llm_cache_disk_max_entries,
+    )
@@ -0,0 +1,160 @@
+"""
+Bounded-concurrency scheduler in front of the local model.
+
+A local Ollama on CPU degrades badly past a couple of concurrent
+generations, so at most `concurrency` generations run at once. Further
+callers wait in a bounded priority queue: interactive chat turns are
+admitted before explanations, which go before long checklist generations
+(FIFO within a class). When the queue is full, callers fail fast with
+`SchedulerBusyError`, which the API maps to 503 + Retry-After.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from app.core.config import get_settings
+
+
+class Priority(IntEnum):
+    """Lower values are admitted first."""
+
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BATCH = 2
+
+
+class SchedulerBusyError(RuntimeError):
+    """The LLM wait queue is full; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("The assistant is busy right now. Please retry shortly.")
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    def __init__(self, concurrency: int = 2, max_queue: int = 32, retry_after: int = 5) -> None:
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.default_retry_after = retry_after
+
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._queued = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.total_run_seconds = 0.0
+        self._waits: Dict[str, Dict[str, float]] = {
+            p.name.lower(): {"admitted": 0, "wait_seconds_sum": 0.0, "max_wait_seconds": 0.0}
+            for p in Priority
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queued request would start, for Retry-After."""
+        if not self.completed:
+            return self.default_retry_after
+        avg_run = self.total_run_seconds / self.completed
+        return max(1, math.ceil(avg_run * (self._queued + 1) / self.concurrency))
+
+    def check_capacity(self) -> None:
+        """Raise `SchedulerBusyError` now if a new request could not be queued."""
+        if self._running >= self.concurrency and self._queued >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerBusyError(self.retry_after())
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self._running < self.concurrency and not self._queued:
+            self._running += 1
+            return
+        self.check_capacity()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (int(priority), next(self._seq), future))
+        self._queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as we were cancelled: hand it on
+                self._release()
+            else:
+                future.cancel()
+                self._queued -= 1
+            raise
+
+    def _release(self) -> None:
+        self._running -= 1
+        while self._heap:
+            _priority, _seq, future = heapq.heappop(self._heap)
+            if future.cancelled():
+                continue
+            self._queued -= 1
+            self._running += 1
+            future.set_result(None)
+            return
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.DEFAULT) -> AsyncIterator[None]:
+        """Hold one generation slot for the duration of the block."""
+        queued_at = time.perf_counter()
+        await self._acquire(priority)
+        started_at = time.perf_counter()
+
+        waits = self._waits[priority.name.lower()]
+        wait = started_at - queued_at
+        waits["admitted"] += 1
+        waits["wait_seconds_sum"] += wait
+        waits["max_wait_seconds"] = max(waits["max_wait_seconds"], wait)
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "queue_depth": self._queued,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_run_ms": round(self.total_run_seconds / self.completed * 1000, 2)
+            if self.completed
+            else 0.0,
+            "wait_by_priority": {
+                name: {
+                    "admitted": int(w["admitted"]),
+                    "avg_wait_ms": round(w["wait_seconds_sum"] / w["admitted"] * 1000, 2)
+                    if w["admitted"]
+                    else 0.0,
+                    "max_wait_ms": round(w["max_wait_seconds"] * 1000, 2),
+                }
+                for name, w in self._waits.items()
+            },
+        }
+
+
+@lru_cache(maxsize=1)
+def get_llm_scheduler() -> LLMScheduler:
+    settings = get_settings()
+    return LLMScheduler(
+        concurrency=settings.llm_max_concurrency,
+        max_queue=settings.llm_max_queue,
+        retry_after=settings.llm_retry_after_seconds,
+    )
@@ -0,0 +1,522 @@
+"""
+In-process metrics with Prometheus text exposition on /metrics.
+
+A small, dependency-free subset of the Prometheus client: counters,
+gauges and fixed-bucket histograms with positional label values. Hot
+paths resolve their label set to a series once (`labels(...)`) and keep
+it, so an observation is a bisect and two increments (under an
+uncontended lock unless the family is only updated from the event loop),
+cheap enough for the request path and the tax engine. Gauges can also be
+computed at scrape time from a callback (scheduler queue depth, cache
+size, ...).
+
+Recorded here:
+
+* HTTP: per-route request counts, latency histograms and in-flight
+  requests (`MetricsMiddleware`, labelled by route template, not raw path).
+* LLM: outcomes and failures, queue wait, end-to-end generation time,
+  prompt size, output tokens and tokens/sec (`app.core.ai_client`).
+* Tax engine: call counts and timings of the public entry points
+  (`timed_tax_call`).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+LabelValues = Tuple[str, ...]
+F = TypeVar("F", bound=Callable[..., Any])
+M = TypeVar("M", bound="_Metric")
+
+# Seconds; spans sub-ms compute routes up to multi-minute generations
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+# Seconds; tax engine calls take microseconds
+ENGINE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.1, 1.0,
+)
+SIZE_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Value:
+    """One counter/gauge series."""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock: Optional[threading.Lock]) -> None:
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if self._lock is None:
+            self.value += amount
+            return
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramSeries:
+    """One histogram series: per-bucket counts (last one is +Inf) and the sum."""
+
+    __slots__ = ("_lock", "_buckets", "counts", "sum")
+
+    def __init__(self, lock: Optional[threading.Lock], buckets: Tuple[float, ...]) -> None:
+        self._lock = lock
+        self._buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._buckets, value)
+        if self._lock is None:
+            self.counts[index] += 1
+            self.sum += value
+            return
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class _Metric:
+    """
+    A metric family. `labels(*values)` returns the series for one label
+    set; hot paths look it up once and keep it. Families only ever updated
+    from the event loop thread pass `event_loop_only=True` to skip the
+    per-update lock.
+    """
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        event_loop_only: bool = False,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._series_lock: Optional[threading.Lock] = None if event_loop_only else self._lock
+        self._series: Dict[LabelValues, Any] = {}
+
+    def _new_series(self) -> Any:
+        return _Value(self._series_lock)
+
+    def labels(self, *values: str) -> Any:
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _items(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return list(self._series.items())
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(series.value)}"
+            for labels, series in self._items()
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.labels(*labels).inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+        event_loop_only: bool = False,
+    ) -> None:
+        super().__init__(name, documentation, labels, event_loop_only)
+        self._callback = callback
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.labels(*labels).inc(amount)
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.labels(*labels).dec(amount)
+
+    def render(self) -> List[str]:
+        if self._callback is None:
+            return super().render()
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self._callback().items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        event_loop_only: bool = False,
+    ) -> None:
+        super().__init__(name, documentation, labels, event_loop_only)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self._series_lock, self.buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [
+                (labels, list(series.counts), series.sum) for labels, series in self._series.items()
+            ]
+        lines = self.header()
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(round(total, 9))}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# HTTP; only updated by MetricsMiddleware on the event loop thread
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route and status.",
+        ("method", "route", "status"),
+        event_loop_only=True,
+    )
+)
+http_latency = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time until the response body is fully sent, by route.",
+        ("method", "route"),
+        event_loop_only=True,
+    )
+)
+http_in_flight = registry.register(
+    Gauge(
+        "http_requests_in_flight",
+        "Requests currently being handled, by route.",
+        ("method", "route"),
+        event_loop_only=True,
+    )
+)
+
+# LLM
+llm_requests = registry.register(
+    Counter(
+        "llm_requests_total",
+        "Model calls by mode and outcome (ok, cache_hit, timeout, busy, error).",
+        ("mode", "outcome"),
+    )
+)
+llm_queue_wait = registry.register(
+    Histogram("llm_queue_wait_seconds", "Time waiting for a scheduler slot.", ("priority",))
+)
+llm_latency = registry.register(
+    Histogram(
+        "llm_generation_duration_seconds",
+        "Generation time including queue wait, excluding cache hits.",
+        ("mode",),
+    )
+)
+llm_prompt_chars = registry.register(
+    Histogram("llm_prompt_chars", "Prompt size in characters.", ("mode",), buckets=SIZE_BUCKETS)
+)
+llm_output_tokens = registry.register(
+    Histogram(
+        "llm_output_tokens",
+        "Tokens generated per call (Ollama eval_count).",
+        ("model",),
+        buckets=SIZE_BUCKETS,
+    )
+)
+llm_tokens_per_second = registry.register(
+    Histogram(
+        "llm_tokens_per_second",
+        "Decode speed reported by Ollama.",
+        ("model",),
+        buckets=RATE_BUCKETS,
+    )
+)
+llm_task_latency = registry.register(
+    Histogram(
+        "llm_task_duration_seconds",
+        "Generation time per routed task and the model that served it (excludes queueing).",
+        ("task", "model"),
+    )
+)
+llm_fallbacks = registry.register(
+    Counter(
+        "llm_fallbacks_total",
+        "Calls moved to the task's fallback model after exceeding the latency budget.",
+        ("task",),
+    )
+)
+
+semantic_cache_lookups = registry.register(
+    Counter(
+        "semantic_cache_lookups_total",
+        "Semantic chat cache lookups by outcome (hit, miss, error).",
+        ("outcome",),
+    )
+)
+
+
+def _scheduler_slots() -> Dict[LabelValues, float]:
+    from app.core.llm_scheduler import get_llm_scheduler
+
+    stats = get_llm_scheduler().stats()
+    return {("running",): stats["running"], ("queued",): stats["queue_depth"]}
+
+
+llm_scheduler_slots = registry.register(
+    Gauge(
+        "llm_scheduler_requests",
+        "Generations running and waiting in the scheduler.",
+        ("state",),
+        callback=_scheduler_slots,
+    )
+)
+
+
+def _startup_phases() -> Dict[LabelValues, float]:
+    from app.core.startup import startup_timings
+
+    phases_ms = dict(startup_timings.phases_ms)
+    if startup_timings.import_ms is not None:
+        phases_ms["import"] = startup_timings.import_ms
+    if "duration_ms" in startup_timings.model_warmup:
+        phases_ms["model_warmup"] = startup_timings.model_warmup["duration_ms"]
+    return {(name,): round(ms / 1000, 6) for name, ms in phases_ms.items()}
+
+
+def _first_requests() -> Dict[LabelValues, float]:
+    from app.core.startup import startup_timings
+
+    return {
+        tuple(key.split(" ", 1)): round(entry["duration_ms"] / 1000, 6)
+        for key, entry in startup_timings.first_requests.items()
+    }
+
+
+# Startup
+startup_phase_seconds = registry.register(
+    Gauge(
+        "app_startup_phase_seconds",
+        "Time spent in each startup phase (import, lifespan warmup steps, model load).",
+        ("phase",),
+        callback=_startup_phases,
+    )
+)
+first_request_seconds = registry.register(
+    Gauge(
+        "app_first_request_seconds",
+        "Duration of the first request to each path since startup.",
+        ("method", "path"),
+        callback=_first_requests,
+    )
+)
+
+# Tax engine
+tax_engine_latency = registry.register(
+    Histogram(
+        "tax_engine_duration_seconds",
+        "Tax engine entry point call times (the _count series is the call count).",
+        ("function",),
+        buckets=ENGINE_BUCKETS,
+    )
+)
+
+
+def record_ollama_eval(model: str, response: Dict[str, Any]) -> None:
+    """Output tokens and decode speed from an Ollama final response chunk."""
+    tokens = response.get("eval_count")
+    if not tokens:
+        return
+    llm_output_tokens.observe(tokens, model)
+    duration_ns = response.get("eval_duration")
+    if duration_ns:
+        llm_tokens_per_second.observe(tokens / (duration_ns / 1e9), model)
+
+
+def timed_tax_call(name: str) -> Callable[[F], F]:
+    """Decorator recording call count and duration under `function=name`."""
+
+    def decorator(fn: F) -> F:
+        if not get_settings().metrics_enabled:
+            return fn
+        series = tax_engine_latency.labels(name)
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - started)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class _RouteSeries:
+    """Metric series of one (method, route), resolved once per request path."""
+
+    __slots__ = ("method", "route", "latency", "in_flight", "statuses")
+
+    def __init__(self, method: str, route: str) -> None:
+        self.method = method
+        self.route = route
+        self.latency = http_latency.labels(method, route)
+        self.in_flight = http_in_flight.labels(method, route)
+        self.statuses: Dict[int, Any] = {}
+
+    def count(self, status: int) -> None:
+        series = self.statuses.get(status)
+        if series is None:
+            series = http_requests.labels(self.method, self.route, str(status))
+            self.statuses[status] = series
+        series.inc()
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(router: Router, scope: Scope) -> str:
+    """The path template of the route handling `scope`, e.g. "/chat/sessions/{session_id}"."""
+    template = UNMATCHED_ROUTE
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match == Match.PARTIAL and template == UNMATCHED_ROUTE:
+            template = getattr(route, "path", UNMATCHED_ROUTE)
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/queue overhead) that
+    records per-route latency, status counts and in-flight requests. The
+    route template and its series are resolved once per (method, path)
+    and cached.
+    """
+
+    def __init__(self, app: ASGIApp, router: Router, max_cached_paths: int = 2048) -> None:
+        self.app = app
+        self.router = router
+        self.max_cached_paths = max_cached_paths
+        self._series: Dict[Tuple[str, str], _RouteSeries] = {}
+
+    def _series_for(self, scope: Scope) -> _RouteSeries:
+        key = (scope["method"], scope["path"])
+        series = self._series.get(key)
+        if series is None:
+            series = _RouteSeries(key[0], route_template(self.router, scope))
+            if len(self._series) < self.max_cached_paths:
+                self._series[key] = series
+        return series
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        series = self._series_for(scope)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        series.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            series.latency.observe(time.perf_counter() - started)
+            series.count(status)
+            series.in_flight.dec()
+
+
+def render_metrics() -> str:
+    return registry.render()
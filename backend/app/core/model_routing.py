@@ -0,0 +1,278 @@
+"""
+Task-aware model routing.
+
+Each kind of generation ("task") gets its own model and generation limits
+instead of every call running OLLAMA_MODEL with no output cap:
+
+- classify:  short JSON classification in `classify_financial_info`
+- explain:   plain-language explanations of analyses and deductions
+- chat:      assistant turns
+- summarize: rolling chat-history summaries (no chat stop sequence, so a
+             summary mentioning "User:" is not cut short)
+- checklist: long filing checklist templates (batch priority)
+
+A task's `TaskRoute` carries the model, `num_predict` (output token cap),
+stop sequences, `num_ctx` (context window; 0 keeps the model's default)
+and a latency budget. Ollama reloads a model when `num_ctx` changes, so
+tasks sharing a model should use the same `num_ctx`.
+
+When a task has a fallback model and its primary model does not finish
+within the budget (for streams: does not produce a first fragment), the
+call is abandoned and retried on the fallback, and the task goes straight
+to the fallback for LLM_FALLBACK_COOLDOWN seconds before the primary is
+tried again. Budgets apply to time holding a scheduler slot, not to time
+queued. Outputs produced by a fallback are not cached by the caller, so
+the primary's answer is cached once it recovers.
+
+Defaults can be overridden per task with LLM_<TASK>_MODEL,
+LLM_<TASK>_NUM_PREDICT, LLM_<TASK>_NUM_CTX, LLM_<TASK>_STOP ("|"-separated,
+"\\n" for a newline), LLM_<TASK>_LATENCY_BUDGET (seconds, 0 = none) and
+LLM_<TASK>_FALLBACK_MODEL (default LLM_FALLBACK_MODEL).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from app.core import metrics
+from app.core.config import get_settings
+
+TASKS = ("classify", "explain", "chat", "summarize", "checklist")
+
+T = TypeVar("T")
+
+_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "classify": {"num_predict": 384, "num_ctx": 0, "stop": (), "latency_budget": 20.0},
+    "explain": {"num_predict": 512, "num_ctx": 0, "stop": (), "latency_budget": 30.0},
+    "chat": {"num_predict": 512, "num_ctx": 0, "stop": ("\nUser:",), "latency_budget": 20.0},
+    # Room for CHAT_SUMMARY_MAX_TOKENS (300) plus some slack; a chat turn waits on it
+    "summarize": {"num_predict": 400, "num_ctx": 0, "stop": (), "latency_budget": 20.0},
+    # Generated once per profile shape at batch priority; nobody waits on it interactively
+    "checklist": {"num_predict": 1024, "num_ctx": 0, "stop": (), "latency_budget": 0.0},
+}
+
+
+@dataclass(frozen=True)
+class TaskRoute:
+    task: str
+    model: str
+    num_predict: int = 0
+    num_ctx: int = 0
+    stop: Tuple[str, ...] = ()
+    latency_budget: float = 0.0
+    fallback_model: str = ""
+
+    def options(self) -> Dict[str, Any]:
+        """Ollama `options` for this task; unset limits are left to the model."""
+        options: Dict[str, Any] = {}
+        if self.num_predict > 0:
+            options["num_predict"] = self.num_predict
+        if self.num_ctx > 0:
+            options["num_ctx"] = self.num_ctx
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+    @property
+    def can_fall_back(self) -> bool:
+        return bool(self.fallback_model) and self.fallback_model != self.model and self.latency_budget > 0
+
+
+def _parse_stop(value: str) -> Tuple[str, ...]:
+    return tuple(s.replace("\\n", "\n") for s in value.split("|") if s)
+
+
+def build_routes(
+    default_model: str,
+    fallback_model: str = "",
+    overrides: Optional[Mapping[str, Mapping[str, str]]] = None,
+) -> Dict[str, TaskRoute]:
+    """Routes for every task from the defaults plus string overrides (env values)."""
+    routes = {}
+    for task in TASKS:
+        values = dict(_DEFAULTS[task])
+        raw = (overrides or {}).get(task, {})
+        if "num_predict" in raw:
+            values["num_predict"] = int(raw["num_predict"])
+        if "num_ctx" in raw:
+            values["num_ctx"] = int(raw["num_ctx"])
+        if "stop" in raw:
+            values["stop"] = _parse_stop(raw["stop"])
+        if "latency_budget" in raw:
+            values["latency_budget"] = float(raw["latency_budget"])
+        routes[task] = TaskRoute(
+            task=task,
+            model=raw.get("model") or default_model,
+            fallback_model=raw.get("fallback_model", fallback_model),
+            **values,
+        )
+    return routes
+
+
+@dataclass
+class _TaskStats:
+    requests: int = 0
+    over_budget: int = 0
+    fallbacks: int = 0
+    latencies: Dict[str, Deque[float]] = field(default_factory=dict)
+
+
+class ModelRouter:
+    """Picks the model for each task call and keeps per-task latency stats."""
+
+    def __init__(self, routes: Mapping[str, TaskRoute], fallback_cooldown: float = 60.0, window: int = 256) -> None:
+        self.routes = dict(routes)
+        self.fallback_cooldown = fallback_cooldown
+        self.window = window
+        self._fallback_until: Dict[str, float] = {}
+        self._stats: Dict[str, _TaskStats] = {task: _TaskStats() for task in self.routes}
+        self._lock = threading.Lock()
+
+    def route(self, task: str) -> TaskRoute:
+        try:
+            return self.routes[task]
+        except KeyError:
+            raise ValueError(f"Unknown LLM task {task!r}; expected one of {sorted(self.routes)}") from None
+
+    def models(self) -> List[str]:
+        """Distinct primary models, e.g. to preload at startup."""
+        return sorted({route.model for route in self.routes.values()})
+
+    def _cooling_down(self, route: TaskRoute) -> bool:
+        return time.monotonic() < self._fallback_until.get(route.task, 0.0)
+
+    def model_for(self, route: TaskRoute) -> str:
+        """The model the next call starts on: the fallback while cooling down."""
+        if route.can_fall_back and self._cooling_down(route):
+            return route.fallback_model
+        return route.model
+
+    def _observe(self, route: TaskRoute, model: str, seconds: float) -> None:
+        metrics.llm_task_latency.observe(seconds, route.task, model)
+        with self._lock:
+            stats = self._stats[route.task]
+            stats.requests += 1
+            if model == route.model and route.latency_budget > 0 and seconds > route.latency_budget:
+                stats.over_budget += 1
+            stats.latencies.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def _fell_back(self, route: TaskRoute) -> None:
+        metrics.llm_fallbacks.inc(route.task)
+        with self._lock:
+            self._stats[route.task].fallbacks += 1
+            self._stats[route.task].over_budget += 1
+            self._fallback_until[route.task] = time.monotonic() + self.fallback_cooldown
+
+    async def run(self, route: TaskRoute, call: Callable[[str], Awaitable[T]]) -> Tuple[T, str]:
+        """
+        `call(model)` on the task's primary model, or on its fallback when
+        the primary exceeds the latency budget or is cooling down.
+        Returns (output, model used).
+        """
+        model = self.model_for(route)
+        started = time.perf_counter()
+        if model == route.model and route.can_fall_back:
+            try:
+                output = await asyncio.wait_for(call(model), route.latency_budget)
+            except asyncio.TimeoutError:
+                self._fell_back(route)
+                model = route.fallback_model
+                started = time.perf_counter()
+                output = await call(model)
+        else:
+            output = await call(model)
+        self._observe(route, model, time.perf_counter() - started)
+        return output, model
+
+    async def stream(
+        self, route: TaskRoute, open_stream: Callable[[str], AsyncIterator[str]]
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Streaming `run`: yields (model, fragment). The budget bounds the
+        time to the primary's first fragment; later fragments are not timed.
+        """
+        model = self.model_for(route)
+        started = time.perf_counter()
+        fragments = open_stream(model)
+        try:
+            if model == route.model and route.can_fall_back:
+                try:
+                    first = await asyncio.wait_for(fragments.__anext__(), route.latency_budget)
+                except asyncio.TimeoutError:
+                    await fragments.aclose()
+                    self._fell_back(route)
+                    model = route.fallback_model
+                    started = time.perf_counter()
+                    fragments = open_stream(model)
+                except StopAsyncIteration:
+                    self._observe(route, model, time.perf_counter() - started)
+                    return
+                else:
+                    yield model, first
+            async for fragment in fragments:
+                yield model, fragment
+        finally:
+            await fragments.aclose()
+        self._observe(route, model, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {
+                task: (s.requests, s.over_budget, s.fallbacks, {m: list(v) for m, v in s.latencies.items()})
+                for task, s in self._stats.items()
+            }
+        result = {}
+        for task, (requests, over_budget, fallbacks, latencies) in snapshot.items():
+            route = self.routes[task]
+            result[task] = {
+                "model": route.model,
+                "fallback_model": route.fallback_model if route.can_fall_back else None,
+                "options": route.options(),
+                "latency_budget_s": route.latency_budget or None,
+                "fallback_active": route.can_fall_back and self._cooling_down(route),
+                "requests": requests,
+                "over_budget": over_budget,
+                "fallbacks": fallbacks,
+                "latency_ms": {model: _summary(values) for model, values in latencies.items()},
+            }
+        return result
+
+
+def _summary(seconds: List[float]) -> Dict[str, float]:
+    """Avg/p50/p95/max over the recent window, in milliseconds."""
+    ordered = sorted(seconds)
+    return {
+        "samples": len(ordered),
+        "avg": round(statistics.fmean(ordered) * 1000, 2),
+        "p50": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+@lru_cache(maxsize=1)
+def get_model_router() -> ModelRouter:
+    settings = get_settings()
+    return ModelRouter(
+        build_routes(settings.ollama_model, settings.llm_fallback_model, settings.llm_task_overrides),
+        fallback_cooldown=settings.llm_fallback_cooldown,
+    )
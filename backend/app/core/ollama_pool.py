@@ -0,0 +1,160 @@
+"""
+Managed pool of long-lived Ollama model sessions.
+
+Instead of forking `ollama run <model>` for every prompt, requests share a
+single long-lived Ollama daemon (optionally started and supervised here)
+serving a fixed number of parallel sessions. How many generations run at
+once, and who waits, is decided by `app.core.llm_scheduler`. The daemon is
+health-checked periodically and restarted if it crashes, and the model is
+kept loaded via `keep_alive`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaWorkerPool:
+    """
+    Handle on the daemon. A managed daemon is started with
+    OLLAMA_NUM_PARALLEL equal to the pool size, so every scheduler slot maps
+    to one parallel model session.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        host: str,
+        manage_daemon: bool = False,
+        health_interval: float = 10.0,
+        binary: str = "ollama",
+        keep_alive: str = "30m",
+    ) -> None:
+        self.size = max(1, size)
+        self.host = host
+        self.manage_daemon = manage_daemon
+        self.health_interval = health_interval
+        self.binary = binary
+        self.keep_alive = keep_alive
+
+        self._daemon: Optional[asyncio.subprocess.Process] = None
+        # Bound to the running loop, so created by start() and dropped by stop()
+        self._health_task: Optional[asyncio.Task] = None
+        self._check_now: Optional[asyncio.Event] = None
+
+        self.healthy = False
+        self.restarts = 0
+
+    async def start(self) -> None:
+        self._check_now = asyncio.Event()
+        self.healthy = await self._probe()
+        if not self.healthy and self.manage_daemon:
+            await self._spawn_daemon()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        self._check_now = None
+        if self._daemon is not None and self._daemon.returncode is None:
+            self._daemon.terminate()
+            try:
+                await asyncio.wait_for(self._daemon.wait(), 10)
+            except asyncio.TimeoutError:
+                self._daemon.kill()
+                await self._daemon.wait()
+        self._daemon = None
+
+    def report_connection_failure(self) -> None:
+        """Ask the health loop to re-check (and restart) the daemon right away."""
+        self.healthy = False
+        if self._check_now is not None:
+            self._check_now.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "healthy": self.healthy,
+            "managed_daemon": self._daemon is not None,
+            "restarts": self.restarts,
+        }
+
+    async def _probe(self) -> bool:
+        try:
+            async with httpx.AsyncClient(base_url=self.host, timeout=2.0) as client:
+                response = await client.get("/api/tags")
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def _spawn_daemon(self) -> None:
+        env = dict(os.environ)
+        env["OLLAMA_HOST"] = urlparse(self.host).netloc or self.host
+        env["OLLAMA_NUM_PARALLEL"] = str(self.size)
+        env["OLLAMA_KEEP_ALIVE"] = self.keep_alive
+        try:
+            self._daemon = await asyncio.create_subprocess_exec(
+                self.binary,
+                "serve",
+                env=env,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError as exc:
+            logger.error("Could not start `%s serve`: %s", self.binary, exc)
+            return
+        logger.info("Started Ollama daemon (pid %s) on %s", self._daemon.pid, env["OLLAMA_HOST"])
+        for _ in range(30):
+            if await self._probe():
+                self.healthy = True
+                return
+            await asyncio.sleep(0.5)
+
+    async def _health_loop(self) -> None:
+        check_now = self._check_now
+        assert check_now is not None
+        while True:
+            try:
+                await asyncio.wait_for(check_now.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                pass
+            check_now.clear()
+            self.healthy = await self._probe()
+            if self.healthy or not self.manage_daemon:
+                continue
+            if self._daemon is not None and self._daemon.returncode is None:
+                # Alive but unresponsive: replace it
+                self._daemon.kill()
+                await self._daemon.wait()
+            logger.warning("Ollama daemon unhealthy; restarting")
+            self.restarts += 1
+            await self._spawn_daemon()
+
+
+@lru_cache(maxsize=1)
+def get_worker_pool() -> OllamaWorkerPool:
+    settings = get_settings()
+    return OllamaWorkerPool(
+        size=settings.ollama_pool_size,
+        host=settings.ollama_host,
+        manage_daemon=settings.ollama_manage_daemon,
+        health_interval=settings.ollama_health_interval,
+        binary=settings.ollama_binary,
+        keep_alive=settings.ollama_keep_alive,
+    )
@@ -0,0 +1,356 @@
+"""
+Opt-in, per-request statistical profiling.
+
+With PROFILING_ENABLED=true, `ProfilingMiddleware` profiles a request to
+one of PROFILING_ROUTES when it carries the PROFILING_HEADER with
+PROFILING_ADMIN_TOKEN as its value (the app refuses to start with
+profiling enabled and no token), or when it is picked by
+PROFILING_SAMPLE_RATE. With profiling disabled the middleware is not
+installed at all, so normal requests pay nothing.
+
+A background thread samples the event loop thread every
+PROFILING_INTERVAL_MS. A sample is attributed to a profiled request when
+the loop is running one of the request's tasks; tasks the request spawns
+(e.g. `cancel_on_disconnect`, streaming bodies) are tracked through a
+context variable read by a task factory installed on first use. While the
+request is suspended, the sample records its await chain under an
+"[awaiting]" frame instead, so time spent waiting on the model shows up
+too. CPython only hands the GIL to the sampler every switch interval
+(5 ms by default), so very short requests may get few or no samples.
+
+Profiles are written to a bounded on-disk ring (PROFILING_DIR, newest
+PROFILING_MAX_PROFILES kept). They can be downloaded as speedscope JSON or
+as collapsed stacks for flamegraph.pl through the admin routes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+FrameKey = Tuple[str, str, int]
+
+_AWAITING: FrameKey = ("[awaiting]", "", 0)
+_PROFILE_ID = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+
+_current_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "profile_session", default=None
+)
+
+
+def _frame_key(frame: FrameType) -> FrameKey:
+    code = frame.f_code
+    return (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+
+
+def _await_chain(coro: Any) -> List[FrameType]:
+    """Frames of a suspended coroutine and everything it awaits, outermost first."""
+    frames: List[FrameType] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(
+            coro, "ag_frame", None
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(
+            coro, "ag_await", None
+        )
+    return frames
+
+
+class ProfileSession:
+    """Samples collected for one request."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task) -> None:
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.tasks: List[asyncio.Task] = [task]
+        self.samples: Counter = Counter()
+        self.started = time.perf_counter()
+
+    def sample(self, frames: Dict[int, FrameType]) -> None:
+        current = _running_task(self.loop)
+        if current is not None and current in self.tasks:
+            leaf = frames.get(self.loop_thread_id)
+            stack: List[FrameKey] = []
+            root = getattr(current.get_coro(), "cr_frame", None)
+            while leaf is not None:
+                stack.append(_frame_key(leaf))
+                if leaf is root:
+                    break
+                leaf = leaf.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+            return
+        # Suspended: the innermost pending task usually holds the interesting await
+        for task in reversed(self.tasks):
+            if not task.done():
+                chain = _await_chain(task.get_coro())
+                if chain:
+                    self.samples[(_AWAITING,) + tuple(_frame_key(f) for f in chain)] += 1
+                return
+
+
+def _running_task(loop: asyncio.AbstractEventLoop) -> Optional[asyncio.Task]:
+    current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+    return current_tasks.get(loop) if current_tasks is not None else None
+
+
+class _Sampler:
+    """One daemon thread sampling all active sessions; idle when there are none."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, session: ProfileSession) -> None:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._wake.clear()
+            if not sessions:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for session in sessions:
+                try:
+                    session.sample(frames)
+                except Exception:  # a racing task/frame change; drop this sample
+                    pass
+            del frames
+            time.sleep(self.interval)
+
+
+def _task_factory(previous: Any) -> Any:
+    """Wrap the loop's task factory so tasks spawned by a profiled request join its session."""
+
+    def factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+        session = _current_session.get()
+        if session is not None:
+            session.tasks.append(task)
+        return task
+
+    factory.profiling = True  # type: ignore[attr-defined]
+    return factory
+
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop) -> None:
+    previous = loop.get_task_factory()
+    if not getattr(previous, "profiling", False):
+        loop.set_task_factory(_task_factory(previous))
+
+
+def build_profile(session: ProfileSession, meta: Dict[str, Any], interval_ms: float) -> Dict[str, Any]:
+    """Stored form: shared frame table plus (stack of frame indexes, sample count) pairs."""
+    index: Dict[FrameKey, int] = {}
+    stacks: List[List[int]] = []
+    counts: List[int] = []
+    for stack, count in session.samples.most_common():
+        stacks.append([index.setdefault(key, len(index)) for key in stack])
+        counts.append(count)
+    return {
+        "meta": {**meta, "samples": sum(counts), "interval_ms": interval_ms},
+        "frames": [{"name": name, "file": file, "line": line} for name, file, line in index],
+        "stacks": stacks,
+        "counts": counts,
+    }
+
+
+def to_speedscope(profile: Dict[str, Any]) -> Dict[str, Any]:
+    meta = profile["meta"]
+    weights = [count * meta["interval_ms"] for count in profile["counts"]]
+    name = f"{meta['method']} {meta['path']} ({meta['duration_ms']:.1f} ms)"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "tax-assistant request profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": profile["frames"]},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": profile["stacks"],
+                "weights": weights,
+            }
+        ],
+    }
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """Brendan Gregg's collapsed format: "root;child;leaf count" per line."""
+    names = [
+        frame["name"] if not frame["file"] else f"{frame['name']} ({os.path.basename(frame['file'])})"
+        for frame in profile["frames"]
+    ]
+    return "".join(
+        ";".join(names[i] for i in stack) + f" {count}\n"
+        for stack, count in zip(profile["stacks"], profile["counts"])
+    )
+
+
+class ProfileStore:
+    """Bounded ring of profile files; the oldest are deleted past `max_profiles`."""
+
+    def __init__(self, directory: str, max_profiles: int) -> None:
+        self.directory = directory
+        self.max_profiles = max(1, max_profiles)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str) -> str:
+        if not _PROFILE_ID.match(profile_id):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _ids(self) -> List[str]:
+        return sorted(
+            name[:-5] for name in os.listdir(self.directory)
+            if name.endswith(".json") and _PROFILE_ID.match(name[:-5])
+        )
+
+    def save(self, profile_id: str, profile: Dict[str, Any]) -> None:
+        path = self._path(profile_id)
+        with open(path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(profile, handle)
+        os.replace(path + ".tmp", path)
+        for stale in self._ids()[: -self.max_profiles]:
+            try:
+                os.remove(self._path(stale))
+            except FileNotFoundError:
+                pass
+
+    def load(self, profile_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(profile_id), encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            raise KeyError(profile_id) from None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of stored profiles, newest first."""
+        entries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                entries.append({"id": profile_id, **self.load(profile_id)["meta"]})
+            except (KeyError, ValueError):
+                continue
+        return entries
+
+
+@lru_cache(maxsize=1)
+def get_profile_store() -> ProfileStore:
+    settings = get_settings()
+    return ProfileStore(settings.profiling_dir, settings.profiling_max_profiles)
+
+
+@lru_cache(maxsize=1)
+def _get_sampler() -> _Sampler:
+    return _Sampler(get_settings().profiling_interval_ms / 1000.0)
+
+
+class ProfilingMiddleware:
+    """Decides per request whether to profile it (see module docstring)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        settings = get_settings()
+        self.app = app
+        self.routes = tuple(r.strip() for r in settings.profiling_routes.split(",") if r.strip())
+        self.header = settings.profiling_header.lower().encode("latin-1")
+        self.token = settings.profiling_admin_token
+        self.sample_rate = settings.profiling_sample_rate
+        self.interval_ms = settings.profiling_interval_ms
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if not scope["path"].startswith(self.routes):
+            return None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                if not self.token or not secrets.compare_digest(value.decode("latin-1"), self.token):
+                    return None
+                return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        _install_task_factory(loop)
+        task = asyncio.current_task()
+        assert task is not None
+        session = ProfileSession(loop, task)
+        profile_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = _get_sampler()
+        token = _current_session.set(session)
+        sampler.add(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.remove(session)
+            _current_session.reset(token)
+            duration_ms = (time.perf_counter() - session.started) * 1000
+            if session.samples or trigger == "header":
+                meta = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "trigger": trigger,
+                    "duration_ms": round(duration_ms, 3),
+                    "created_at": time.time(),
+                }
+                profile = build_profile(session, meta, self.interval_ms)
+                await asyncio.to_thread(get_profile_store().save, profile_id, profile)
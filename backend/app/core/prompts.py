@@ -5,7 +5,7 @@ These templates are intentionally simple and transparent so you can
 update them easily for future tax years or jurisdictions.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 def build_simple_explanation_prompt(text: str) -> str:
@@ -31,10 +31,29 @@ def build_classification_prompt(raw_input: str) -> str:
     )
 
 
-def build_chat_prompt(history: List[Dict[str, Any]], user_input: str) -> str:
+def build_json_repair_prompt(broken_output: str, schema: str) -> str:
+    """
+    Ask the model to turn a malformed classification back into one valid
+    JSON object matching `schema`.
+    """
+    return (
+        "The following text was supposed to be a single JSON object matching this JSON schema, "
+        "but it is malformed or has extra text.\n"
+        "Return ONLY the corrected JSON object, keeping the original content where possible.\n\n"
+        f"SCHEMA:\n{schema}\n\n"
+        f"TEXT:\n{broken_output}\n"
+    )
+
+
+def build_chat_prompt(
+    history: List[Dict[str, Any]],
+    user_input: str,
+    summary: Optional[str] = None,
+) -> str:
     """
     Convert structured chat history into a single prompt string for models
-    that don't support native chat APIs.
+    that don't support native chat APIs. `summary` stands in for earlier
+    turns that were compacted out of `history`.
     """
     messages = [
         "You are an AI-powered personalized tax filing assistant for Indian taxpayers (FY 2024-25).",
@@ -45,6 +64,9 @@ def build_chat_prompt(history: List[Dict[str, Any]], user_input: str) -> str:
         "Conversation so far:",
     ]
 
+    if summary:
+        messages.append(f"(Summary of earlier conversation: {summary})")
+
     for turn in history:
         role = turn.get("role", "user")
         content = turn.get("content", "")
@@ -60,4 +82,32 @@ def build_chat_prompt(history: List[Dict[str, Any]], user_input: str) -> str:
     return "\n".join(messages)
 
 
+def build_chat_turn_prompt(user_input: str) -> str:
+    """
+    Continuation of a chat session whose earlier prompt and replies Ollama
+    already holds as `context`: only the new message is sent.
+    """
+    return f"User: {user_input}\nAssistant:"
 
+
+def build_history_summary_prompt(
+    previous_summary: Optional[str],
+    turns: List[Dict[str, Any]],
+    max_words: int,
+) -> str:
+    """
+    Fold older chat turns (plus any earlier summary) into a short summary
+    that replaces them in future chat prompts.
+    """
+    lines = [
+        "Summarize this conversation between a user and an Indian tax assistant (FY 2024-25).",
+        f"Use at most {max_words} words. Keep amounts, sections (80C, 80D, etc.), the user's "
+        "situation, decisions made and open questions. Output only the summary.",
+        "",
+    ]
+    if previous_summary:
+        lines.append(f"Earlier summary: {previous_summary}")
+    for turn in turns:
+        speaker = "User" if turn.get("role", "user") == "user" else "Assistant"
+        lines.append(f"{speaker}: {turn.get('content', '')}")
+    return "\n".join(lines)
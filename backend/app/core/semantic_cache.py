@@ -0,0 +1,247 @@
+"""
+Semantic answer cache for standalone chat questions.
+
+The response cache only helps when a prompt repeats exactly, but in tax
+season most chat traffic is the same few dozen questions worded
+differently ("old vs new regime?", "which regime should I pick?"). This
+cache embeds the question with a local embedding model (Ollama
+/api/embeddings, OLLAMA_EMBED_MODEL) and compares it by cosine similarity
+with the questions already answered. A match at or above
+SEMANTIC_CACHE_THRESHOLD returns the stored answer without a generation.
+The cache is off unless SEMANTIC_CACHE_ENABLED is set, and it switches
+itself off for the life of the worker when Ollama reports the embedding
+model missing, so requests do not each pay for a failing embedding call.
+Only answers from the chat task's primary model are stored; a fallback
+model's answer would otherwise be served long after the primary recovers.
+
+Only questions asked without history are looked up or stored: a
+follow-up such as "and for my salary?" means something different in every
+conversation. Questions that differ only in a number ("tax on 12 lakh"
+vs "tax on 15 lakh") embed almost identically, so every entry also
+carries a signature of the amounts and numbered terms (80C, ITR-2) in its
+question, and a hit additionally requires an identical signature.
+
+The index is a float32 matrix of unit vectors, one row per answered
+question, searched with a single matrix-vector product. It holds at most
+SEMANTIC_CACHE_MAX_ENTRIES rows; once full, the least recently hit entry
+is replaced. With SEMANTIC_CACHE_MMAP_PATH set the matrix is a NumPy
+memmap file (suffixed with the worker's pid) instead of heap memory, so a
+large index is paged by the OS; it is rewritten on startup, not reloaded,
+and deleted by `close` on shutdown.
+
+Entries belong to a scope: the chat model plus the digest of the default
+tax rule file. When either changes (e.g. the rules JSON is edited) the
+whole index is dropped, since the stored answers may quote stale limits.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Sequence
+
+from app.core import metrics
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.split())
+
+
+class SemanticCache:
+    """Bounded vector index of answered questions; see module docstring."""
+
+    def __init__(self, max_entries: int = 2000, threshold: float = 0.92, mmap_path: str = "") -> None:
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self.mmap_path = mmap_path
+        self._lock = threading.Lock()
+        self._scope: Optional[str] = None
+        self._path = ""
+        self.disabled_reason: Optional[str] = None
+        # Allocated on the first store, once the embedding size is known
+        self._vectors: Optional["np.ndarray"] = None
+        self._last_hit: Optional["np.ndarray"] = None
+        self._questions: List[str] = []
+        self._answers: List[str] = []
+        self._signatures: List[Hashable] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._hit_similarity = 0.0
+        self._embed_seconds = 0.0
+        self._embeds = 0
+
+    def _allocate(self, dimensions: int) -> None:
+        import numpy as np
+
+        shape = (self.max_entries, dimensions)
+        if self.mmap_path:
+            directory = os.path.dirname(self.mmap_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._path = f"{self.mmap_path}.{os.getpid()}"
+            self._vectors = np.memmap(self._path, dtype=np.float32, mode="w+", shape=shape)
+        else:
+            self._vectors = np.zeros(shape, dtype=np.float32)
+        self._last_hit = np.zeros(self.max_entries, dtype=np.float64)
+
+    def _check_scope(self, scope: str) -> None:
+        # Caller holds the lock
+        if scope == self._scope:
+            return
+        if self._questions:
+            self.invalidations += 1
+        self._scope = scope
+        self._clear()
+
+    def _clear(self) -> None:
+        self._questions.clear()
+        self._answers.clear()
+        self._signatures.clear()
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> Optional["np.ndarray"]:
+        import numpy as np
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if vector.ndim == 1 and norm > 0 else None
+
+    def record_embed(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._embeds += 1
+            self._embed_seconds += seconds
+            if not ok:
+                self.errors += 1
+        if not ok:
+            metrics.semantic_cache_lookups.inc("error")
+
+    def lookup(self, embedding: Sequence[float], scope: str, signature: Hashable = ()) -> Optional[str]:
+        """
+        The stored answer closest to `embedding` among entries with the same
+        `signature`, if similar enough; else None.
+        """
+        import numpy as np
+
+        vector = self._unit(embedding)
+        with self._lock:
+            self._check_scope(scope)
+            size = len(self._questions)
+            answer = None
+            if (
+                vector is not None
+                and size
+                and self._vectors is not None
+                and self._vectors.shape[1] == vector.shape[0]
+            ):
+                scores = self._vectors[:size] @ vector
+                candidates = np.flatnonzero(scores >= self.threshold)
+                for index in candidates[np.argsort(scores[candidates])[::-1]]:
+                    best = int(index)
+                    if self._signatures[best] == signature:
+                        self._last_hit[best] = time.monotonic()
+                        self._hit_similarity += float(scores[best])
+                        answer = self._answers[best]
+                        break
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.semantic_cache_lookups.inc("hit" if answer is not None else "miss")
+        return answer
+
+    def store(
+        self,
+        question: str,
+        embedding: Sequence[float],
+        answer: str,
+        scope: str,
+        signature: Hashable = (),
+    ) -> None:
+        vector = self._unit(embedding)
+        if vector is None or not answer.strip():
+            return
+        with self._lock:
+            self._check_scope(scope)
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                # First store, or the embedding model changed size
+                self._allocate(vector.shape[0])
+                self._clear()
+            size = len(self._questions)
+            if size < self.max_entries:
+                slot = size
+                self._questions.append(question)
+                self._answers.append(answer)
+                self._signatures.append(signature)
+            else:
+                slot = int(self._last_hit.argmin())
+                self._questions[slot] = question
+                self._answers[slot] = answer
+                self._signatures[slot] = signature
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._last_hit[slot] = time.monotonic()
+            self.stores += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def disable(self, reason: str) -> None:
+        """Stop looking up and storing answers for the rest of this process."""
+        with self._lock:
+            self.disabled_reason = reason
+            self._clear()
+
+    def close(self) -> None:
+        """Release the index and delete this worker's memmap file, if any."""
+        with self._lock:
+            self._clear()
+            self._vectors = None
+            self._last_hit = None
+            if self._path:
+                try:
+                    os.unlink(self._path)
+                except FileNotFoundError:
+                    pass
+                self._path = ""
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._questions),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "backend": "mmap" if self.mmap_path else "memory",
+                "disabled": self.disabled_reason,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_hit_similarity": round(self._hit_similarity / self.hits, 4) if self.hits else None,
+                "embed_errors": self.errors,
+                "avg_embed_ms": round(self._embed_seconds / self._embeds * 1000, 2) if self._embeds else None,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> SemanticCache:
+    settings = get_settings()
+    return SemanticCache(
+        max_entries=settings.semantic_cache_max_entries,
+        threshold=settings.semantic_cache_threshold,
+        mmap_path=settings.semantic_cache_mmap_path,
+    )
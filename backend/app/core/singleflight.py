@@ -0,0 +1,180 @@
+"""
+Single-flight de-duplication of identical in-flight LLM generations.
+
+Concurrent callers asking for the same key share one generation task and
+all receive its result. Optionally, a file lock per key coordinates
+uvicorn workers: the first worker generates, and the others wait for the
+lock and then find the answer in the shared on-disk response cache. The
+holder deletes the lock file before releasing it, so files do not pile up;
+a waiter that then gets a lock on the deleted file retries with a new one.
+A waiter gives up after LLM_SINGLEFLIGHT_LOCK_TIMEOUT seconds (e.g. the
+holder is stuck on a hung generation) and generates on its own.
+Cross-process mode needs the shared sqlite response cache, so the app
+refuses to start with LLM_SINGLEFLIGHT_LOCK_DIR but no LLM_CACHE_DB_PATH.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.core.config import get_settings
+
+try:
+    import fcntl
+
+    HAS_FCNTL = True
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    HAS_FCNTL = False
+
+T = TypeVar("T")
+
+_LOCK_POLL_SECONDS = 0.05
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    The shared task runs independently of any single caller: a caller that
+    is cancelled (e.g. its client disconnected) stops waiting, and the
+    generation itself is only cancelled once every caller has gone.
+    """
+
+    def __init__(self, lock_dir: str = "", lock_timeout: float = 120.0) -> None:
+        self.lock_dir = lock_dir if HAS_FCNTL else ""
+        self.lock_timeout = lock_timeout
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._inflight: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.shared = 0
+        self.cross_process_waits = 0
+        self.cross_process_hits = 0
+        self.cross_process_timeouts = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        recheck: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+    ) -> T:
+        """
+        Run `fn` once per `key` among concurrent callers. In cross-process
+        mode `recheck` is tried after taking the lock, so a result produced
+        by another worker meanwhile is reused instead of regenerated.
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(self._lead(key, fn, recheck))
+            flight = _Flight(task=task)
+            self._inflight[key] = flight
+            task.add_done_callback(lambda _task, key=key, flight=flight: self._finish(key, flight))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved when nobody was left to await it
+            flight.task.exception()
+
+    async def _lead(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        recheck: Optional[Callable[[], Awaitable[Optional[T]]]],
+    ) -> T:
+        if not self.lock_dir:
+            return await fn()
+
+        path = os.path.join(self.lock_dir, f"{key}.lock")
+        fd, waited = await self._acquire(path, self.lock_timeout)
+        if fd is None:
+            self.cross_process_timeouts += 1
+            if recheck is not None:
+                found = await recheck()
+                if found is not None:
+                    return found
+            return await fn()
+        try:
+            if waited:
+                self.cross_process_waits += 1
+                if recheck is not None:
+                    found = await recheck()
+                    if found is not None:
+                        self.cross_process_hits += 1
+                        return found
+            return await fn()
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            os.close(fd)  # also releases the flock
+
+    @staticmethod
+    async def _acquire(path: str, timeout: float) -> Tuple[Optional[int], bool]:
+        """
+        (fd holding an exclusive flock on `path`, whether it had to wait);
+        the fd is None if the lock was not free within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    waited = True
+                    if time.monotonic() >= deadline:
+                        os.close(fd)
+                        return None, True
+                    await asyncio.sleep(_LOCK_POLL_SECONDS)
+            # The previous holder may have deleted the file we locked
+            try:
+                if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                    return fd, waited
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "cross_process": bool(self.lock_dir),
+            "cross_process_waits": self.cross_process_waits,
+            "cross_process_hits": self.cross_process_hits,
+            "cross_process_timeouts": self.cross_process_timeouts,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_single_flight() -> SingleFlight:
+    settings = get_settings()
+    return SingleFlight(
+        lock_dir=settings.llm_singleflight_lock_dir,
+        lock_timeout=settings.llm_singleflight_lock_timeout,
+    )
@@ -0,0 +1,185 @@
+"""
+Cold-start work and timings.
+
+`app.main` imports this module first, so `startup_timings` can measure how
+long importing the app takes. The lifespan then calls `prime_app` to do
+the work the first requests would otherwise pay for: loading and
+compiling every tax rule file, running one computation through the
+scalar and NumPy engines (which also imports NumPy), building the cached
+classification schema and the OpenAPI document, and creating the pooled
+Ollama client. `warm_model` loads every model the task router sends work
+to into Ollama with an empty prompt; it runs in the background because a
+cold model load can take many seconds.
+
+`FirstRequestTimer` records how long the first request to each route
+(method + path template, as in `MetricsMiddleware`) took, so cold-start regressions show up in /api/v1/ai/stats and
+/metrics next to the startup phases.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from starlette.routing import Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_PROFILE = {
+    "fy": "2024-25",
+    "age": 35,
+    "income": {"salary": 1_200_000, "interest": 40_000},
+    "deductions": {"section_80c": 150_000, "section_80d": 25_000},
+}
+
+
+class StartupTimings:
+    """Import/lifespan phase durations, model warmup result and first requests."""
+
+    def __init__(self, max_first_requests: int = 32) -> None:
+        self.started = time.perf_counter()
+        self.import_ms: Optional[float] = None
+        self.phases_ms: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+        self.model_warmup: Dict[str, Any] = {"status": "pending"}
+        self.max_first_requests = max_first_requests
+        self.first_requests: Dict[str, Dict[str, float]] = {}
+
+    def imported(self) -> None:
+        self.import_ms = round((time.perf_counter() - self.started) * 1000, 3)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases_ms[name] = round((time.perf_counter() - started) * 1000, 3)
+
+    def ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        logger.info(
+            "Startup finished: import %.1f ms, lifespan %.1f ms (%s)",
+            self.import_ms or 0.0,
+            sum(self.phases_ms.values()),
+            ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.phases_ms.items()),
+        )
+
+    def record_first_request(self, key: str, duration: float) -> None:
+        if key in self.first_requests or len(self.first_requests) >= self.max_first_requests:
+            return
+        since_ready = time.perf_counter() - self.ready_at if self.ready_at is not None else None
+        self.first_requests[key] = {
+            "duration_ms": round(duration * 1000, 3),
+            "seconds_after_ready": round(since_ready, 3) if since_ready is not None else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "import_ms": self.import_ms,
+            "lifespan_ms": round(sum(self.phases_ms.values()), 3),
+            "phases_ms": dict(self.phases_ms),
+            "model_warmup": dict(self.model_warmup),
+            "first_requests": dict(self.first_requests),
+        }
+
+
+startup_timings = StartupTimings()
+
+
+def prime_app(app: "FastAPI") -> None:
+    """Synchronous warmup run from the lifespan before the first request."""
+    from app.core.ai_client import _classification_format, _get_http_client
+    from app.models.tax import TaxComputationRequest
+    from app.services.form_service import autofill_form_fields
+    from app.services.tax_logic import compare_regimes
+    from app.services.tax_rules import get_rule_registry, get_rule_set
+
+    with startup_timings.phase("rules"):
+        get_rule_registry().preload()
+        get_rule_set()
+    with startup_timings.phase("tax_engine"):
+        # Deferred by routes_tax; importing it here loads NumPy before serving
+        from app.services.tax_batch import compute_tax_for_profiles
+
+        request = TaxComputationRequest.model_validate_json(
+            TaxComputationRequest(profile=_SAMPLE_PROFILE).model_dump_json()
+        )
+        compare_regimes(request.profile, request.regime).model_dump_json()
+        compute_tax_for_profiles([request.profile], request.regime)
+        autofill_form_fields(request.profile)
+    with startup_timings.phase("schemas"):
+        _classification_format()
+        app.openapi()
+    with startup_timings.phase("http_client"):
+        _get_http_client()
+
+
+async def warm_model() -> None:
+    """
+    Load the routed primary models into Ollama one after another; failures
+    are logged, never raised.
+    """
+    from app.core.ai_client import preload_model
+    from app.core.model_routing import get_model_router
+
+    started = time.perf_counter()
+    results: Dict[str, Dict[str, Any]] = {}
+    for model in get_model_router().models():
+        model_started = time.perf_counter()
+        try:
+            reply = await preload_model(model)
+        except Exception as exc:
+            results[model] = {"status": "failed", "error": repr(exc)}
+            logger.warning("Model warmup for %s failed: %r", model, exc)
+            continue
+        results[model] = {
+            "status": "ok",
+            "duration_ms": round((time.perf_counter() - model_started) * 1000, 3),
+            "load_ms": round(reply.get("load_duration", 0) / 1e6, 3),
+        }
+        logger.info("Model %s warm in %.1f ms", model, results[model]["duration_ms"])
+    ok = all(result["status"] == "ok" for result in results.values())
+    startup_timings.model_warmup = {
+        "status": "ok" if ok else "failed",
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        "models": results,
+    }
+
+
+class FirstRequestTimer:
+    """
+    Times the first request to each method + route template, so per-id
+    paths share one entry. Once `max_first_requests` distinct routes have
+    been seen it only forwards requests.
+    """
+
+    def __init__(self, app: ASGIApp, router: Router) -> None:
+        # Imported here so the rest of the app is inside the import timing
+        from app.core.metrics import route_template
+
+        self.app = app
+        self.router = router
+        self.route_template = route_template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timings = startup_timings
+        if scope["type"] != "http" or len(timings.first_requests) >= timings.max_first_requests:
+            await self.app(scope, receive, send)
+            return
+        key = f"{scope['method']} {self.route_template(self.router, scope)}"
+        if key in timings.first_requests:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            timings.record_first_request(key, time.perf_counter() - started)
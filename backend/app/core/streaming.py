@@ -0,0 +1,87 @@
+"""
+Helpers for streaming AI output to clients as NDJSON.
+
+Services produce events as plain dicts, e.g.
+    {"type": "token", "content": "..."}
+    {"type": "structured", "data": {...}}
+`ndjson_stream` serialises them one per line, records time-to-first-token
+and total time per endpoint, and finishes with a
+    {"type": "done", "ttft_ms": ..., "total_ms": ...}
+event (or {"type": "error", "detail": ...} if generation fails).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class StreamTimings:
+    """Running time-to-first-token / total-time aggregates per stream name."""
+
+    def __init__(self) -> None:
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"streams": 0, "errors": 0, "ttft_ms_sum": 0.0, "total_ms_sum": 0.0}
+        )
+
+    def record(self, name: str, ttft_ms: Optional[float], total_ms: float, failed: bool) -> None:
+        entry = self._totals[name]
+        entry["streams"] += 1
+        entry["errors"] += int(failed)
+        entry["ttft_ms_sum"] += ttft_ms if ttft_ms is not None else total_ms
+        entry["total_ms_sum"] += total_ms
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "streams": entry["streams"],
+                "errors": entry["errors"],
+                "avg_ttft_ms": round(entry["ttft_ms_sum"] / entry["streams"], 2),
+                "avg_total_ms": round(entry["total_ms_sum"] / entry["streams"], 2),
+            }
+            for name, entry in self._totals.items()
+        }
+
+
+stream_timings = StreamTimings()
+
+
+async def ndjson_stream(name: str, events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    Serialise `events` as NDJSON, timing the stream under `name`.
+    """
+    started = time.perf_counter()
+    ttft_ms: Optional[float] = None
+    failed = False
+    try:
+        async for event in events:
+            if ttft_ms is None and event.get("type") == "token":
+                ttft_ms = (time.perf_counter() - started) * 1000
+            yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+    except Exception as exc:  # surfaced to the client in-band; headers are already sent
+        failed = True
+        logger.exception("Stream %s failed", name)
+        yield (json.dumps({"type": "error", "detail": str(exc)}) + "\n").encode("utf-8")
+    finally:
+        total_ms = (time.perf_counter() - started) * 1000
+        stream_timings.record(name, ttft_ms, total_ms, failed)
+        logger.info("Stream %s: ttft=%.1fms total=%.1fms", name, ttft_ms or total_ms, total_ms)
+
+    if not failed:
+        yield (
+            json.dumps(
+                {
+                    "type": "done",
+                    "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+                    "total_ms": round(total_ms, 2),
+                }
+            )
+            + "\n"
+        ).encode("utf-8")
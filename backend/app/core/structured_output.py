@@ -0,0 +1,102 @@
+"""
+Helpers for constrained (JSON) model output.
+
+Ollama's `format` option constrains generation to JSON, or to a JSON
+schema on newer servers. The model can still keep going after the object
+is complete, for example with whitespace or a second object.
+`JsonObjectScanner` watches the streamed fragments and reports the
+moment the first top-level object closes, so the caller can stop reading
+and let Ollama abort the rest of the generation.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class JsonObjectScanner:
+    """
+    Incrementally locate the first complete top-level JSON object in a
+    stream of text fragments. Text before the opening brace is skipped;
+    braces inside strings (including escaped quotes) are ignored.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.result: Optional[str] = None
+        self.chars_seen = 0
+
+    def feed(self, fragment: str) -> Optional[str]:
+        """Consume `fragment`; returns the object text once it is complete."""
+        if self.result is not None:
+            return self.result
+        self.chars_seen += len(fragment)
+        start = 0
+        if self._depth == 0:
+            start = fragment.find("{")
+            if start < 0:
+                return None
+        for index in range(start, len(fragment)):
+            char = fragment[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(fragment[start : index + 1])
+                    self.result = "".join(self._parts)
+                    return self.result
+        self._parts.append(fragment[start:])
+        return None
+
+    @property
+    def text(self) -> str:
+        """Object text collected so far (possibly incomplete)."""
+        return self.result if self.result is not None else "".join(self._parts)
+
+
+class StructuredOutputStats:
+    """Outcome counters for structured generations, per task name."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, task: str, outcome: str, attempts: int, output_chars: int) -> None:
+        """`outcome` is "ok" (first attempt), "repaired" or "failed"."""
+        with self._lock:
+            entry = self._counts.setdefault(
+                task,
+                {"calls": 0, "ok": 0, "repaired": 0, "failed": 0, "generations": 0, "output_chars": 0},
+            )
+            entry["calls"] += 1
+            entry[outcome] += 1
+            entry["generations"] += attempts
+            entry["output_chars"] += output_chars
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                task: {
+                    **entry,
+                    "success_rate": round((entry["ok"] + entry["repaired"]) / entry["calls"], 4),
+                    "avg_output_chars": round(entry["output_chars"] / entry["calls"], 1),
+                }
+                for task, entry in self._counts.items()
+            }
+
+
+structured_stats = StructuredOutputStats()
@@ -1,12 +1,62 @@
-from fastapi import FastAPI
+# First, so startup_timings also covers importing FastAPI and the routers
+from app.core.startup import FirstRequestTimer, prime_app, startup_timings, warm_model
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import List
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.core.ai_client import close_http_client
+from app.core.ollama_pool import get_worker_pool
 from app.core.config import get_settings
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.chat_sessions import ChatSessionNotFoundError
+from app.core.llm_scheduler import SchedulerBusyError
+from app.core.semantic_cache import get_semantic_cache
 from app.api.v1.routes_analyze import router as analyze_router
 from app.api.v1.routes_tax import router as tax_router
 from app.api.v1.routes_deductions import router as deductions_router
 from app.api.v1.routes_forms import router as forms_router
 from app.api.v1.routes_chat import router as chat_router
+from app.api.v1.routes_ai import router as ai_router
+from app.api.v1.routes_admin import router as admin_router
+from app.services.checklist_templates import run_warmup as run_checklist_warmup
+from app.services.tax_rules import RulesNotFoundError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup / shutdown hooks: bring up the Ollama worker pool (and daemon, if
+    managed), prime rules, engines and schemas, and start the background
+    model and checklist template warmups on start; cancel the warmups, stop
+    the pool, release the pooled HTTP client and delete the semantic cache's
+    memmap file on exit.
+    """
+    settings = get_settings()
+    pool = get_worker_pool()
+    with startup_timings.phase("worker_pool"):
+        await pool.start()
+    if settings.startup_warmup_enabled:
+        prime_app(app)
+    warmups: List[asyncio.Task] = []
+    if settings.ollama_warmup_enabled and settings.ollama_backend == "http":
+        warmups.append(asyncio.create_task(warm_model()))
+    if settings.checklist_warmup_enabled:
+        warmups.append(asyncio.create_task(run_checklist_warmup()))
+    startup_timings.ready()
+    yield
+    for warmup in warmups:
+        warmup.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup
+    await pool.stop()
+    await close_http_client()
+    get_semantic_cache().close()
 
 
 def create_app() -> FastAPI:
@@ -14,11 +64,23 @@ def create_app() -> FastAPI:
     Application factory.
     """
     settings = get_settings()
+    if settings.profiling_enabled and not settings.profiling_admin_token:
+        # The admin routes expose stored profiles and the header forces profiling
+        raise RuntimeError("PROFILING_ENABLED=true requires a non-empty PROFILING_ADMIN_TOKEN")
+    if settings.llm_singleflight_lock_dir and not (
+        settings.llm_cache_enabled and settings.llm_cache_db_path
+    ):
+        # Waiting workers would find nothing cached and each generate anyway, one at a time
+        raise RuntimeError(
+            "LLM_SINGLEFLIGHT_LOCK_DIR requires the shared response cache "
+            "(LLM_CACHE_ENABLED=true and a non-empty LLM_CACHE_DB_PATH)"
+        )
 
     app = FastAPI(
         title="AI-Powered Personalized Tax Filing Assistant",
         version="0.1.0",
         description="FastAPI backend using local Ollama models only.",
+        lifespan=lifespan,
     )
 
     # Basic CORS config for local dev; adjust for production as needed
@@ -29,6 +91,12 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(FirstRequestTimer, router=app.router)
+    if settings.metrics_enabled:
+        # Outermost, so latency covers CORS handling and the full response body
+        app.add_middleware(MetricsMiddleware, router=app.router)
 
     # Register versioned API routers
     app.include_router(analyze_router, prefix="/api/v1", tags=["financial-analysis"])
@@ -36,14 +104,43 @@ def create_app() -> FastAPI:
     app.include_router(deductions_router, prefix="/api/v1", tags=["deductions"])
     app.include_router(forms_router, prefix="/api/v1", tags=["forms"])
     app.include_router(chat_router, prefix="/api/v1", tags=["chat"])
+    app.include_router(ai_router, prefix="/api/v1", tags=["ai"])
+    if settings.profiling_enabled:
+        app.include_router(admin_router, prefix="/api/v1", tags=["admin"])
+
+    @app.exception_handler(RulesNotFoundError)
+    async def rules_not_found_handler(request: Request, exc: RulesNotFoundError):
+        return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+    @app.exception_handler(ChatSessionNotFoundError)
+    async def chat_session_not_found_handler(request: Request, exc: ChatSessionNotFoundError):
+        return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+    @app.exception_handler(SchedulerBusyError)
+    async def scheduler_busy_handler(request: Request, exc: SchedulerBusyError):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
 
     @app.get("/health", tags=["health"])
     async def health_check():
         return {"status": "ok"}
 
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+        async def metrics_endpoint() -> PlainTextResponse:
+            """Prometheus text exposition of HTTP, LLM and tax-engine metrics."""
+            return PlainTextResponse(
+                render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+
     return app
 
 
 app = create_app()
+startup_timings.imported()
 
 
@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -17,10 +17,37 @@ class ChatRequest(BaseModel):
         description="Previous turns including assistant responses.",
     )
     user_input: str = Field(..., description="New user message to send to assistant.")
+    session_id: Optional[str] = Field(
+        None,
+        description="Server-side session from POST /chat/sessions; `history` must then be empty.",
+    )
 
 
 class ChatResponse(BaseModel):
     reply: str
+    prompt_tokens: Optional[int] = Field(
+        None,
+        description="Estimated prompt size for this turn after history compaction.",
+    )
+    session_id: Optional[str] = Field(None, description="Set for session turns.")
+
+
+class ChatSessionCreateRequest(BaseModel):
+    history: List[ChatMessage] = Field(
+        default_factory=list,
+        description="Earlier turns to seed the session with, e.g. from a stateless chat.",
+    )
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    history: List[ChatMessage]
+    summary: Optional[str] = Field(
+        None, description="Rolling summary of earlier turns no longer kept in `history`."
+    )
+    context_tokens: int = Field(
+        0, description="Tokens of model context held for the next turn (0 = prompt is rebuilt)."
+    )
 
 
 
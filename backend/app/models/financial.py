@@ -20,12 +20,20 @@ class DeductionInputs(BaseModel):
     other_deductions: float = Field(0, description="Other eligible deductions")
 
 
+# Numeric input fields, in declaration order (the batch engine's column names)
+INCOME_COLUMNS = tuple(IncomeBreakdown.model_fields)
+DEDUCTION_COLUMNS = tuple(DeductionInputs.model_fields)
+
+
 class FinancialProfile(BaseModel):
     """
     Aggregate financial inputs for a given financial year.
     """
 
     fy: str = Field(..., description="Financial year, e.g., '2024-25'")
+    jurisdiction: str = Field(
+        "india", description="Tax jurisdiction whose rules apply, e.g., 'india'"
+    )
     age: int = Field(..., ge=18, le=100)
     resident_status: str = Field(
         "resident", description="resident | non-resident | resident-but-not-ordinary"
@@ -41,6 +49,18 @@ class AnalyzeFinancialsRequest(BaseModel):
     raw_text: str = Field(..., description="User's free-form description of finances")
 
 
+class FinancialClassification(BaseModel):
+    """
+    Structured hints extracted from free text; also the JSON schema the
+    classification model is constrained to.
+    """
+
+    income_sources: List[str] = Field(default_factory=list, description="Income heads mentioned")
+    deductions: List[str] = Field(default_factory=list, description="Deductions/investments mentioned")
+    capital_gains: List[str] = Field(default_factory=list, description="Capital gains events mentioned")
+    notes: Optional[str] = Field(None, description="Clarifications or anything left uncertain")
+
+
 class AnalyzeFinancialsResponse(BaseModel):
     structured_financial_info: dict
     explanation: str
@@ -1,10 +1,13 @@
 from typing import Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 TaxRegime = Literal["old", "new"]
 
+# Largest x * y grid one sweep request may ask for
+MAX_SWEEP_CELLS = 20_000
+
 
 class TaxComputationRequest(BaseModel):
     profile: "FinancialProfile"
@@ -37,6 +40,92 @@ class TaxComputationResponse(BaseModel):
     )
 
 
+class BatchTaxComputationRequest(BaseModel):
+    profiles: list["FinancialProfile"] = Field(
+        ...,
+        max_length=10_000,
+        description="Profiles to compute in one vectorized pass (at most 10,000).",
+    )
+    regime: Optional[TaxRegime] = Field(
+        None,
+        description="If omitted, both regimes will be computed for every profile.",
+    )
+
+
+class BatchTaxComputationResponse(BaseModel):
+    results: list[TaxComputationResponse] = Field(
+        default_factory=list,
+        description="One result per input profile, in the same order.",
+    )
+
+
+SweepField = Literal[
+    "salary",
+    "business",
+    "interest",
+    "rental",
+    "capital_gains",
+    "other",
+    "section_80c",
+    "section_80d",
+    "section_24b",
+    "nps_80ccd1b",
+    "other_deductions",
+]
+
+
+class SweepAxis(BaseModel):
+    field: SweepField = Field(..., description="Income or deduction field to vary")
+    start: float = Field(0, ge=0)
+    stop: float = Field(..., ge=0)
+    steps: int = Field(21, ge=2, le=1001, description="Grid points from start to stop")
+
+
+class RegimeSweepRequest(BaseModel):
+    profile: "FinancialProfile"
+    x: SweepAxis
+    y: Optional[SweepAxis] = Field(
+        None, description="Optional second axis for a 2-D what-if surface."
+    )
+
+    @model_validator(mode="after")
+    def _check_grid_size(self) -> "RegimeSweepRequest":
+        cells = self.x.steps * (self.y.steps if self.y is not None else 1)
+        if cells > MAX_SWEEP_CELLS:
+            raise ValueError(
+                f"Sweep grid has {cells} points (x.steps * y.steps); "
+                f"at most {MAX_SWEEP_CELLS} allowed"
+            )
+        return self
+
+
+class RegimeCrossing(BaseModel):
+    x: float = Field(..., description="Value of the x field where both regimes cost the same")
+    old_cheaper_above: bool = Field(
+        ..., description="True if the old regime is cheaper just above this point"
+    )
+
+
+class RegimeBreakeven(BaseModel):
+    y: Optional[float] = Field(None, description="y-axis value this row applies to")
+    crossings: list[RegimeCrossing] = Field(default_factory=list)
+
+
+class RegimeSweepResponse(BaseModel):
+    x_field: SweepField
+    x_values: list[float]
+    y_field: Optional[SweepField] = None
+    y_values: Optional[list[float]] = None
+    old_total_tax: list[list[float]] = Field(
+        ..., description="Old-regime total tax, one row per y value (a single row without y)"
+    )
+    new_total_tax: list[list[float]]
+    breakevens: list[RegimeBreakeven] = Field(
+        default_factory=list,
+        description="Exact old/new crossing points along x, solved from the slab structure.",
+    )
+
+
 class DeductionSuggestionRequest(BaseModel):
     profile: "FinancialProfile"
 
@@ -46,6 +135,9 @@ class DeductionSuggestion(BaseModel):
     label: str
     potential_amount: float
     description: str
+    estimated_tax_saving: Optional[float] = Field(
+        None, description="Old-regime tax saved if the full potential amount is claimed."
+    )
 
 
 class DeductionSuggestionResponse(BaseModel):
@@ -53,9 +145,57 @@ class DeductionSuggestionResponse(BaseModel):
     note: Optional[str] = None
 
 
+class DeductionOptimizationRequest(BaseModel):
+    profile: "FinancialProfile"
+    budget: Optional[float] = Field(
+        None,
+        ge=0,
+        description="Extra amount available to invest/claim. If omitted, all headroom is used.",
+    )
+    regime: Optional[TaxRegime] = Field(
+        None,
+        description="If omitted, the regime with the lower optimized tax is chosen.",
+    )
+
+
+class DeductionAllocation(BaseModel):
+    section: str
+    label: str
+    current_amount: float = Field(..., description="Amount already claimed (capped)")
+    additional_amount: float = Field(..., description="Suggested extra amount for this section")
+    cap: Optional[float] = Field(None, description="Section cap; None when uncapped")
+    tax_saving: float = Field(..., description="Total tax saved by the additional amount")
+    marginal_rate_percent: float = Field(
+        ...,
+        description=(
+            "Tax saved per rupee (surcharge and cess included) on the first "
+            "additional rupees, in percent"
+        ),
+    )
+
+
+class DeductionOptimizationResponse(BaseModel):
+    regime: TaxRegime
+    allocations: list[DeductionAllocation] = Field(
+        default_factory=list,
+        description="Sections in allocation order (highest marginal saving first).",
+    )
+    total_additional_amount: float
+    unused_budget: Optional[float] = None
+    current_total_tax: float
+    optimized_total_tax: float
+    tax_saving: float
+    other_regime_optimized_total_tax: Optional[float] = Field(
+        None, description="Best achievable tax under the other regime, for comparison."
+    )
+
+
 # Late imports to avoid circular reference at type-check time
 from app.models.financial import FinancialProfile  # noqa: E402  pylint: disable=C0413
 
 TaxComputationRequest.update_forward_refs()
+BatchTaxComputationRequest.update_forward_refs()
+RegimeSweepRequest.update_forward_refs()
+DeductionOptimizationRequest.update_forward_refs()
 
 
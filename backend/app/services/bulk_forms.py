@@ -0,0 +1,281 @@
+"""
+Bulk ITR form generation over a stream of profiles.
+
+Profiles are read one row at a time from JSONL or CSV. Each row is
+validated lazily and gets the regime comparison from `tax_logic` plus the
+form fields from `form_service`. Results are written out row by row, so
+memory stays constant however large the client book is. Rows are handled
+in fixed-size chunks, optionally across a process pool. A row that fails
+validation produces an error row instead of aborting the run.
+
+CSV input uses flat column names: the `FinancialProfile` scalars (fy,
+jurisdiction, age, resident_status, regime_preference), then the
+`IncomeBreakdown` / `DeductionInputs` field names. An optional `id`
+column is passed through. JSONL rows are `FinancialProfile` JSON,
+optionally with an `id` key.
+
+Offline runs:
+
+    python -m app.services.bulk_forms clients.csv -o forms.jsonl --workers 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from app.models.financial import DEDUCTION_COLUMNS, INCOME_COLUMNS, FinancialProfile
+from app.services.form_service import autofill_form_fields
+from app.services.tax_logic import compare_regimes
+from app.services.tax_rules import RulesNotFoundError
+
+FORMATS = ("jsonl", "csv")
+FORM_COLUMNS = tuple(
+    autofill_form_fields(
+        FinancialProfile.model_validate({"fy": "2024-25", "age": 30, "income": {}, "deductions": {}})
+    )
+)
+TAX_COLUMNS = ("old_total_tax", "new_total_tax", "recommended_regime", "warnings")
+OUTPUT_COLUMNS = ("row", "id", "status", "error") + FORM_COLUMNS + TAX_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 256
+
+NumberedRecord = Tuple[int, Dict[str, Any]]
+
+
+def format_for_path(path: str, default: str = "jsonl") -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return default
+
+
+def _csv_record(row: Dict[str, str]) -> Dict[str, Any]:
+    """Nest a flat CSV row into `FinancialProfile` shape; blanks are omitted."""
+    record: Dict[str, Any] = {"income": {}, "deductions": {}}
+    for key, value in row.items():
+        if key is None or value is None or value.strip() == "":
+            continue
+        value = value.strip()
+        if key in INCOME_COLUMNS:
+            record["income"][key] = value
+        elif key in DEDUCTION_COLUMNS:
+            record["deductions"][key] = value
+        else:
+            record[key] = value
+    return record
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    """Lazily turn JSONL or CSV lines into raw profile dicts."""
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            yield _csv_record(row)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            record = {"__error__": f"Invalid JSON: {exc.msg}"}
+        yield record if isinstance(record, dict) else {"__error__": "Row is not a JSON object"}
+
+
+def process_record(numbered: NumberedRecord) -> Dict[str, Any]:
+    """Validate one raw record and compute its tax summary and form fields."""
+    row_number, record = numbered
+    result: Dict[str, Any] = {"row": row_number, "id": record.get("id")}
+    if "__error__" in record:
+        return {**result, "status": "error", "error": record["__error__"]}
+    try:
+        profile = FinancialProfile.model_validate(
+            {key: value for key, value in record.items() if key != "id"}
+        )
+        comparison = compare_regimes(profile)
+    except ValidationError as exc:
+        errors = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+        return {**result, "status": "error", "error": errors}
+    except RulesNotFoundError as exc:
+        return {**result, "status": "error", "error": str(exc)}
+
+    return {
+        **result,
+        "status": "ok",
+        "fields": autofill_form_fields(profile),
+        "tax": {
+            "old_total_tax": comparison.old_regime.total_tax if comparison.old_regime else None,
+            "new_total_tax": comparison.new_regime.total_tax if comparison.new_regime else None,
+            "recommended_regime": comparison.recommended_regime,
+            "warnings": comparison.warnings,
+        },
+    }
+
+
+def process_chunk(chunk: List[NumberedRecord]) -> List[Dict[str, Any]]:
+    return [process_record(item) for item in chunk]
+
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[NumberedRecord]]:
+    numbered = enumerate(records, start=1)
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_pipeline(
+    records: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Process `records` in order. With `workers` > 1 (0 = all cores), chunks
+    are spread over a process pool, and only `workers` chunks are in
+    flight at once so memory stays bounded.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in _chunks(records, chunk_size):
+            yield from process_chunk(chunk)
+        return
+
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        chunks = _chunks(records, chunk_size)
+        while True:
+            window = list(islice(chunks, workers))
+            if not window:
+                return
+            for results in pool.map(process_chunk, window):
+                yield from results
+
+
+def _csv_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    row = {key: result.get(key) for key in ("row", "id", "status", "error")}
+    row.update(result.get("fields", {}))
+    tax = result.get("tax", {})
+    row.update({key: tax.get(key) for key in TAX_COLUMNS})
+    if row.get("warnings") is not None:
+        row["warnings"] = " | ".join(row["warnings"])
+    return row
+
+
+class RowWriter:
+    """Encode results one at a time as JSONL lines or CSV rows."""
+
+    def __init__(self, fmt: str) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}; expected one of {FORMATS}")
+        self.fmt = fmt
+        self._buffer = io.StringIO()
+        self._csv: Optional[csv.DictWriter] = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._buffer, fieldnames=OUTPUT_COLUMNS, lineterminator="\n")
+
+    def header(self) -> str:
+        if self._csv is None:
+            return ""
+        self._csv.writeheader()
+        return self._drain()
+
+    def row(self, result: Dict[str, Any]) -> str:
+        if self._csv is None:
+            return json.dumps(result, ensure_ascii=False) + "\n"
+        self._csv.writerow(_csv_row(result))
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+
+def write_results(results: Iterable[Dict[str, Any]], out: TextIO, fmt: str) -> Dict[str, int]:
+    """Write results to `out` as they arrive; returns ok/error counts."""
+    writer = RowWriter(fmt)
+    out.write(writer.header())
+    counts = {"ok": 0, "error": 0}
+    for result in results:
+        counts[result["status"]] += 1
+        out.write(writer.row(result))
+    return counts
+
+
+async def stream_bulk_forms(
+    lines: Iterable[str],
+    input_format: str,
+    output_format: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[str]:
+    """
+    HTTP counterpart of `run_pipeline`: each chunk is read and computed in
+    a worker thread so the event loop stays responsive, then encoded.
+    """
+    writer = RowWriter(output_format)
+    header = writer.header()
+    if header:
+        yield header
+
+    chunks = _chunks(read_records(lines, input_format), chunk_size)
+
+    def next_results() -> Optional[List[Dict[str, Any]]]:
+        chunk = next(chunks, None)
+        return process_chunk(chunk) if chunk is not None else None
+
+    while True:
+        results = await asyncio.to_thread(next_results)
+        if results is None:
+            return
+        yield "".join(writer.row(result) for result in results)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate ITR form fields for many profiles.")
+    parser.add_argument("input", help="JSONL or CSV file of profiles ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--input-format", choices=FORMATS, help="Defaults to the input extension")
+    parser.add_argument("--output-format", choices=FORMATS, help="Defaults to the output extension")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Worker processes (0 = all cores, 1 = in-process)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or format_for_path(args.input)
+    output_format = args.output_format or format_for_path(args.output)
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        results = run_pipeline(read_records(source, input_format), args.workers, args.chunk_size)
+        counts = write_results(results, sink, output_format)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"{counts['ok']} forms written, {counts['error']} rows with errors", file=sys.stderr)
+    return 0 if counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,228 @@
-from app.core.ai_client import chat_with_assistant
-from app.models.chat import ChatRequest, ChatResponse
+import asyncio
+import logging
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from app.core.ai_client import (
+    ChatTurn,
+    chat_session_turn,
+    EmbeddingModelNotFoundError,
+    chat_with_assistant,
+    embed_text,
+    stream_chat_session_turn,
+    stream_chat_with_assistant,
+)
+from app.core.chat_history import estimate_tokens, get_history_compactor
+from app.core.chat_sessions import ChatSession, get_chat_sessions
+from app.core.config import get_settings
+from app.core.model_routing import get_model_router
+from app.core.prompts import build_chat_prompt, build_chat_turn_prompt
+from app.core.semantic_cache import get_semantic_cache, normalize_question
+from app.models.chat import ChatRequest, ChatResponse, ChatSessionResponse
+from app.services.financial_extractor import parse_amounts
+from app.services.tax_rules import RulesNotFoundError, get_rule_set
 
-def handle_chat(payload: ChatRequest) -> ChatResponse:
-    reply = chat_with_assistant(
-        history=[m.model_dump() for m in payload.history],
+logger = logging.getLogger(__name__)
+
+# Words containing a digit: bare numbers, sections (80C, 80TTA), forms (ITR-2)
+_NUMBERED_TERM = re.compile(r"[\w₹.,-]*\d[\w.,-]*")
+
+
+def _question_signature(question: str) -> Tuple[Tuple[float, ...], Tuple[str, ...]]:
+    """
+    Amounts and numbered terms of a question; a cached answer is only
+    reused for a question with exactly the same ones.
+    """
+    amounts = tuple(sorted(amount for _, amount in parse_amounts(question)))
+    terms = tuple(sorted(term.strip(".,-").lower() for term in _NUMBERED_TERM.findall(question)))
+    return amounts, terms
+
+
+def _semantic_scope() -> str:
+    """Cached answers are only valid for this chat model and rule file."""
+    try:
+        digest = get_rule_set().digest
+    except RulesNotFoundError:
+        digest = ""
+    return f"{get_model_router().route('chat').model}:{digest}"
+
+
+async def _semantic_lookup(payload: ChatRequest) -> Tuple[Optional[List[float]], str, Optional[str]]:
+    """
+    (embedding, scope, cached answer) for a question asked without history.
+    The embedding is None when the question is not eligible or the
+    embedding call failed; the question is then answered as usual.
+    """
+    settings = get_settings()
+    if payload.history or not settings.semantic_cache_enabled or settings.ollama_backend != "http":
+        return None, "", None
+    cache = get_semantic_cache()
+    if cache.disabled_reason is not None:
+        return None, "", None
+    started = time.perf_counter()
+    try:
+        embedding: Optional[List[float]] = await embed_text(normalize_question(payload.user_input))
+    except EmbeddingModelNotFoundError as exc:
+        logger.warning("Semantic cache disabled: %s", exc)
+        cache.disable(str(exc))
+        embedding = None
+    except RuntimeError as exc:
+        logger.warning("Semantic cache lookup skipped: %s", exc)
+        embedding = None
+    cache.record_embed(time.perf_counter() - started, ok=bool(embedding))
+    if not embedding:
+        return None, "", None
+    scope = _semantic_scope()
+    return embedding, scope, cache.lookup(embedding, scope, _question_signature(payload.user_input))
+
+
+def _semantic_store(
+    payload: ChatRequest, embedding: List[float], scope: str, reply: str, final: Dict[str, Any]
+) -> None:
+    """Store `reply` unless the chat route's fallback model produced it."""
+    if final.get("model") != get_model_router().route("chat").model:
+        return
+    get_semantic_cache().store(
+        normalize_question(payload.user_input),
+        embedding,
+        reply,
+        scope,
+        _question_signature(payload.user_input),
+    )
+
+
+async def handle_chat(payload: ChatRequest) -> ChatResponse:
+    if payload.session_id:
+        return await handle_session_chat(get_chat_sessions().get(payload.session_id), payload.user_input)
+    compacted = await get_history_compactor().compact(
+        [m.model_dump() for m in payload.history], payload.user_input
+    )
+    embedding, scope, cached = await _semantic_lookup(payload)
+    if cached is not None:
+        return ChatResponse(reply=cached, prompt_tokens=compacted.prompt_tokens)
+    final: Dict[str, Any] = {}
+    reply = await chat_with_assistant(
+        history=compacted.recent,
         user_input=payload.user_input,
+        summary=compacted.summary,
+        final=final,
     )
-    return ChatResponse(reply=reply)
+    if embedding is not None:
+        _semantic_store(payload, embedding, scope, reply, final)
+    return ChatResponse(reply=reply, prompt_tokens=compacted.prompt_tokens)
+
 
+async def stream_chat(payload: ChatRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of `handle_chat`: yields token events as they arrive.
+    A semantic cache hit is sent as a single token event, and a streamed
+    answer is only cached if the stream runs to completion.
+    """
+    compacted = await get_history_compactor().compact(
+        [m.model_dump() for m in payload.history], payload.user_input
+    )
+    embedding, scope, cached = await _semantic_lookup(payload)
+    yield {"type": "meta", "prompt_tokens": compacted.prompt_tokens}
+    if cached is not None:
+        yield {"type": "token", "content": cached}
+        return
+    final: Dict[str, Any] = {}
+    tokens = stream_chat_with_assistant(
+        history=compacted.recent,
+        user_input=payload.user_input,
+        summary=compacted.summary,
+        final=final,
+    )
+    parts: List[str] = []
+    async for token in tokens:
+        parts.append(token)
+        yield {"type": "token", "content": token}
+    if embedding is not None:
+        _semantic_store(payload, embedding, scope, "".join(parts).strip(), final)
+
+
+def session_info(session: ChatSession) -> ChatSessionResponse:
+    return ChatSessionResponse(
+        session_id=session.session_id,
+        history=session.history,
+        summary=session.summary,
+        context_tokens=session.context_tokens(),
+    )
+
+
+async def _standalone_prompt(session: ChatSession, user_input: str) -> Tuple[str, int]:
+    """
+    Self-contained prompt for the turn if it cannot continue the stored
+    context, plus the expected prompt size. When the context will most
+    likely be reused the prompt is only needed if the turn moves to another
+    model mid-way, so older turns are dropped rather than summarized: a
+    summary would need the model slot the turn holds.
+    """
+    compactor = get_history_compactor()
+    router = get_model_router()
+    if session.context is not None and session.context_model == router.model_for(router.route("chat")):
+        compacted = compactor.truncate(session.history, user_input, session.summary)
+        expected_tokens = estimate_tokens(build_chat_turn_prompt(user_input))
+    else:
+        compacted = await compactor.compact(session.history, user_input, session.summary)
+        expected_tokens = compacted.prompt_tokens
+    return build_chat_prompt(compacted.recent, user_input, compacted.summary), expected_tokens
+
+
+async def _trim_history(session: ChatSession) -> None:
+    """Fold all but the last `keep_last` turns into the session's summary."""
+    compactor = get_history_compactor()
+    async with session.lock:
+        older = session.history[: max(0, len(session.history) - compactor.keep_last)]
+        if not older:
+            return
+        try:
+            session.summary = await compactor.fold(session.summary, older)
+        except RuntimeError as exc:  # the model is busy or down; retried after the next turn
+            logger.warning("Chat session %s not trimmed: %s", session.session_id, exc)
+            return
+        del session.history[: len(older)]
+
+
+def _finish_turn(session: ChatSession, user_input: str, turn: ChatTurn) -> None:
+    session.history.append({"role": "user", "content": user_input})
+    session.history.append({"role": "assistant", "content": turn.reply})
+    session.set_context(turn.context, turn.model, get_settings().chat_prompt_token_budget)
+    get_chat_sessions().record_turn(turn.reused_context, turn.prefill_tokens)
+    # Runs once the turn releases the session lock; the next turn waits for it
+    limit = 2 * max(1, get_history_compactor().keep_last)
+    pending = session.trim_task is not None and not session.trim_task.done()
+    if len(session.history) >= limit and not pending:
+        session.trim_task = asyncio.create_task(_trim_history(session))
+
+
+async def handle_session_chat(session: ChatSession, user_input: str) -> ChatResponse:
+    """A turn of a server-side session; see `app.core.chat_sessions`."""
+    async with session.lock:
+        standalone_prompt, _ = await _standalone_prompt(session, user_input)
+        turn = await chat_session_turn(
+            user_input, session.context, session.context_model, standalone_prompt
+        )
+        _finish_turn(session, user_input, turn)
+    return ChatResponse(
+        reply=turn.reply, prompt_tokens=estimate_tokens(turn.prompt), session_id=session.session_id
+    )
 
 
+async def stream_session_chat(session: ChatSession, user_input: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of `handle_session_chat`. The turn is stored only if
+    the stream runs to completion.
+    """
+    async with session.lock:
+        standalone_prompt, expected_tokens = await _standalone_prompt(session, user_input)
+        yield {"type": "meta", "prompt_tokens": expected_tokens, "session_id": session.session_id}
+        items = stream_chat_session_turn(
+            user_input, session.context, session.context_model, standalone_prompt
+        )
+        async for item in items:
+            if isinstance(item, ChatTurn):
+                _finish_turn(session, user_input, item)
+            else:
+                yield {"type": "token", "content": item}
@@ -1,22 +1,21 @@
-from app.core.ai_client import generate_simple_explanation
+from typing import Any, AsyncIterator, Dict
+
 from app.models.checklist import FilingChecklistRequest, FilingChecklistResponse
+from app.services.checklist_templates import checklist_for, stream_checklist_for
 
 
-def generate_filing_checklist(payload: FilingChecklistRequest) -> FilingChecklistResponse:
+async def generate_filing_checklist(payload: FilingChecklistRequest) -> FilingChecklistResponse:
     """
-    Build a human-readable filing checklist for the given profile,
-    powered by the same generate_simple_explanation AI helper.
+    Build a human-readable filing checklist for the given profile from the
+    template for its shape (see `checklist_templates`); the model is only
+    called for shapes without a stored template.
     """
-    profile = payload.profile
-    base_text = (
-        "Create a clear, step-by-step income tax filing checklist for India FY 2024-25. "
-        "Assume this is for an individual taxpayer (no business entity). "
-        "Use short bullet points and simple language. Mention documents, key forms, "
-        "and important decision points (like choosing regime), but do not give legal advice.\n\n"
-        f"Profile JSON:\n{profile.model_dump_json(indent=2)}"
-    )
-    checklist = generate_simple_explanation(base_text)
-    return FilingChecklistResponse(checklist_text=checklist)
-
+    return FilingChecklistResponse(checklist_text=await checklist_for(payload.profile))
 
 
+async def stream_filing_checklist(payload: FilingChecklistRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of `generate_filing_checklist`.
+    """
+    async for token in stream_checklist_for(payload.profile):
+        yield {"type": "token", "content": token}
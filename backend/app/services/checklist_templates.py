@@ -0,0 +1,436 @@
+"""
+Filing checklist templates keyed by profile shape.
+
+A checklist mostly depends on *which* income heads are non-zero, the age
+band, residency and regime choice, not on the exact amounts. A profile is
+therefore reduced to a `ChecklistShape`. The model writes one checklist
+per shape, with `{{field}}` placeholders instead of amounts, and the user's
+amounts are substituted in afterwards.
+
+Templates live in memory in front of a sqlite file
+(CHECKLIST_TEMPLATE_DB_PATH), so they survive restarts and are shared by
+all workers. A background warmup job pre-generates the most common shapes
+at batch priority, and the model is only called inline for unseen shapes.
+Only one worker runs the warmup: it holds a flock on a file next to the
+sqlite store, and the others skip it and read what it writes.
+
+A generated template is only stored when the stream ended cleanly (not
+at the `num_predict` cap) and every placeholder in it resolves; anything
+else is served once and regenerated next time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import product
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.core.ai_client import stream_simple_explanation
+from app.core.config import get_settings
+from app.core.llm_scheduler import Priority
+from app.models.financial import DEDUCTION_COLUMNS, INCOME_COLUMNS, FinancialProfile
+from app.services.financial_extractor import format_inr
+from app.services.tax_logic import _rules_for
+from app.services.tax_rules import get_rule_set, normalize_fy
+
+try:
+    import fcntl
+
+    HAS_FCNTL = True
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+# Bump when the template prompt changes so stale templates are not served
+TEMPLATE_VERSION = 2
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Most common income mixes first; warmup generates them in this order
+_COMMON_INCOME_HEADS: Tuple[Tuple[str, ...], ...] = (
+    ("salary",),
+    ("interest", "salary"),
+    ("capital_gains", "interest", "salary"),
+    ("rental", "salary"),
+    ("business",),
+    ("business", "interest"),
+    ("interest", "rental", "salary"),
+    ("capital_gains", "salary"),
+    ("interest",),
+    ("other", "salary"),
+)
+_COMMON_REGIMES: Tuple[str, ...] = ("compare", "new", "old")
+
+# Free-text spellings folded onto the values a shape may hold, so a new
+# spelling does not cost a generation and a stored template of its own
+_RESIDENCY: Dict[str, str] = {
+    "resident": "resident",
+    "ror": "resident",
+    "resident-and-ordinarily-resident": "resident",
+    "non-resident": "non-resident",
+    "nonresident": "non-resident",
+    "nr": "non-resident",
+    "nri": "non-resident",
+    "rnor": "rnor",
+    "resident-but-not-ordinary": "rnor",
+    "resident-but-not-ordinarily-resident": "rnor",
+    "resident-not-ordinarily-resident": "rnor",
+    "not-ordinarily-resident": "rnor",
+}
+_RESIDENCY_LABELS: Dict[str, str] = {"rnor": "resident but not ordinarily resident (RNOR)"}
+_REGIMES: Dict[str, str] = {"old": "old", "old-regime": "old", "new": "new", "new-regime": "new"}
+
+
+def _fold(value: Optional[str], known: Dict[str, str], default: str) -> str:
+    text = re.sub(r"[\s_]+", "-", (value or "").strip().lower())
+    return known.get(text, default)
+
+
+@dataclass(frozen=True)
+class ChecklistShape:
+    """The parts of a profile a filing checklist actually depends on."""
+
+    jurisdiction: str
+    fy: str
+    resident_status: str
+    age_band: str
+    regime: str
+    income_heads: Tuple[str, ...]
+
+    @property
+    def key(self) -> str:
+        return "|".join(
+            (
+                f"v{TEMPLATE_VERSION}",
+                self.jurisdiction,
+                self.fy,
+                self.resident_status,
+                self.age_band,
+                self.regime,
+                "+".join(self.income_heads) or "none",
+            )
+        )
+
+
+def profile_shape(profile: FinancialProfile) -> ChecklistShape:
+    """Canonicalize a profile into its checklist shape."""
+    return ChecklistShape(
+        jurisdiction=profile.jurisdiction.lower(),
+        fy=normalize_fy(profile.fy),
+        resident_status=_fold(profile.resident_status, _RESIDENCY, "unspecified"),
+        age_band=_rules_for(profile).age_label(profile.age),
+        regime=_fold(profile.regime_preference, _REGIMES, "compare"),
+        income_heads=tuple(
+            sorted(name for name in INCOME_COLUMNS if getattr(profile.income, name) > 0)
+        ),
+    )
+
+
+def template_request_text(shape: ChecklistShape) -> str:
+    """Checklist prompt for a shape; amounts are placeholders, not values."""
+    placeholders = {
+        "income": {name: f"{{{{{name}}}}}" for name in shape.income_heads},
+        "deductions": {name: f"{{{{{name}}}}}" for name in DEDUCTION_COLUMNS},
+    }
+    return (
+        f"Create a clear, step-by-step income tax filing checklist for "
+        f"{shape.jurisdiction.title()} FY {shape.fy}. "
+        "Assume this is for an individual taxpayer (no business entity). "
+        "Use short bullet points and simple language. Mention documents, key forms, "
+        "and important decision points (like choosing regime), but do not give legal advice.\n"
+        "Amounts are given as placeholders such as {{salary}}; when you mention an amount, "
+        "copy its placeholder exactly instead of inventing a number.\n\n"
+        f"Taxpayer: age band {shape.age_band}, "
+        f"residency {_RESIDENCY_LABELS.get(shape.resident_status, shape.resident_status)}, "
+        f"regime preference {shape.regime}.\n"
+        f"Income and deductions: {placeholders}"
+    )
+
+
+def fill_template(template: str, profile: FinancialProfile) -> str:
+    """Substitute the profile's amounts for `{{field}}` placeholders."""
+    values: Dict[str, float] = {
+        **profile.income.model_dump(),
+        **profile.deductions.model_dump(),
+    }
+
+    def amount(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        return format_inr(values[name]) if name in values else match.group(0)
+
+    return _PLACEHOLDER.sub(amount, template)
+
+
+def template_problem(template: str, final: Dict[str, Any]) -> Optional[str]:
+    """
+    Why a generated template must not be stored, or None if it may be.
+    `final` is the last stream chunk (empty for cached or cli output).
+    """
+    if final.get("done_reason") == "length":
+        return "cut off at the token limit"
+    if not template:
+        return "empty"
+    unknown = sorted(
+        {name for name in _PLACEHOLDER.findall(template)}
+        - set(INCOME_COLUMNS)
+        - set(DEDUCTION_COLUMNS)
+    )
+    if unknown:
+        return f"unknown placeholders {unknown}"
+    if "{{" in _PLACEHOLDER.sub("", template):
+        return "unclosed placeholder"
+    return None
+
+
+async def fill_template_stream(
+    fragments: AsyncIterator[str], profile: FinancialProfile, parts: List[str]
+) -> AsyncIterator[str]:
+    """
+    Substitute placeholders in streamed text. Output after an unclosed
+    "{{" is held back until the placeholder completes. The raw fragments
+    are appended to `parts` so the caller can store the template.
+    """
+    pending = ""
+    async for fragment in fragments:
+        parts.append(fragment)
+        pending += fragment
+        cut = pending.rfind("{{")
+        if cut != -1 and "}}" not in pending[cut:]:
+            ready, pending = pending[:cut], pending[cut:]
+        else:
+            ready, pending = pending, ""
+        if ready:
+            yield fill_template(ready, profile)
+    if pending:
+        yield fill_template(pending, profile)
+
+
+class _TemplateStore:
+    """sqlite-backed template table; one connection per thread, WAL mode."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS checklist_templates ("
+            " shape TEXT PRIMARY KEY,"
+            " template TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, shape_key: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT template FROM checklist_templates WHERE shape = ?", (shape_key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, shape_key: str, template: str) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO checklist_templates (shape, template, created_at)"
+            " VALUES (?, ?, ?)",
+            (shape_key, template, time.time()),
+        )
+
+
+class ChecklistTemplates:
+    """
+    Shape-keyed checklist templates: memory dict, then the sqlite store,
+    then the model (whose result is written back to both). The memory
+    dict is an LRU of at most `max_memory` templates.
+    """
+
+    def __init__(self, db_path: str = "", max_memory: int = 256) -> None:
+        self.max_memory = max(1, max_memory)
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._disk = _TemplateStore(db_path) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.warmed = 0
+        self.rejected = 0
+
+    def _remember(self, key: str, template: str) -> None:
+        self._memory[key] = template
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    async def get(self, shape: ChecklistShape) -> Optional[str]:
+        template = self._memory.get(shape.key)
+        if template is not None:
+            self._memory.move_to_end(shape.key)
+        elif self._disk is not None:
+            template = await asyncio.to_thread(self._disk.get, shape.key)
+            if template is not None:
+                self._remember(shape.key, template)
+                self.disk_hits += 1
+        if template is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return template
+
+    async def put(self, shape: ChecklistShape, template: str) -> None:
+        self._remember(shape.key, template)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, shape.key, template)
+
+    async def store(self, shape: ChecklistShape, template: str, final: Dict[str, Any]) -> bool:
+        """`put` a freshly generated template if `template_problem` allows it."""
+        problem = template_problem(template, final)
+        if problem is not None:
+            self.rejected += 1
+            logger.warning("Not storing checklist template for %s: %s", shape.key, problem)
+            return False
+        await self.put(shape, template)
+        return True
+
+    async def _generate(self, shape: ChecklistShape, priority: Priority) -> Tuple[str, bool]:
+        final: Dict[str, Any] = {}
+        fragments = stream_simple_explanation(
+            template_request_text(shape), priority=priority, task="checklist", final=final
+        )
+        template = "".join([fragment async for fragment in fragments]).strip()
+        return template, await self.store(shape, template, final)
+
+    async def generate(self, shape: ChecklistShape, priority: Priority) -> str:
+        return (await self._generate(shape, priority))[0]
+
+    async def warm(self, shapes: Iterable[ChecklistShape]) -> None:
+        """Generate templates for shapes not in the store yet, one at a time."""
+        for shape in shapes:
+            if shape.key in self._memory:
+                continue
+            if self._disk is not None:
+                stored = await asyncio.to_thread(self._disk.get, shape.key)
+                if stored is not None:
+                    self._remember(shape.key, stored)
+                    continue
+            try:
+                _, stored = await self._generate(shape, Priority.BATCH)
+                self.warmed += stored
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # the model is likely unavailable; retry on next start
+                logger.warning("Checklist warmup stopped at shape %s", shape.key, exc_info=True)
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "templates_in_memory": len(self._memory),
+            "max_memory": self.max_memory,
+            "disk_backend": self._disk.path if self._disk is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "warmed": self.warmed,
+            "rejected": self.rejected,
+        }
+
+
+def common_shapes(limit: int) -> List[ChecklistShape]:
+    """The most common shapes under the default jurisdiction/FY, most common first."""
+    settings = get_settings()
+    rules = get_rule_set().compiled
+    bands = [band.label for band in rules.age_bands] or ["adult"]
+    shapes = [
+        ChecklistShape(
+            jurisdiction=settings.tax_default_jurisdiction.lower(),
+            fy=normalize_fy(settings.tax_default_fy),
+            resident_status="resident",
+            age_band=band,
+            regime=regime,
+            income_heads=heads,
+        )
+        for regime, band, heads in product(_COMMON_REGIMES, bands, _COMMON_INCOME_HEADS)
+    ]
+    return shapes[:limit]
+
+
+async def run_warmup() -> None:
+    """
+    Background job started from the app lifespan. With a sqlite store, only
+    the worker that gets the warmup lock runs it; the lock is released when
+    the job ends (or the worker exits), so a restart warms what is missing.
+    """
+    settings = get_settings()
+    templates = get_checklist_templates()  # creates the store's directory
+    shapes = common_shapes(settings.checklist_warmup_max_shapes)
+    db_path = settings.checklist_template_db_path
+    if not db_path or not HAS_FCNTL:
+        await templates.warm(shapes)
+        return
+
+    fd = os.open(f"{db_path}.warmup.lock", os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Checklist warmup already running in another worker")
+            return
+        await templates.warm(shapes)
+    finally:
+        os.close(fd)  # also releases the flock
+
+
+@lru_cache(maxsize=1)
+def get_checklist_templates() -> ChecklistTemplates:
+    settings = get_settings()
+    return ChecklistTemplates(
+        db_path=settings.checklist_template_db_path,
+        max_memory=settings.checklist_template_memory_entries,
+    )
+
+
+async def checklist_for(profile: FinancialProfile) -> str:
+    """Checklist text for `profile`, generating its shape's template if unseen."""
+    shape = profile_shape(profile)
+    templates = get_checklist_templates()
+    template = await templates.get(shape)
+    if template is None:
+        # Long generation: queued behind interactive chat turns
+        template = await templates.generate(shape, Priority.BATCH)
+    return fill_template(template, profile)
+
+
+async def stream_checklist_for(profile: FinancialProfile) -> AsyncIterator[str]:
+    """Streaming `checklist_for`: a stored template is sent in one piece."""
+    shape = profile_shape(profile)
+    templates = get_checklist_templates()
+    template = await templates.get(shape)
+    if template is not None:
+        yield fill_template(template, profile)
+        return
+
+    parts: List[str] = []
+    final: Dict[str, Any] = {}
+    fragments = stream_simple_explanation(
+        template_request_text(shape), priority=Priority.BATCH, task="checklist", final=final
+    )
+    async for text in fill_template_stream(fragments, profile, parts):
+        yield text
+    await templates.store(shape, "".join(parts).strip(), final)
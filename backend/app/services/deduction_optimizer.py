@@ -0,0 +1,194 @@
+"""
+Tax-minimizing deduction allocation, independent from AI.
+
+Every rupee claimed under 80C, 80D, 80CCD(1B) or 24(b) lowers taxable
+income by one rupee, so the saving of a rupee depends only on where the
+taxable income currently sits in the slab/surcharge tables. The optimizer
+therefore walks taxable income downwards from its current value: each
+section's headroom (cap minus what is already claimed) is filled in turn,
+the first rupees at the highest marginal rate, and allocation stops once
+the remaining rupees would fall into a zero-rate slab or the budget runs
+out. Both regimes are evaluated this way and the cheaper one wins.
+Savings and the reported marginal rate both come from the full tax
+(slabs, surcharge and cess), so a deduction that drops income below a
+surcharge threshold shows the surcharge it saves.
+
+Only scalar arithmetic over the compiled rule tables is involved, so a
+full optimization runs in well under a millisecond.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.core.metrics import timed_tax_call
+from app.models.financial import FinancialProfile
+from app.models.tax import (
+    DeductionAllocation,
+    DeductionOptimizationResponse,
+    TaxRegime,
+)
+from app.services.tax_logic import (
+    _apply_deduction_caps_new_regime,
+    _apply_deduction_caps_old_regime,
+    _compute_gross_total_income,
+    _compute_tax_components,
+    _rules_for,
+)
+from app.services.tax_rules import CompiledRules
+
+# (section, DeductionInputs field, label), in tie-break order: all sections
+# save the same per rupee, so earlier sections receive the higher-rate rupees.
+_SECTIONS: Tuple[Tuple[str, str, str], ...] = (
+    ("80C", "section_80c", "Investments under Section 80C"),
+    ("80D", "section_80d", "Health insurance premium (self/family)"),
+    ("80CCD(1B)", "nps_80ccd1b", "Additional NPS contribution"),
+    ("24(b)", "section_24b", "Home loan interest (self-occupied)"),
+)
+
+
+@dataclass
+class _RegimePlan:
+    regime: TaxRegime
+    allocations: List[DeductionAllocation]
+    total_additional: float
+    current_tax: float
+    optimized_tax: float
+
+
+def _section_caps(regime: TaxRegime, rules: CompiledRules) -> List[Tuple[str, str, str, float]]:
+    """Sections that reduce taxable income under `regime`, with their caps."""
+    if regime == "new":
+        return [
+            (section, field, label, rules.new_caps.nps_80ccd1b)
+            for section, field, label in _SECTIONS
+            if field == "nps_80ccd1b"
+        ]
+    return [
+        (section, field, label, getattr(rules.old_caps, field))
+        for section, field, label in _SECTIONS
+    ]
+
+
+def _untaxed_floor(regime: TaxRegime, rules: CompiledRules) -> float:
+    """Taxable income below which further deductions save nothing."""
+    slabs = rules.slabs(regime)
+    for lower, rate in zip(slabs.lowers, slabs.rates):
+        if rate > 0:
+            return lower
+    return math.inf
+
+
+# Width of the step the marginal rate is measured over; wide enough that
+# rounding tax to the rupee does not distort it
+_RATE_PROBE = 1000.0
+
+
+def _total_tax(regime: TaxRegime, taxable_income: float, rules: CompiledRules) -> float:
+    return _compute_tax_components(regime, max(taxable_income, 0.0), rules)[2]
+
+
+def _marginal_rate(
+    regime: TaxRegime, taxable_income: float, step: float, rules: CompiledRules
+) -> float:
+    """Total tax saved per rupee over the first `step` rupees deducted."""
+    step = min(step, taxable_income)
+    if step <= 0:
+        return 0.0
+    saved = _total_tax(regime, taxable_income, rules) - _total_tax(
+        regime, taxable_income - step, rules
+    )
+    return saved / step
+
+
+def _plan_regime(
+    profile: FinancialProfile,
+    regime: TaxRegime,
+    budget: Optional[float],
+    rules: CompiledRules,
+) -> _RegimePlan:
+    gross_total_income = _compute_gross_total_income(profile)
+    if regime == "old":
+        claimed, _warnings = _apply_deduction_caps_old_regime(profile, rules)
+    else:
+        claimed, _warnings = _apply_deduction_caps_new_regime(profile, rules)
+    taxable_income = max(gross_total_income - claimed, 0.0)
+    current_tax = _total_tax(regime, taxable_income, rules)
+
+    # Rupees below the zero-rate slab (or beyond the budget) save nothing
+    remaining = max(taxable_income - _untaxed_floor(regime, rules), 0.0)
+    if budget is not None:
+        remaining = min(remaining, budget)
+
+    allocations: List[DeductionAllocation] = []
+    running_tax = current_tax
+    for section, field, label, cap in _section_caps(regime, rules):
+        current = min(getattr(profile.deductions, field), cap)
+        additional = min(max(cap - current, 0.0), remaining)
+        if additional <= 0:
+            continue
+        # Rate on the first rupees deducted, surcharge and cess included
+        marginal_rate = _marginal_rate(
+            regime, taxable_income, min(additional, _RATE_PROBE), rules
+        )
+        taxable_income -= additional
+        remaining -= additional
+        new_tax = _total_tax(regime, taxable_income, rules)
+        allocations.append(
+            DeductionAllocation(
+                section=section,
+                label=label,
+                current_amount=current,
+                additional_amount=additional,
+                cap=cap if math.isfinite(cap) else None,
+                tax_saving=round(running_tax - new_tax, 2),
+                marginal_rate_percent=round(marginal_rate * 100, 2),
+            )
+        )
+        running_tax = new_tax
+
+    return _RegimePlan(
+        regime=regime,
+        allocations=allocations,
+        total_additional=sum(a.additional_amount for a in allocations),
+        current_tax=current_tax,
+        optimized_tax=running_tax,
+    )
+
+
+@timed_tax_call("optimize_deductions")
+def optimize_deductions(
+    profile: FinancialProfile,
+    budget: Optional[float] = None,
+    regime: Optional[TaxRegime] = None,
+) -> DeductionOptimizationResponse:
+    """
+    Allocate `budget` (or all remaining headroom) across deduction sections
+    to minimize total tax, under `regime` or under whichever regime ends
+    up cheaper after optimization.
+    """
+    rules = _rules_for(profile)
+    plans = {
+        name: _plan_regime(profile, name, budget, rules)
+        for name in ("old", "new")
+        if regime in (None, name)
+    }
+    if regime is None:
+        # Same tie-break as `compare_regimes`
+        best = plans["old"] if plans["old"].optimized_tax < plans["new"].optimized_tax else plans["new"]
+    else:
+        best = plans[regime]
+    other = next((plan for plan in plans.values() if plan is not best), None)
+
+    return DeductionOptimizationResponse(
+        regime=best.regime,
+        allocations=best.allocations,
+        total_additional_amount=best.total_additional,
+        unused_budget=None if budget is None else budget - best.total_additional,
+        current_total_tax=best.current_tax,
+        optimized_total_tax=best.optimized_tax,
+        tax_saving=round(best.current_tax - best.optimized_tax, 2),
+        other_regime_optimized_total_tax=other.optimized_tax if other else None,
+    )
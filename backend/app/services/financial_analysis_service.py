@@ -1,20 +1,101 @@
-from app.core.ai_client import classify_financial_info, generate_simple_explanation
+"""
+/analyze_financials: free text -> structured hints + plain-language explanation.
+
+Classification runs in stages. The deterministic extractor in
+`financial_extractor` goes first, and the model is only asked when the
+rules' confidence is below ANALYZE_FAST_PATH_MIN_CONFIDENCE. The
+explanation prompt is built from a canonical (key-sorted) dump of the
+structured result, so an unchanged interpretation reuses the cached
+explanation instead of generating a new one.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict
+
+from app.core.ai_client import (
+    cached_simple_explanation,
+    classify_financial_info,
+    generate_simple_explanation,
+    stream_simple_explanation,
+)
+from app.core.config import get_settings
 from app.models.financial import AnalyzeFinancialsRequest, AnalyzeFinancialsResponse
+from app.services.financial_extractor import extract_financial_info
+
+
+class AnalysisStageStats:
+    """Per-stage hit counters: a hit means the stage answered without a fresh generation."""
+
+    def __init__(self) -> None:
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def record(self, stage: str, hit: bool) -> None:
+        self._counts[stage]["hits" if hit else "misses"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "hits": entry["hits"],
+                "misses": entry["misses"],
+                "hit_rate": round(entry["hits"] / (entry["hits"] + entry["misses"]), 4),
+            }
+            for stage, entry in self._counts.items()
+        }
+
 
+analysis_stats = AnalysisStageStats()
 
-def analyze_financials(payload: AnalyzeFinancialsRequest) -> AnalyzeFinancialsResponse:
+
+def _explanation_request_text(structured: Dict[str, Any]) -> str:
+    return "Here is how we interpreted your financial information: " + json.dumps(
+        structured, sort_keys=True, ensure_ascii=False
+    )
+
+
+async def _classify(raw_text: str) -> Dict[str, Any]:
+    """Rule-based extraction, escalating to the model on low confidence."""
+    settings = get_settings()
+    if settings.analyze_fast_path_enabled:
+        extraction = extract_financial_info(raw_text)
+        confident = extraction.confidence >= settings.analyze_fast_path_min_confidence
+        analysis_stats.record("rules", confident)
+        if confident:
+            return extraction.structured
+    return await classify_financial_info(raw_text)
+
+
+async def analyze_financials(payload: AnalyzeFinancialsRequest) -> AnalyzeFinancialsResponse:
     """
     Use the AI layer to turn free-form text into structured hints
     about income sources, deductions, etc.
     """
-    structured = classify_financial_info(payload.raw_text)
-    explanation = generate_simple_explanation(
-        "Here is how we interpreted your financial information: " + str(structured)
-    )
+    structured = await _classify(payload.raw_text)
+    text = _explanation_request_text(structured)
+    explanation = await cached_simple_explanation(text)
+    analysis_stats.record("explanation", explanation is not None)
+    if explanation is None:
+        explanation = await generate_simple_explanation(text)
     return AnalyzeFinancialsResponse(
         structured_financial_info=structured,
         explanation=explanation,
     )
 
 
-
+async def stream_analyze_financials(payload: AnalyzeFinancialsRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of `analyze_financials`: the structured classification
+    is sent as one event, followed by the explanation token by token.
+    """
+    structured = await _classify(payload.raw_text)
+    yield {"type": "structured", "data": structured}
+    text = _explanation_request_text(structured)
+    explanation = await cached_simple_explanation(text)
+    analysis_stats.record("explanation", explanation is not None)
+    if explanation is not None:
+        yield {"type": "token", "content": explanation}
+        return
+    async for token in stream_simple_explanation(text):
+        yield {"type": "token", "content": token}
@@ -0,0 +1,270 @@
+"""
+Deterministic, rule-based extraction of financial hints from free text.
+
+First stage of `/analyze_financials`: regex and keyword matching for the
+things users typically mention ("12 lakh salary", "1.5L in PPF",
+"home loan interest 2,00,000", "sold shares") produces the same
+structured shape the classification model returns. Each rule match
+carries the amounts found next to it.
+
+The input is split into clauses. A clause is a *signal* if it has an
+amount, a category keyword or a generic money word ("earn", "invest",
+"paid", ...). Confidence is the share of signal clauses that a category
+rule explains, so text the rules only partly understand is escalated to
+the model.
+
+A negated clause ("no home loan", "I don't have any 80C investments")
+never yields a match: without an amount it is understood as "not
+applicable" and listed in the notes, and with an amount it is ambiguous
+("no idea how much home loan interest, maybe 2L") and left to the model.
+A clause with a number the amount grammar cannot read as a whole (e.g.
+"1,20,0000") is left to the model as well, instead of dropping the amount.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+_UNIT_MULTIPLIERS = {
+    "k": 1e3,
+    "thousand": 1e3,
+    "l": 1e5,
+    "lac": 1e5,
+    "lacs": 1e5,
+    "lakh": 1e5,
+    "lakhs": 1e5,
+    "lpa": 1e5,
+    "cr": 1e7,
+    "crore": 1e7,
+    "crores": 1e7,
+}
+
+_AMOUNT = re.compile(
+    r"""
+    (?P<currency>₹|\brs\.?|\binr)?\s*
+    (?P<number>\d+(?:,\d{2,3})*(?:\.\d+)?)
+    \s*(?P<unit>lakhs?|lacs?|lpa|crores?|cr|thousand|k|l)?
+    (?![\w(])
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Splits on sentence/clause boundaries without breaking "1,50,000" or "1.5"
+_CLAUSE_SPLIT = re.compile(r"[.;\n]+(?!\d)|,(?!\d)|\b(?:and|plus|also|but)\b", re.IGNORECASE)
+
+_NEGATION = re.compile(
+    r"\b(?:no|not|never|none|nil|without|neither|nor|dont|doesnt|didnt|havent|hasnt)\b|n['’]t\b",
+    re.IGNORECASE,
+)
+
+# Digit runs with their separators; one that is not validly grouped is a typo
+_NUMBER_TOKEN = re.compile(r"\d[\d,]*\d|\d")
+_WELL_GROUPED = re.compile(r"^\d+$|^\d{1,3}(?:,\d{3})+$|^\d{1,2}(?:,\d{2})*,\d{3}$")
+
+_MONEY_WORDS = re.compile(
+    r"\b(?:income|earn\w*|salar\w*|received|invest\w*|paid|pay\w*|loan|gains?|profit\w*|"
+    r"deduct\w*|claim\w*|exempt\w*|tax\w*|deposit\w*|spent|premium)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class _Rule:
+    category: str
+    label: str
+    pattern: Pattern[str]
+    # The rule is ignored in clauses that also match this pattern
+    unless: Optional[Pattern[str]] = None
+
+
+def _rule(category: str, label: str, pattern: str, unless: Optional[str] = None) -> _Rule:
+    return _Rule(
+        category=category,
+        label=label,
+        pattern=re.compile(pattern, re.IGNORECASE),
+        unless=re.compile(unless, re.IGNORECASE) if unless else None,
+    )
+
+
+_LOAN = r"\b(?:home|housing|education|car|personal)\s+loan\b"
+
+_RULES: Tuple[_Rule, ...] = (
+    # Income heads
+    _rule("income_sources", "Salary", r"\bsalar(?:y|ied|ies)\b|\bctc\b|\blpa\b|\bpayslip\b"),
+    _rule(
+        "income_sources",
+        "Business/professional income",
+        r"\bbusiness\b|\bfreelanc\w*|\bconsult\w*|\bprofessional\s+(?:income|fees?)\b|\bshop\b",
+    ),
+    _rule(
+        "income_sources",
+        "Interest income (FD/savings)",
+        r"\bfds?\b|\bfixed\s+deposits?\b|\brecurring\s+deposits?\b|\bsavings?\s+(?:account|bank)\b|\binterest\b",
+        unless=_LOAN,
+    ),
+    _rule(
+        "income_sources",
+        "Rental income",
+        r"\brental\s+income\b|\brent\s+(?:received|income)\b|\blet\s+out\b|\btenants?\b|\breceive\w*\s+rent\b",
+    ),
+    _rule("income_sources", "Dividend income", r"\bdividends?\b"),
+    _rule("income_sources", "Pension", r"\bpension\b"),
+    # Deductions
+    _rule("deductions", "80C", r"\b80\s*-?\s*c\b"),
+    _rule("deductions", "80C: PPF", r"\bppf\b|\bpublic\s+provident\s+fund\b"),
+    _rule("deductions", "80C: ELSS", r"\belss\b|\btax[\s-]*saver\s+(?:mutual\s+)?funds?\b"),
+    _rule("deductions", "80C: EPF", r"\bepf\b|\bemployee'?s?\s+provident\s+fund\b|\bpf\s+contribution\b"),
+    _rule("deductions", "80C: Life insurance premium", r"\blic\b|\blife\s+insurance\b|\bterm\s+(?:insurance|plan)\b"),
+    _rule("deductions", "80C: Children's tuition fees", r"\btuition\b"),
+    _rule("deductions", "80C: Sukanya Samriddhi", r"\bsukanya\b|\bssy\b"),
+    _rule("deductions", "80C: Tax-saving FD", r"\btax[\s-]*sav\w*\s+fds?\b"),
+    _rule(
+        "deductions",
+        "80D: Health insurance premium",
+        r"\b80\s*-?\s*d\b|\bhealth\s+insurance\b|\bmedical\s+insurance\b|\bmediclaim\b",
+    ),
+    _rule("deductions", "80CCD(1B): NPS contribution", r"\bnps\b|\bnational\s+pension\b|\b80\s*ccd"),
+    _rule(
+        "deductions",
+        "24(b): Home loan interest",
+        r"\b(?:home|housing)\s+loan\b|\b24\s*\(?b\)?(?!\w)",
+    ),
+    _rule("deductions", "80E: Education loan interest", r"\beducation\s+loan\b|\b80\s*-?\s*e\b"),
+    _rule("deductions", "80G: Donations", r"\bdonat\w*|\b80\s*-?\s*g\b|\bcharit\w*"),
+    _rule("deductions", "HRA / rent paid", r"\bhra\b|\brent\s+paid\b|\bpay(?:ing)?\s+rent\b"),
+    # Capital gains
+    _rule(
+        "capital_gains",
+        "Capital gains",
+        r"\bcapital\s+gains?\b|\bltcg\b|\bstcg\b|\bsold\b|\bsale\s+of\b|\bredeem\w*|\bredemption\b|\bcrypto\w*",
+    ),
+)
+
+# Ignore bare numbers like ages and years unless they carry a currency or unit
+_MIN_BARE_AMOUNT = 1000.0
+
+
+@dataclass
+class Extraction:
+    """Result of the rule-based stage."""
+
+    structured: Dict[str, Any]
+    confidence: float
+    signal_clauses: int = 0
+    matched_clauses: int = 0
+    unmatched: List[str] = field(default_factory=list)
+
+
+def parse_amounts(text: str) -> List[Tuple[int, float]]:
+    """
+    (position, rupees) for each amount in `text`, understanding ₹/Rs/INR,
+    Indian digit grouping and lakh/crore/k suffixes.
+    """
+    amounts: List[Tuple[int, float]] = []
+    for match in _AMOUNT.finditer(text):
+        number = float(match.group("number").replace(",", ""))
+        unit = (match.group("unit") or "").lower()
+        if unit:
+            number *= _UNIT_MULTIPLIERS[unit]
+        elif not match.group("currency"):
+            if number < _MIN_BARE_AMOUNT or (1900 <= number <= 2100 and "," not in match.group("number")):
+                continue
+        amounts.append((match.start("number"), number))
+    return amounts
+
+
+def format_inr(amount: float) -> str:
+    """₹ with Indian digit grouping, e.g. 1500000 -> ₹15,00,000."""
+    whole = f"{round(amount):d}"
+    if len(whole) > 3:
+        head, tail = whole[:-3], whole[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        whole = ",".join(groups + [tail])
+    return f"₹{whole}"
+
+
+def _clauses(text: str) -> List[str]:
+    return [part.strip() for part in _CLAUSE_SPLIT.split(text) if part and part.strip()]
+
+
+def _has_malformed_number(clause: str) -> bool:
+    return any(not _WELL_GROUPED.match(token) for token in _NUMBER_TOKEN.findall(clause))
+
+
+def extract_financial_info(raw_text: str) -> Extraction:
+    """
+    Rule-based classification of `raw_text` into the structure produced by
+    `classify_financial_info`, with a confidence in [0, 1].
+    """
+    found: Dict[str, Dict[str, float]] = {
+        "income_sources": {},
+        "deductions": {},
+        "capital_gains": {},
+    }
+    signal_clauses = 0
+    matched_clauses = 0
+    unmatched: List[str] = []
+    not_applicable: List[str] = []
+
+    for clause in _clauses(raw_text):
+        amounts = parse_amounts(clause)
+        hits: List[Tuple[int, _Rule]] = []
+        for rule in _RULES:
+            if rule.unless is not None and rule.unless.search(clause):
+                continue
+            match = rule.pattern.search(clause)
+            if match:
+                hits.append((match.start(), rule))
+
+        if not (hits or amounts or _MONEY_WORDS.search(clause)):
+            continue
+        signal_clauses += 1
+        if not hits or _has_malformed_number(clause):
+            unmatched.append(clause)
+            continue
+        if _NEGATION.search(clause):
+            if amounts:
+                unmatched.append(clause)
+                continue
+            matched_clauses += 1
+            not_applicable.extend(rule.label for _, rule in hits if rule.label not in not_applicable)
+            continue
+        matched_clauses += 1
+
+        for _position, rule in hits:
+            found[rule.category].setdefault(rule.label, 0.0)
+        # Each amount belongs to the nearest keyword in its clause
+        for position, value in amounts:
+            _, nearest = min(hits, key=lambda hit: abs(hit[0] - position))
+            found[nearest.category][nearest.label] += value
+
+    structured: Dict[str, Any] = {}
+    for category, labels in found.items():
+        if labels:
+            structured[category] = [
+                f"{label}: {format_inr(amount)}" if amount else label
+                for label, amount in labels.items()
+            ]
+    notes = []
+    if not_applicable:
+        notes.append("Stated as not applicable: " + "; ".join(not_applicable) + ".")
+    if unmatched:
+        notes.append("Could not interpret: " + "; ".join(unmatched))
+    if notes:
+        structured["notes"] = " ".join(notes)
+
+    confidence = matched_clauses / signal_clauses if signal_clauses else 0.0
+    return Extraction(
+        structured=structured,
+        confidence=confidence,
+        signal_clauses=signal_clauses,
+        matched_clauses=matched_clauses,
+        unmatched=unmatched,
+    )
@@ -0,0 +1,229 @@
+"""
+What-if sweeps and exact regime breakeven points.
+
+A sweep varies one or two income/deduction fields of a base profile over a
+grid, evaluates both regimes for every grid point in one vectorized pass
+(via `tax_batch`), and solves the old/new breakeven points along the x
+axis analytically instead of scanning the grid.
+
+Breakeven solving uses the structure of the rules: along x, taxable income
+is piecewise linear (kinks at deduction caps and at zero), slab tax is
+piecewise linear (kinks at slab boundaries) and surcharge is piecewise
+constant (jumps at thresholds). Between consecutive breakpoints the
+old-minus-new difference is therefore linear, and each piece is solved in
+closed form. Crossings use unrounded amounts; the grid values are rounded
+exactly like `/calculate_tax`.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import timed_tax_call
+from app.models.financial import INCOME_COLUMNS, FinancialProfile
+from app.models.tax import (
+    RegimeBreakeven,
+    RegimeCrossing,
+    RegimeSweepRequest,
+    RegimeSweepResponse,
+    SweepAxis,
+    TaxRegime,
+)
+from app.services.tax_batch import compute_tax_batch, profiles_to_columns
+from app.services.tax_logic import (
+    _apply_deduction_caps_new_regime,
+    _apply_deduction_caps_old_regime,
+    _compute_gross_total_income,
+    _rules_for,
+)
+from app.services.tax_rules import CompiledRules
+
+# Differences below this many rupees count as "equal"
+_TOLERANCE = 1e-6
+
+
+@dataclass(frozen=True)
+class _TaxableLine:
+    """taxable_income(x) = max(intercept + slope * min(x, cap), 0)."""
+
+    intercept: float
+    slope: float
+    cap: float
+
+    def at(self, x: float) -> float:
+        return max(self.intercept + self.slope * min(x, self.cap), 0.0)
+
+    def breakpoints(self, levels: List[float]) -> List[float]:
+        """x values where taxable income reaches each level (or the cap kicks in)."""
+        points = [self.cap] if math.isfinite(self.cap) else []
+        if self.slope:
+            for level in levels:
+                x = (level - self.intercept) / self.slope
+                if x <= self.cap:
+                    points.append(x)
+        return points
+
+
+def _with_field(profile: FinancialProfile, field: str, value: float) -> FinancialProfile:
+    if field in INCOME_COLUMNS:
+        return profile.model_copy(update={"income": profile.income.model_copy(update={field: value})})
+    return profile.model_copy(
+        update={"deductions": profile.deductions.model_copy(update={field: value})}
+    )
+
+
+def _taxable_line(
+    profile: FinancialProfile, field: str, regime: TaxRegime, rules: CompiledRules
+) -> _TaxableLine:
+    """Taxable income of `regime` as a function of `field`, other inputs fixed."""
+    base = _with_field(profile, field, 0.0)
+    gross = _compute_gross_total_income(base)
+    if regime == "old":
+        deductions, _warnings = _apply_deduction_caps_old_regime(base, rules)
+    else:
+        deductions, _warnings = _apply_deduction_caps_new_regime(base, rules)
+    intercept = gross - deductions
+
+    if field in INCOME_COLUMNS:
+        return _TaxableLine(intercept, 1.0, math.inf)
+    if regime == "new":
+        if field == "nps_80ccd1b":
+            return _TaxableLine(intercept, -1.0, rules.new_caps.nps_80ccd1b)
+        return _TaxableLine(intercept, 0.0, math.inf)
+    caps = rules.old_caps
+    cap = getattr(caps, field, math.inf)
+    return _TaxableLine(intercept, -1.0, cap)
+
+
+def _total_tax(taxable_income: float, regime: TaxRegime, rules: CompiledRules) -> float:
+    """Unrounded slab tax + surcharge + cess."""
+    slab_tax = rules.slabs(regime).tax(taxable_income)
+    surcharge_rate = rules.surcharge.rate(taxable_income)
+    return slab_tax * (1 + surcharge_rate / 100.0) * (1 + rules.cess_percent / 100.0)
+
+
+def solve_breakevens(
+    profile: FinancialProfile, field: str, start: float, stop: float
+) -> List[RegimeCrossing]:
+    """
+    Exact points in [start, stop] where old and new regime totals cross
+    as `field` varies.
+    """
+    rules = _rules_for(profile)
+    lines = {
+        regime: _taxable_line(profile, field, regime, rules) for regime in ("old", "new")
+    }
+
+    points = {start, stop}
+    for regime, line in lines.items():
+        levels = [0.0]
+        levels.extend(rules.slabs(regime).lowers)
+        levels.extend(rules.surcharge.thresholds)
+        points.update(p for p in line.breakpoints(levels) if start < p < stop)
+    ordered = sorted(points)
+
+    def diff(x: float) -> float:
+        return _total_tax(lines["old"].at(x), "old", rules) - _total_tax(
+            lines["new"].at(x), "new", rules
+        )
+
+    def sign(value: float) -> int:
+        return 0 if abs(value) <= _TOLERANCE else (1 if value > 0 else -1)
+
+    crossings: List[RegimeCrossing] = []
+    last_sign = 0
+    last_zero_from: Optional[float] = None
+
+    def observe(x: float, value: float) -> None:
+        nonlocal last_sign, last_zero_from
+        current = sign(value)
+        if current == 0:
+            if last_zero_from is None:
+                last_zero_from = x
+            return
+        if last_sign and current != last_sign:
+            at = last_zero_from if last_zero_from is not None else x
+            crossings.append(RegimeCrossing(x=round(at, 2), old_cheaper_above=current < 0))
+        last_sign = current
+        last_zero_from = None
+
+    if len(ordered) == 1:
+        observe(start, diff(start))
+        return crossings
+
+    for left, right in zip(ordered, ordered[1:]):
+        # The difference is linear on the open interval (left, right);
+        # fit it from two interior points and solve for its root.
+        q1 = left + (right - left) / 3
+        q2 = left + 2 * (right - left) / 3
+        d1, d2 = diff(q1), diff(q2)
+        slope = (d2 - d1) / (q2 - q1)
+        at_left = d1 - slope * (q1 - left)
+        at_right = d2 + slope * (right - q2)
+
+        if left == start:
+            observe(left, diff(left))
+        observe(left, at_left)
+        if sign(at_left) and sign(at_right) and sign(at_left) != sign(at_right):
+            observe(q1 - d1 / slope, 0.0)
+        observe(right, at_right)
+    observe(stop, diff(stop))
+    return crossings
+
+
+def _axis_values(axis: SweepAxis) -> np.ndarray:
+    return np.linspace(axis.start, axis.stop, axis.steps)
+
+
+@timed_tax_call("sweep_regimes")
+def sweep_regimes(payload: RegimeSweepRequest) -> RegimeSweepResponse:
+    """
+    Evaluate both regimes over the requested grid in one vectorized pass
+    and solve the breakeven points along x for every y value.
+    """
+    profile = payload.profile
+    rules = _rules_for(profile)
+    x_values = _axis_values(payload.x)
+    y_values: Optional[np.ndarray] = _axis_values(payload.y) if payload.y else None
+
+    rows = 1 if y_values is None else len(y_values)
+    size = rows * len(x_values)
+    base = profiles_to_columns([profile])
+    columns: Dict[str, np.ndarray] = {name: np.repeat(values, size) for name, values in base.items()}
+    columns[payload.x.field] = np.tile(x_values, rows)
+    if payload.y is not None and y_values is not None:
+        columns[payload.y.field] = np.repeat(y_values, len(x_values))
+
+    surfaces: Dict[str, List[List[float]]] = {}
+    for regime in ("old", "new"):
+        total = compute_tax_batch(columns, regime, rules)["total_tax"]
+        surfaces[regime] = total.reshape(rows, len(x_values)).tolist()
+
+    row_profiles: List[Tuple[Optional[float], FinancialProfile]] = [(None, profile)]
+    if payload.y is not None and y_values is not None:
+        row_profiles = [
+            (float(y), _with_field(profile, payload.y.field, float(y))) for y in y_values
+        ]
+
+    low, high = sorted((payload.x.start, payload.x.stop))
+    breakevens = [
+        RegimeBreakeven(
+            y=y,
+            crossings=solve_breakevens(row_profile, payload.x.field, low, high),
+        )
+        for y, row_profile in row_profiles
+    ]
+
+    return RegimeSweepResponse(
+        x_field=payload.x.field,
+        x_values=x_values.tolist(),
+        y_field=payload.y.field if payload.y else None,
+        y_values=y_values.tolist() if y_values is not None else None,
+        old_total_tax=surfaces["old"],
+        new_total_tax=surfaces["new"],
+        breakevens=breakevens,
+    )
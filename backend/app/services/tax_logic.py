@@ -2,41 +2,38 @@
 Pure tax computation utilities, independent from AI.
 
 These implement simplified versions of Indian income tax slabs for
-FY 2024-25 (AY 2025-26) for demonstration purposes.
+FY 2024-25 (AY 2025-26) for demonstration purposes. Rules are looked up
+in the rule registry by the profile's jurisdiction and financial year.
 Do NOT treat this as production-grade tax advice.
 """
 
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
-
-import json
-import os
+from typing import Dict, List, Optional, Tuple
 
+from app.core.metrics import timed_tax_call
 from app.models.financial import FinancialProfile
-from app.models.tax import RegimeTaxBreakdown
-
-_RULES_CACHE: Dict[str, object] | None = None
+from app.models.tax import RegimeTaxBreakdown, TaxComputationResponse, TaxRegime
+from app.services.tax_rules import CompiledRules, SlabTable, get_rule_set
 
 
-def _load_rules() -> Dict[str, object]:
+def _get_compiled_rules(
+    fy: Optional[str] = None, jurisdiction: Optional[str] = None
+) -> CompiledRules:
     """
-    Load tax rules JSON once and cache in memory.
+    Compiled rule tables for (jurisdiction, fy); defaults to the configured
+    jurisdiction and financial year.
     """
-    global _RULES_CACHE
-    if _RULES_CACHE is None:
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        path = os.path.join(base_dir, "data", "tax_rules_2024_25_india.json")
-        with open(path, "r", encoding="utf-8") as f:
-            _RULES_CACHE = json.load(f)
-    return _RULES_CACHE  # type: ignore[return-value]
+    return get_rule_set(fy, jurisdiction).compiled
+
+
+def _rules_for(profile: FinancialProfile) -> CompiledRules:
+    return get_rule_set(profile.fy, profile.jurisdiction).compiled
 
 
-def _compute_cess(amount: float) -> float:
+def _compute_cess(amount: float, rules: Optional[CompiledRules] = None) -> float:
     """Health & education cess from rules (default 4%)."""
-    rules = _load_rules()
-    cess_cfg = rules.get("cess", {})
-    rate_percent = cess_cfg.get("health_education_cess_percent", 4)
+    rate_percent = (rules or _get_compiled_rules()).cess_percent
     return round(amount * rate_percent / 100.0, 2)
 
 
@@ -45,34 +42,27 @@ def _round_tax(amount: float) -> float:
     return round(amount, 0)
 
 
-def _get_surcharge_rate(taxable_income: float) -> float:
+def _get_surcharge_rate(taxable_income: float, rules: Optional[CompiledRules] = None) -> float:
     """
     Basic surcharge rate lookup based on taxable income.
     Uses simplified demo bands from JSON.
     """
-    rules = _load_rules()
-    surcharge_cfg = rules.get("surcharge", {})
-    bands: List[Dict[str, float]] = surcharge_cfg.get("bands", [])
-    rate = 0.0
-    for band in bands:
-        threshold = float(band.get("threshold", 0))
-        if taxable_income > threshold:
-            rate = float(band.get("rate_percent", 0))
-    return rate
-
-
-def _apply_deduction_caps_old_regime(profile: FinancialProfile) -> Tuple[float, List[str]]:
+    return (rules or _get_compiled_rules()).surcharge.rate(taxable_income)
+
+
+def _apply_deduction_caps_old_regime(
+    profile: FinancialProfile, rules: Optional[CompiledRules] = None
+) -> Tuple[float, List[str]]:
     """
     Apply deduction caps for old regime using JSON rules.
     Returns: (total_deductions, warnings)
     """
-    rules = _load_rules()
-    deductions_cfg = rules.get("old_regime", {}).get("common_deductions", {})
+    caps = (rules or _rules_for(profile)).old_caps
     d = profile.deductions
     warnings: List[str] = []
 
     # 80C
-    max_80c = float(deductions_cfg.get("80C", {}).get("max_amount", d.section_80c))
+    max_80c = caps.section_80c
     allowed_80c = min(d.section_80c, max_80c)
     if d.section_80c > max_80c:
         warnings.append(
@@ -81,9 +71,7 @@ def _apply_deduction_caps_old_regime(profile: FinancialProfile) -> Tuple[float,
         )
 
     # 80D
-    max_80d = float(
-        deductions_cfg.get("80D", {}).get("max_amount_self_family", d.section_80d)
-    )
+    max_80d = caps.section_80d
     allowed_80d = min(d.section_80d, max_80d)
     if d.section_80d > max_80d:
         warnings.append(
@@ -92,7 +80,7 @@ def _apply_deduction_caps_old_regime(profile: FinancialProfile) -> Tuple[float,
         )
 
     # 24B
-    max_24b = float(deductions_cfg.get("24B", {}).get("max_amount", d.section_24b))
+    max_24b = caps.section_24b
     allowed_24b = min(d.section_24b, max_24b)
     if d.section_24b > max_24b:
         warnings.append(
@@ -101,7 +89,7 @@ def _apply_deduction_caps_old_regime(profile: FinancialProfile) -> Tuple[float,
         )
 
     # 80CCD(1B) - additional NPS
-    max_nps = float(deductions_cfg.get("80CCD(1B)", {}).get("max_amount", d.nps_80ccd1b))
+    max_nps = caps.nps_80ccd1b
     allowed_nps = min(d.nps_80ccd1b, max_nps)
     if d.nps_80ccd1b > max_nps:
         warnings.append(
@@ -119,17 +107,17 @@ def _apply_deduction_caps_old_regime(profile: FinancialProfile) -> Tuple[float,
     return total_deductions, warnings
 
 
-def _apply_deduction_caps_new_regime(profile: FinancialProfile) -> Tuple[float, List[str]]:
+def _apply_deduction_caps_new_regime(
+    profile: FinancialProfile, rules: Optional[CompiledRules] = None
+) -> Tuple[float, List[str]]:
     """
     Apply permitted deductions under new regime (very limited in this demo).
     Returns: (total_deductions, warnings)
     """
-    rules = _load_rules()
-    deductions_cfg = rules.get("new_regime", {}).get("allowed_deductions", {})
+    max_nps = (rules or _rules_for(profile)).new_caps.nps_80ccd1b
     d = profile.deductions
     warnings: List[str] = []
 
-    max_nps = float(deductions_cfg.get("80CCD(1B)", {}).get("max_amount", d.nps_80ccd1b))
     allowed_nps = min(d.nps_80ccd1b, max_nps)
     if d.nps_80ccd1b > max_nps:
         warnings.append(
@@ -162,69 +150,51 @@ def _compute_gross_total_income(profile: FinancialProfile) -> float:
     )
 
 
-def _compute_tax_from_slabs(taxable_income: float, slabs: List[Dict[str, float]]) -> float:
+def _compute_tax_from_slabs(taxable_income: float, slabs: SlabTable) -> float:
     """
-    Generic progressive slab calculator using rule JSON.
-    Each slab is of the form:
-        { "upto": 250000, "rate_percent": 0 }
-        { "from": 250001, "upto": 500000, "rate_percent": 5 }
-        { "from": 1500001, "rate_percent": 30 }
+    Progressive slab calculator over a compiled slab table: one bisect to
+    find the slab, then the cumulative tax at its lower bound plus the
+    slab rate on the remainder.
     """
-    remaining = taxable_income
-    tax = 0.0
-    last_upto = 0.0
-    for slab in slabs:
-        rate = float(slab.get("rate_percent", 0)) / 100.0
-        slab_from = float(slab.get("from", last_upto + 1))
-        slab_upto = float(slab.get("upto", taxable_income))
-        if remaining <= 0:
-            break
-        # Determine overlap of [slab_from, slab_upto] with [1, taxable_income]
-        width = max(0.0, min(taxable_income, slab_upto) - slab_from + 1)
-        if width <= 0:
-            continue
-        slab_amount = min(remaining, width)
-        tax += slab_amount * rate
-        remaining -= slab_amount
-        last_upto = slab_upto
-    return _round_tax(tax)
+    return _round_tax(slabs.tax(taxable_income))
 
-def compute_tax_old_regime(profile: FinancialProfile) -> RegimeTaxBreakdown:
+
+def _compute_tax_components(
+    regime: str, taxable_income: float, rules: CompiledRules
+) -> Tuple[float, float, float]:
     """
-    Old regime computation using JSON-configured slabs and deduction caps.
-    Includes basic age handling (adult / senior / super-senior) and surcharge.
+    Rounded (slab tax, cess, total incl. surcharge) for a taxable
+    income. Float-only so hot loops (e.g. the deduction optimizer) can call
+    it without building response models.
     """
-    rules = _load_rules()
-    old_cfg = rules.get("old_regime", {})
-
-    gross_total_income = _compute_gross_total_income(profile)
-    total_deductions, _warnings = _apply_deduction_caps_old_regime(profile)
-    taxable_income = max(gross_total_income - total_deductions, 0)
-
-    slabs: List[Dict[str, float]] = old_cfg.get("slabs", [])
-
-    # Age-based info (for notes only in this demo; slabs kept same)
-    age_bands = old_cfg.get("age_bands", [])
-    age_label = "adult"
-    for band in age_bands:
-        if band.get("min_age") <= profile.age <= band.get("max_age"):
-            age_label = band.get("label", age_label)
-            break
-
-    tax = _compute_tax_from_slabs(taxable_income, slabs)
+    tax = _compute_tax_from_slabs(taxable_income, rules.slabs(regime))
 
     # Surcharge
-    surcharge_rate = _get_surcharge_rate(taxable_income)
+    surcharge_rate = rules.surcharge.rate(taxable_income)
     surcharge = _round_tax(tax * surcharge_rate / 100.0)
     tax_with_surcharge = tax + surcharge
 
-    cess = _compute_cess(tax_with_surcharge)
-    total = tax_with_surcharge + cess
+    cess = round(tax_with_surcharge * rules.cess_percent / 100.0, 2)
+    return tax, cess, tax_with_surcharge + cess
+
+
+def _compute_regime_breakdown(
+    regime: str,
+    gross_total_income: float,
+    total_deductions: float,
+    rules: CompiledRules,
+) -> RegimeTaxBreakdown:
+    """
+    Shared slab / surcharge / cess arithmetic for both regimes.
+    """
+    taxable_income = max(gross_total_income - total_deductions, 0)
+
+    tax, cess, total = _compute_tax_components(regime, taxable_income, rules)
 
     effective_rate = (total / taxable_income * 100) if taxable_income > 0 else 0.0
 
     return RegimeTaxBreakdown(
-        regime="old",
+        regime=regime,
         gross_total_income=gross_total_income,
         deductions=total_deductions,
         taxable_income=taxable_income,
@@ -235,40 +205,91 @@ def compute_tax_old_regime(profile: FinancialProfile) -> RegimeTaxBreakdown:
     )
 
 
+@timed_tax_call("compute_tax_old_regime")
+def compute_tax_old_regime(profile: FinancialProfile) -> RegimeTaxBreakdown:
+    """
+    Old regime computation using JSON-configured slabs and deduction caps.
+    Age bands are compiled with the rules but slabs are kept the same for
+    all ages in this demo; surcharge is applied on top.
+    """
+    rules = _rules_for(profile)
+    gross_total_income = _compute_gross_total_income(profile)
+    total_deductions, _warnings = _apply_deduction_caps_old_regime(profile, rules)
+    return _compute_regime_breakdown("old", gross_total_income, total_deductions, rules)
+
+
+@timed_tax_call("compute_tax_new_regime")
 def compute_tax_new_regime(profile: FinancialProfile) -> RegimeTaxBreakdown:
     """
     New regime computation using JSON-configured slabs and deduction rules.
     Applies limited deductions and surcharge.
     """
-    rules = _load_rules()
-    new_cfg = rules.get("new_regime", {})
-
+    rules = _rules_for(profile)
     gross_total_income = _compute_gross_total_income(profile)
-    total_deductions, _warnings = _apply_deduction_caps_new_regime(profile)
-    taxable_income = max(gross_total_income - total_deductions, 0)
+    total_deductions, _warnings = _apply_deduction_caps_new_regime(profile, rules)
+    return _compute_regime_breakdown("new", gross_total_income, total_deductions, rules)
 
-    slabs: List[Dict[str, float]] = new_cfg.get("slabs", [])
 
-    tax = _compute_tax_from_slabs(taxable_income, slabs)
+_SENIOR_WARNING = (
+    "Senior/super-senior handling is included only at a high level in this demo. "
+    "Please cross-check slab and deduction rules before relying on these numbers."
+)
 
-    surcharge_rate = _get_surcharge_rate(taxable_income)
-    surcharge = _round_tax(tax * surcharge_rate / 100.0)
-    tax_with_surcharge = tax + surcharge
 
-    cess = _compute_cess(tax_with_surcharge)
-    total = tax_with_surcharge + cess
+def _comparison_note(fy: str, jurisdiction: str, gross_total_income: float) -> str:
+    return (
+        f"Comparison based on simplified FY {fy} {jurisdiction.title()} "
+        f"income-tax rules for FY {fy}. "
+        f"Gross total income considered: ₹{gross_total_income:.0f}. "
+        "This is an educational estimate, not legal or financial advice."
+    )
 
-    effective_rate = (total / taxable_income * 100) if taxable_income > 0 else 0.0
 
-    return RegimeTaxBreakdown(
-        regime="new",
-        gross_total_income=gross_total_income,
-        deductions=total_deductions,
-        taxable_income=taxable_income,
-        tax_before_cess=tax,
-        cess=cess,
-        total_tax=total,
-        effective_rate_percent=round(effective_rate, 2),
+@timed_tax_call("compare_regimes")
+def compare_regimes(
+    profile: FinancialProfile, regime: Optional[TaxRegime] = None
+) -> TaxComputationResponse:
+    """
+    Compute the requested regime (or both, with a recommendation) in one
+    pass: rules, gross income and deduction caps are evaluated once and
+    shared, and cap warnings come from the same evaluation.
+    Backs `/calculate_tax`; batch jobs can call it directly per profile
+    (or use `tax_batch` for the same results computed vectorized).
+    """
+    rule_set = get_rule_set(profile.fy, profile.jurisdiction)
+    rules = rule_set.compiled
+    gross_total_income = _compute_gross_total_income(profile)
+    old_regime: Optional[RegimeTaxBreakdown] = None
+    new_regime: Optional[RegimeTaxBreakdown] = None
+    warnings: List[str] = []
+
+    if regime in (None, "old"):
+        old_deductions, old_warnings = _apply_deduction_caps_old_regime(profile, rules)
+        warnings.extend(old_warnings)
+        old_regime = _compute_regime_breakdown("old", gross_total_income, old_deductions, rules)
+    if regime in (None, "new"):
+        new_deductions, new_warnings = _apply_deduction_caps_new_regime(profile, rules)
+        warnings.extend(new_warnings)
+        new_regime = _compute_regime_breakdown("new", gross_total_income, new_deductions, rules)
+
+    # Simple informational note about age band
+    if profile.age >= 60:
+        warnings.append(_SENIOR_WARNING)
+
+    recommended_regime: Optional[TaxRegime] = None
+    note: Optional[str] = None
+    if old_regime and new_regime:
+        recommended_regime = "old" if old_regime.total_tax < new_regime.total_tax else "new"
+        note = _comparison_note(rule_set.fy, rule_set.jurisdiction, gross_total_income)
+
+    # Built once at the end: assigning fields on a pydantic model one by one
+    # goes through its validating __setattr__ and dominated this function
+    return TaxComputationResponse(
+        old_regime=old_regime,
+        new_regime=new_regime,
+        recommended_regime=recommended_regime,
+        note=note,
+        warnings=warnings,
     )
 
 
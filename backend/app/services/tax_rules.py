@@ -0,0 +1,358 @@
+"""
+Compiled, immutable tax rule tables.
+
+The raw rule JSON in `app/data/` is convenient to edit but slow to walk on
+every call. `compile_rules` turns it once into typed, frozen tables:
+
+- slab boundaries as sorted tuples with the cumulative tax at each
+  boundary, so slab tax is one bisect plus one multiply-add;
+- surcharge thresholds as a sorted tuple that can be bisected;
+- deduction caps as plain float attributes (`inf` when uncapped).
+
+`RuleRegistry` serves compiled rules keyed by (jurisdiction, fy). Rule
+files are loaded lazily, kept in a bounded LRU, and re-read when their
+mtime/size (and then content hash) changes, so a rules update does not
+need a worker restart.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+@dataclass(frozen=True)
+class SlabTable:
+    """
+    Progressive slabs. Slab `i` taxes income above `lowers[i]` at `rates[i]`
+    (a fraction), and `base_tax[i]` is the tax due at exactly `lowers[i]`.
+    """
+
+    lowers: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    base_tax: Tuple[float, ...]
+
+    def tax(self, taxable_income: float) -> float:
+        """Unrounded slab tax for a taxable income."""
+        i = bisect_right(self.lowers, taxable_income) - 1
+        if i < 0:
+            return 0.0
+        return self.base_tax[i] + (taxable_income - self.lowers[i]) * self.rates[i]
+
+    def marginal_rate(self, taxable_income: float) -> float:
+        """Slab rate applying to the next rupee above `taxable_income`."""
+        i = bisect_right(self.lowers, taxable_income) - 1
+        return self.rates[i] if i >= 0 else 0.0
+
+
+@dataclass(frozen=True)
+class SurchargeTable:
+    """Surcharge applies `rates_percent[i]` when income exceeds `thresholds[i]`."""
+
+    thresholds: Tuple[float, ...]
+    rates_percent: Tuple[float, ...]
+
+    def rate(self, taxable_income: float) -> float:
+        i = bisect_left(self.thresholds, taxable_income)
+        return self.rates_percent[i - 1] if i > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class OldRegimeCaps:
+    section_80c: float
+    section_80d: float
+    section_24b: float
+    nps_80ccd1b: float
+
+
+@dataclass(frozen=True)
+class NewRegimeCaps:
+    nps_80ccd1b: float
+
+
+@dataclass(frozen=True)
+class AgeBand:
+    label: str
+    min_age: int
+    max_age: int
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """All rule tables needed by the tax engine, ready for the hot path."""
+
+    old_slabs: SlabTable
+    new_slabs: SlabTable
+    surcharge: SurchargeTable
+    cess_percent: float
+    old_caps: OldRegimeCaps
+    new_caps: NewRegimeCaps
+    age_bands: Tuple[AgeBand, ...]
+
+    def slabs(self, regime: str) -> SlabTable:
+        return self.old_slabs if regime == "old" else self.new_slabs
+
+    def age_label(self, age: int) -> str:
+        for band in self.age_bands:
+            if band.min_age <= age <= band.max_age:
+                return band.label
+        return "adult"
+
+
+def _compile_slabs(slabs: List[Dict[str, Any]]) -> SlabTable:
+    """
+    Each slab JSON entry covers the income band (from - 1, upto]; a slab
+    without "from" starts where the previous one ended, and a slab without
+    "upto" is open-ended.
+    """
+    lowers: List[float] = []
+    rates: List[float] = []
+    base_tax: List[float] = []
+    last_upto = 0.0
+    running = 0.0
+    for slab in slabs:
+        lower = float(slab.get("from", last_upto + 1)) - 1
+        if lower != last_upto:
+            raise ValueError(
+                f"Tax slabs must be sorted and contiguous; slab starting at "
+                f"{lower + 1:.0f} does not follow {last_upto:.0f}."
+            )
+        rate = float(slab.get("rate_percent", 0)) / 100.0
+        lowers.append(lower)
+        rates.append(rate)
+        base_tax.append(running)
+        last_upto = float(slab.get("upto", math.inf))
+        running += (last_upto - lower) * rate
+    return SlabTable(lowers=tuple(lowers), rates=tuple(rates), base_tax=tuple(base_tax))
+
+
+def _compile_surcharge(bands: List[Dict[str, Any]]) -> SurchargeTable:
+    ordered = sorted(
+        (float(band.get("threshold", 0)), float(band.get("rate_percent", 0)))
+        for band in bands
+    )
+    return SurchargeTable(
+        thresholds=tuple(threshold for threshold, _ in ordered),
+        rates_percent=tuple(rate for _, rate in ordered),
+    )
+
+
+def _cap(cfg: Mapping[str, Any], section: str, key: str = "max_amount") -> float:
+    """Deduction cap from rules; a missing cap means the claim is taken as-is."""
+    value = cfg.get(section, {}).get(key)
+    return float(value) if value is not None else math.inf
+
+
+def compile_rules(raw: Mapping[str, Any]) -> CompiledRules:
+    """
+    Compile raw rule JSON (see `app/data/tax_rules_*.json`) into tables.
+    """
+    old_cfg = raw.get("old_regime", {})
+    new_cfg = raw.get("new_regime", {})
+    old_deductions = old_cfg.get("common_deductions", {})
+    new_deductions = new_cfg.get("allowed_deductions", {})
+
+    return CompiledRules(
+        old_slabs=_compile_slabs(old_cfg.get("slabs", [])),
+        new_slabs=_compile_slabs(new_cfg.get("slabs", [])),
+        surcharge=_compile_surcharge(raw.get("surcharge", {}).get("bands", [])),
+        cess_percent=float(raw.get("cess", {}).get("health_education_cess_percent", 4)),
+        old_caps=OldRegimeCaps(
+            section_80c=_cap(old_deductions, "80C"),
+            section_80d=_cap(old_deductions, "80D", "max_amount_self_family"),
+            section_24b=_cap(old_deductions, "24B"),
+            nps_80ccd1b=_cap(old_deductions, "80CCD(1B)"),
+        ),
+        new_caps=NewRegimeCaps(nps_80ccd1b=_cap(new_deductions, "80CCD(1B)")),
+        age_bands=tuple(
+            AgeBand(
+                label=band.get("label", "adult"),
+                min_age=int(band.get("min_age", 0)),
+                max_age=int(band.get("max_age", 120)),
+            )
+            for band in old_cfg.get("age_bands", [])
+        ),
+    )
+
+
+class RulesNotFoundError(LookupError):
+    """No rule file exists for the requested (jurisdiction, fy)."""
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """One loaded rule file: raw JSON, compiled tables and file identity."""
+
+    jurisdiction: str
+    fy: str
+    path: str
+    digest: str
+    raw: Mapping[str, Any]
+    compiled: CompiledRules
+
+
+@dataclass
+class _RegistryEntry:
+    rule_set: RuleSet
+    mtime_ns: int
+    size: int
+    checked_at: float
+
+
+_FY_PATTERN = re.compile(r"(\d{4})\D*(\d{2,4})")
+# Jurisdictions become part of a file name, so nothing path-like gets through
+_JURISDICTION_PATTERN = re.compile(r"^[a-z0-9_]+$")
+
+
+def normalize_fy(fy: str) -> str:
+    """
+    Normalize "2024-25", "2024-2025", "FY 2024_25" etc. to "2024-25".
+    """
+    match = _FY_PATTERN.search(fy)
+    if not match:
+        raise RulesNotFoundError(f"Unrecognised financial year: {fy!r}")
+    return f"{match.group(1)}-{match.group(2)[-2:]}"
+
+
+class RuleRegistry:
+    """
+    Thread-safe, bounded LRU of compiled rule sets keyed by (jurisdiction, fy).
+
+    Files are named `tax_rules_<YYYY>_<YY>_<jurisdiction>.json` inside
+    `rules_dir`. A cached entry is re-validated against the file's
+    mtime/size at most once per `check_interval` seconds; when those change
+    the file is re-hashed and only recompiled if its content differs.
+    """
+
+    def __init__(self, rules_dir: str, max_entries: int = 8, check_interval: float = 1.0) -> None:
+        self.rules_dir = rules_dir
+        self.max_entries = max(1, max_entries)
+        self.check_interval = check_interval
+        self._entries: "OrderedDict[Tuple[str, str], _RegistryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    _FILE_NAME = re.compile(r"^tax_rules_(\d{4}_\d{2})_(\w+)\.json$")
+
+    @staticmethod
+    def _jurisdiction(jurisdiction: str) -> str:
+        name = jurisdiction.lower()
+        if not _JURISDICTION_PATTERN.match(name):
+            raise RulesNotFoundError(f"Unrecognised jurisdiction: {jurisdiction!r}")
+        return name
+
+    def path_for(self, jurisdiction: str, fy: str) -> str:
+        fy_part = normalize_fy(fy).replace("-", "_")
+        name = f"tax_rules_{fy_part}_{self._jurisdiction(jurisdiction)}.json"
+        return os.path.join(self.rules_dir, name)
+
+    def get(self, jurisdiction: str, fy: str) -> RuleSet:
+        key = (self._jurisdiction(jurisdiction), normalize_fy(fy))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now - entry.checked_at < self.check_interval:
+                    return entry.rule_set
+
+        path = self.path_for(*key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            raise RulesNotFoundError(
+                f"No tax rules for jurisdiction {key[0]!r}, FY {key[1]}."
+            ) from None
+
+        if entry is not None and (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+            with self._lock:
+                entry.checked_at = now
+            return entry.rule_set
+
+        with open(path, "rb") as f:
+            payload = f.read()
+        digest = hashlib.sha256(payload).hexdigest()
+        reloaded = False
+        if entry is not None and entry.rule_set.digest == digest:
+            rule_set = entry.rule_set
+        else:
+            raw = json.loads(payload)
+            rule_set = RuleSet(
+                jurisdiction=key[0],
+                fy=key[1],
+                path=path,
+                digest=digest,
+                raw=raw,
+                compiled=compile_rules(raw),
+            )
+            reloaded = entry is not None
+
+        with self._lock:
+            if reloaded:
+                self.reloads += 1
+            self._entries[key] = _RegistryEntry(
+                rule_set=rule_set,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                checked_at=now,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rule_set
+
+    def available(self) -> List[Tuple[str, str]]:
+        """(jurisdiction, fy) of every rule file in `rules_dir`, sorted."""
+        try:
+            names = os.listdir(self.rules_dir)
+        except FileNotFoundError:
+            return []
+        keys = []
+        for name in names:
+            match = self._FILE_NAME.match(name)
+            if match:
+                keys.append((match.group(2), normalize_fy(match.group(1))))
+        return sorted(keys)
+
+    def preload(self) -> List[RuleSet]:
+        """Load and compile every available rule file, up to `max_entries`."""
+        return [self.get(jurisdiction, fy) for jurisdiction, fy in self.available()[: self.max_entries]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache(maxsize=1)
+def get_rule_registry() -> RuleRegistry:
+    settings = get_settings()
+    return RuleRegistry(
+        rules_dir=settings.tax_rules_dir,
+        max_entries=settings.tax_rules_cache_size,
+        check_interval=settings.tax_rules_check_interval,
+    )
+
+
+def get_rule_set(fy: Optional[str] = None, jurisdiction: Optional[str] = None) -> RuleSet:
+    """
+    Rules for (jurisdiction, fy), defaulting to the configured ones.
+    """
+    settings = get_settings()
+    return get_rule_registry().get(
+        jurisdiction or settings.tax_default_jurisdiction,
+        fy or settings.tax_default_fy,
+    )
@@ -0,0 +1,214 @@
+"""
+A stand-in for the Ollama HTTP API with predictable timing, so the LLM
+layer can be benchmarked without a GPU or a real model.
+
+Each generation waits `latency_ms` before the first token (prefill), then
+emits `output_tokens` tokens at `tokens_per_second`. Requests with a
+`format` get a valid classification JSON object followed by trailing
+text, like a real model that keeps going after the object closes.
+`options.num_predict` caps the emitted tokens, and a capped generation
+ends with done_reason "length" instead of "stop". A request that sends back
+a `context` only "prefills" its new prompt: the returned context grows by
+the prompt and response tokens, and prompt_eval_count counts only the new
+prompt, as with Ollama's KV-cache reuse. `model_latency_ms`
+gives individual models their own prefill delay, e.g. to exercise the
+task router's fallback to a smaller model.
+/api/embeddings returns deterministic bag-of-words vectors.
+
+In-process use (what the benchmark suite does):
+
+    with FakeOllamaServer(latency_ms=50, tokens_per_second=200) as server:
+        os.environ["OLLAMA_HOST"] = server.url
+
+Standalone, for pointing a dev server at it:
+
+    python -m benchmarks.fake_ollama --port 11500 --latency-ms 200 --tokens-per-second 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import socket
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+_CLASSIFICATION = {
+    "income_sources": ["Salary"],
+    "deductions": ["80C: PPF"],
+    "capital_gains": [],
+    "notes": "Generated by the fake Ollama server.",
+}
+
+EMBEDDING_DIMENSIONS = 256
+
+
+def _tokens(text: str) -> List[str]:
+    """Roughly 4 characters per token, like the app's own estimates."""
+    return [text[i : i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+def embed_text(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """Hashed bag-of-words vector; equal word sets embed identically."""
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        word = word.strip("?.,!:;\"'()")
+        if word:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+    return vector
+
+
+class FakeOllama:
+    """The ASGI app plus its timing knobs and request counters."""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        tokens_per_second: float = 200.0,
+        output_tokens: int = 64,
+        model: str = "llama3",
+        model_latency_ms: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.model_latency_ms = dict(model_latency_ms or {})
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.model = model
+        self.counts: Dict[str, int] = {"generate": 0, "embeddings": 0, "tags": 0}
+        self.app = Starlette(
+            routes=[
+                Route("/api/tags", self.tags, methods=["GET"]),
+                Route("/api/generate", self.generate, methods=["POST"]),
+                Route("/api/embeddings", self.embeddings, methods=["POST"]),
+            ]
+        )
+
+    def _response_text(self, payload: Dict[str, Any]) -> str:
+        if payload.get("format") is not None:
+            return json.dumps(_CLASSIFICATION) + "\n\nThat is the classification."
+        words = (payload.get("prompt") or "").split()[-8:]
+        text = "Answer about " + " ".join(words) + ". "
+        while len(text) < self.output_tokens * 4:
+            text += "This is filler output from the fake model. "
+        return text[: self.output_tokens * 4]
+
+    def _final_chunk(
+        self,
+        prompt: str,
+        tokens: int,
+        started: float,
+        context: Optional[List[int]] = None,
+        truncated: bool = False,
+    ) -> Dict[str, Any]:
+        elapsed_ns = int((time.perf_counter() - started) * 1e9)
+        prompt_tokens = len(prompt) // 4
+        return {
+            "model": self.model,
+            "response": "",
+            "done": True,
+            "done_reason": "length" if truncated else "stop",
+            "context": list(context or []) + [1] * (prompt_tokens + tokens),
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": tokens,
+            "eval_duration": int(tokens / self.tokens_per_second * 1e9),
+            "total_duration": elapsed_ns,
+        }
+
+    async def tags(self, request: Request) -> JSONResponse:
+        self.counts["tags"] += 1
+        return JSONResponse({"models": [{"name": self.model}]})
+
+    async def embeddings(self, request: Request) -> JSONResponse:
+        self.counts["embeddings"] += 1
+        payload = await request.json()
+        return JSONResponse({"embedding": embed_text(payload.get("prompt", ""))})
+
+    async def generate(self, request: Request):
+        self.counts["generate"] += 1
+        payload = await request.json()
+        started = time.perf_counter()
+        prompt = payload.get("prompt", "")
+        tokens = _tokens(self._response_text(payload))
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        truncated = bool(num_predict) and len(tokens) > num_predict
+        if truncated:
+            tokens = tokens[:num_predict]
+        token_delay = 1.0 / self.tokens_per_second
+        latency_ms = self.model_latency_ms.get(payload.get("model"), self.latency_ms)
+
+        if not payload.get("stream", True):
+            await asyncio.sleep(latency_ms / 1000 + len(tokens) * token_delay)
+            final = self._final_chunk(
+                prompt, len(tokens), started, payload.get("context"), truncated
+            )
+            return JSONResponse({**final, "response": "".join(tokens)})
+
+        async def chunks() -> AsyncIterator[bytes]:
+            await asyncio.sleep(latency_ms / 1000)
+            for token in tokens:
+                await asyncio.sleep(token_delay)
+                yield (json.dumps({"model": self.model, "response": token, "done": False}) + "\n").encode()
+            final = self._final_chunk(
+                prompt, len(tokens), started, payload.get("context"), truncated
+            )
+            yield (json.dumps(final) + "\n").encode()
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeOllamaServer:
+    """Runs a `FakeOllama` under uvicorn in a background thread."""
+
+    def __init__(self, port: Optional[int] = None, **options: Any) -> None:
+        self.fake = FakeOllama(**options)
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.fake.app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "FakeOllamaServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake Ollama server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API.")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.latency_ms, args.tokens_per_second, args.output_tokens)
+    uvicorn.run(fake.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Compare FastAPI's default request handler with `FastJSONRoute` on the
+pure-computation endpoints (/calculate_tax, /fill_form).
+
+Requests are sent straight into the ASGI app (no sockets), so the numbers
+are the per-request framework + validation + serialization cost. Run from
+the backend directory:
+
+    python -m benchmarks.fast_tax_routes --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+
+from app.api.v1.routes_forms import router as forms_router
+from app.api.v1.routes_tax import router as tax_router
+from app.core.fast_routes import FastJSONRoute
+
+_PROFILE = {
+    "fy": "2024-25",
+    "age": 35,
+    "income": {"salary": 1800000, "interest": 40000, "rental": 120000},
+    "deductions": {"section_80c": 150000, "section_80d": 30000, "nps_80ccd1b": 50000},
+}
+
+_CASES: Dict[str, bytes] = {
+    "/api/v1/calculate_tax": json.dumps({"profile": _PROFILE}).encode(),
+    "/api/v1/fill_form": json.dumps(_PROFILE).encode(),
+}
+
+
+def _build_app(route_class: type) -> FastAPI:
+    """An app with the tax and form routes re-registered under `route_class`."""
+    app = FastAPI()
+    for source in (tax_router, forms_router):
+        router = APIRouter(route_class=route_class)
+        for route in source.routes:
+            if isinstance(route, APIRoute):
+                router.add_api_route(
+                    route.path,
+                    route.endpoint,
+                    response_model=route.response_model,
+                    methods=list(route.methods),
+                )
+        app.include_router(router, prefix="/api/v1")
+    return app
+
+
+async def _call(app: FastAPI, path: str, body: bytes) -> Tuple[int, bytes]:
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent: List[dict] = []
+
+    async def receive() -> dict:
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+    }
+    await app(scope, receive, send)
+    body_out = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return sent[0]["status"], body_out
+
+
+async def _measure(app: FastAPI, path: str, body: bytes, requests: int) -> Dict[str, float]:
+    for _ in range(min(500, requests)):
+        await _call(app, path, body)
+    latencies: List[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await _call(app, path, body)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p95_us": latencies[int(0.95 * (len(latencies) - 1))] * 1e6,
+        "throughput_rps": requests / sum(latencies),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    apps = {"default": _build_app(APIRoute), "fast": _build_app(FastJSONRoute)}
+    for path, body in _CASES.items():
+        outputs = {name: await _call(app, path, body) for name, app in apps.items()}
+        if json.loads(outputs["default"][1]) != json.loads(outputs["fast"][1]):
+            raise SystemExit(f"{path}: fast route response differs from the default handler")
+
+        results = {name: await _measure(app, path, body, args.requests) for name, app in apps.items()}
+        print(path)
+        for name, stats in results.items():
+            print(
+                f"  {name:>7}: p50 {stats['p50_us']:.0f} us  p95 {stats['p95_us']:.0f} us  "
+                f"{stats['throughput_rps']:.0f} req/s"
+            )
+        speedup = results["default"]["p50_us"] / results["fast"]["p50_us"]
+        print(f"  median speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
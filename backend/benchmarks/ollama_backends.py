@@ -0,0 +1,73 @@
+"""
+Compare LLM latency of the pooled HTTP path against fork-per-call `ollama run`.
+
+Run from the backend directory against a local Ollama:
+
+    python -m benchmarks.ollama_backends --requests 20 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from app.core.ai_client import _ollama_generate, close_http_client
+from app.core.config import get_settings
+from app.core.ollama_pool import get_worker_pool
+
+
+async def _run_backend(backend: str, prompt: str, requests: int, concurrency: int) -> Dict[str, float]:
+    get_settings().ollama_backend = backend
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one() -> None:
+        async with gate:
+            started = time.perf_counter()
+            await _ollama_generate(prompt)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "throughput_rps": requests / wall,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--prompt", default="Explain Section 80C in one sentence.")
+    args = parser.parse_args()
+
+    pool = get_worker_pool()
+    await pool.start()
+    try:
+        results = {
+            backend: await _run_backend(backend, args.prompt, args.requests, args.concurrency)
+            for backend in ("cli", "http")
+        }
+    finally:
+        await pool.stop()
+        await close_http_client()
+
+    for backend, stats in results.items():
+        print(
+            f"{backend:>5}: p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  "
+            f"{stats['throughput_rps']:.2f} req/s"
+        )
+    saved = results["cli"]["p50_ms"] - results["http"]["p50_ms"]
+    print(f"median latency saved by the pooled path: {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,431 @@
+"""
+Benchmark suite for the tax engine, the /api/v1 routes and the LLM layer.
+
+Groups:
+
+* ``micro``:  tax-engine functions (`_compute_tax_from_slabs`, both regime
+  functions, `compare_regimes`, the batch engine) timed with `timeit`.
+* ``routes``: every /api/v1 route, called through an in-process ASGI
+  client with the app lifespan running. Reports latency percentiles and
+  throughput at a fixed concurrency.
+* ``llm``:    `ai_client` generation paths (plain, concurrent, streaming,
+  structured classification).
+
+The routes and llm groups talk to `benchmarks.fake_ollama`, started in a
+background thread with a configurable prefill latency and token rate, so
+the numbers measure our own overhead on top of a model of known speed.
+The LLM response cache is off unless --llm-cache is given, so every call
+really generates.
+
+Results are written to a JSON file. If a baseline file exists, each
+benchmark's headline number (fastest run for micro, median otherwise)
+is compared against it. Regressions beyond --threshold are reported,
+with a non-zero exit under --fail-on-regression.
+Run from the backend directory:
+
+    python -m benchmarks.suite                       # all groups
+    python -m benchmarks.suite --group micro --save-baseline
+    python -m benchmarks.suite --latency-ms 200 --tokens-per-second 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+GROUPS = ("micro", "routes", "llm")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Metric compared against the baseline, in order of preference (lower is
+# better). Micro benchmarks use the fastest run, which is the least noisy.
+_PRIMARY_METRICS = ("min_us", "p50_ms")
+
+Results = Dict[str, Dict[str, Any]]
+
+
+def _profile(i: int = 0) -> Dict[str, Any]:
+    return {
+        "fy": "2024-25",
+        "age": 30 + i % 40,
+        "income": {"salary": 1200000 + 1000 * i, "interest": 40000, "rental": 120000 * (i % 2)},
+        "deductions": {"section_80c": 150000, "section_80d": 25000, "nps_80ccd1b": 50000},
+    }
+
+
+# --------------------------------------------------------------------------- #
+# Measurement helpers
+# --------------------------------------------------------------------------- #
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _latency_summary(latencies: List[float], wall: float) -> Dict[str, Any]:
+    """Percentiles in ms plus throughput for a list of per-call seconds."""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+def _time_function(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Per-call time in µs over `repeat` timeit runs of an auto-ranged loop."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = sorted(run / number * 1e6 for run in timer.repeat(repeat=repeat, number=number))
+    return {
+        "loops": number,
+        "p50_us": round(statistics.median(per_call), 3),
+        "min_us": round(per_call[0], 3),
+        "max_us": round(per_call[-1], 3),
+    }
+
+
+async def _run_concurrently(
+    call: Callable[[int], Awaitable[Any]], requests: int, concurrency: int
+) -> Tuple[List[float], float]:
+    """Run `call(i)` for i in range(requests), `concurrency` at a time."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with gate:
+            started = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+# --------------------------------------------------------------------------- #
+# Groups
+# --------------------------------------------------------------------------- #
+
+
+def run_micro(args: argparse.Namespace) -> Results:
+    from app.models.financial import FinancialProfile
+    from app.services.tax_batch import compute_tax_for_profiles
+    from app.services.tax_logic import (
+        _compute_tax_from_slabs,
+        _rules_for,
+        compare_regimes,
+        compute_tax_new_regime,
+        compute_tax_old_regime,
+    )
+
+    profile = FinancialProfile.model_validate(_profile())
+    profiles = [FinancialProfile.model_validate(_profile(i)) for i in range(1000)]
+    rules = _rules_for(profile)
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "compute_tax_from_slabs.old": lambda: _compute_tax_from_slabs(1325000.0, rules.old_slabs),
+        "compute_tax_from_slabs.new": lambda: _compute_tax_from_slabs(1325000.0, rules.new_slabs),
+        "compute_tax_old_regime": lambda: compute_tax_old_regime(profile),
+        "compute_tax_new_regime": lambda: compute_tax_new_regime(profile),
+        "compare_regimes": lambda: compare_regimes(profile),
+        "compute_tax_for_profiles.1000": lambda: compute_tax_for_profiles(profiles),
+    }
+    results: Results = {}
+    for name, fn in cases.items():
+        results[f"micro.{name}"] = _time_function(fn, args.repeat)
+        print(f"  micro.{name}: {results[f'micro.{name}']['p50_us']:.2f} us", flush=True)
+    return results
+
+
+def _new_session(i: int) -> Dict[str, Any]:
+    """Path parameters naming a fresh chat session, for the /chat/sessions/{id} routes."""
+    from app.core.chat_sessions import get_chat_sessions
+
+    history = [
+        {"role": "user", "content": f"Question {i}"},
+        {"role": "assistant", "content": "Answer"},
+    ]
+    return {"path_params": {"session_id": get_chat_sessions().create(history).session_id}}
+
+
+# Request factories per /api/v1 route; `i` varies the payload so LLM-backed
+# routes do not all collapse onto a single prompt
+_ROUTE_REQUESTS: Dict[Tuple[str, str], Callable[[int], Dict[str, Any]]] = {
+    ("POST", "/api/v1/calculate_tax"): lambda i: {"json": {"profile": _profile(i)}},
+    ("POST", "/api/v1/calculate_tax/batch"): lambda i: {
+        "json": {"profiles": [_profile(i + k) for k in range(100)]}
+    },
+    ("POST", "/api/v1/calculate_tax/sweep"): lambda i: {
+        "json": {
+            "profile": _profile(i),
+            "x": {"field": "salary", "start": 0, "stop": 5000000, "steps": 50},
+        }
+    },
+    ("POST", "/api/v1/optimize_deductions"): lambda i: {"json": {"profile": _profile(i)}},
+    ("POST", "/api/v1/suggest_deductions"): lambda i: {"json": {"profile": _profile(i)}},
+    ("POST", "/api/v1/fill_form"): lambda i: {"json": _profile(i)},
+    ("POST", "/api/v1/fill_form/bulk"): lambda i: {
+        "content": "".join(json.dumps(_profile(i + k)) + "\n" for k in range(100)),
+        "headers": {"content-type": "application/x-ndjson"},
+    },
+    ("POST", "/api/v1/analyze_financials"): lambda i: {
+        "json": {"raw_text": f"I earn {10 + i} lakh salary and put 1.5 lakh in PPF"}
+    },
+    ("POST", "/api/v1/analyze_financials/stream"): lambda i: {
+        "json": {"raw_text": f"Got {i} thousand from a side gig and some crypto"}
+    },
+    ("POST", "/api/v1/filing_checklist"): lambda i: {"json": {"profile": _profile(i)}},
+    ("POST", "/api/v1/filing_checklist/stream"): lambda i: {"json": {"profile": _profile(i)}},
+    ("POST", "/api/v1/chat"): lambda i: {
+        "json": {"history": [], "user_input": f"Question {i}: which regime suits me?"}
+    },
+    ("POST", "/api/v1/chat/stream"): lambda i: {
+        "json": {"history": [], "user_input": f"Question {i}: what is 80C?"}
+    },
+    ("POST", "/api/v1/chat/sessions"): lambda i: {
+        "json": {"history": [{"role": "user", "content": f"Question {i}: what is HRA?"}]}
+    },
+    ("GET", "/api/v1/chat/sessions/{session_id}"): lambda i: _new_session(i),
+    ("DELETE", "/api/v1/chat/sessions/{session_id}"): lambda i: _new_session(i),
+    ("GET", "/api/v1/ai/stats"): lambda i: {},
+}
+
+# Routes that call the model get fewer requests (--llm-requests)
+_LLM_ROUTES = {
+    "/api/v1/suggest_deductions",
+    "/api/v1/analyze_financials",
+    "/api/v1/analyze_financials/stream",
+    "/api/v1/filing_checklist",
+    "/api/v1/filing_checklist/stream",
+    "/api/v1/chat",
+    "/api/v1/chat/stream",
+}
+
+
+async def run_routes(args: argparse.Namespace) -> Results:
+    import httpx
+    from fastapi.routing import APIRoute
+
+    from app.main import app
+
+    results: Results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for route in app.routes:
+                if not isinstance(route, APIRoute) or not route.path.startswith("/api/v1"):
+                    continue
+                for method in sorted(route.methods):
+                    factory = _ROUTE_REQUESTS.get((method, route.path))
+                    name = f"routes.{method} {route.path}"
+                    if factory is None:
+                        print(f"  {name}: skipped, no request registered in _ROUTE_REQUESTS")
+                        continue
+                    requests = args.llm_requests if route.path in _LLM_ROUTES else args.requests
+
+                    async def call(i: int, method: str = method, path: str = route.path) -> None:
+                        request = factory(i)
+                        url = path.format(**request.pop("path_params", {}))
+                        response = await client.request(method, url, **request)
+                        if not response.is_success:
+                            raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.text[:200]}")
+
+                    await call(-1)  # warm-up, also validates the request
+                    latencies, wall = await _run_concurrently(call, requests, args.concurrency)
+                    results[name] = _latency_summary(latencies, wall)
+                    print(
+                        f"  {name}: p50 {results[name]['p50_ms']:.2f} ms  "
+                        f"p95 {results[name]['p95_ms']:.2f} ms  {results[name]['throughput_rps']:.0f} req/s",
+                        flush=True,
+                    )
+    return results
+
+
+async def run_llm(args: argparse.Namespace) -> Results:
+    from app.core.ai_client import _ollama_generate, _ollama_generate_stream, classify_financial_info
+
+    # Time a fake generation needs on its own; the rest is our overhead
+    model_ms = args.latency_ms + args.output_tokens / args.tokens_per_second * 1000
+    results: Results = {}
+
+    async def generate(i: int) -> None:
+        await _ollama_generate(f"Benchmark prompt {i}: explain Section 80C.")
+
+    async def classify(i: int) -> None:
+        await classify_financial_info(f"I received {i} thousand as consulting fees")
+
+    for name, call, concurrency in (
+        ("llm.generate", generate, 1),
+        ("llm.generate.concurrent", generate, args.llm_concurrency),
+        ("llm.classify", classify, 1),
+    ):
+        await call(-1)
+        latencies, wall = await _run_concurrently(call, args.llm_requests, concurrency)
+        results[name] = {**_latency_summary(latencies, wall), "concurrency": concurrency}
+        print(f"  {name}: p50 {results[name]['p50_ms']:.1f} ms (model alone {model_ms:.1f} ms)", flush=True)
+    results["llm.generate"]["overhead_p50_ms"] = round(results["llm.generate"]["p50_ms"] - model_ms, 3)
+
+    first_token: List[float] = []
+    totals: List[float] = []
+    started_all = time.perf_counter()
+    for i in range(args.llm_requests):
+        started = time.perf_counter()
+        first: Optional[float] = None
+        async for _fragment in _ollama_generate_stream(f"Benchmark stream {i}: what is HRA?"):
+            if first is None:
+                first = time.perf_counter() - started
+        first_token.append(first or 0.0)
+        totals.append(time.perf_counter() - started)
+    stream = _latency_summary(totals, time.perf_counter() - started_all)
+    stream["ttft_p50_ms"] = round(statistics.median(first_token) * 1000, 3)
+    stream["ttft_overhead_p50_ms"] = round(stream["ttft_p50_ms"] - args.latency_ms, 3)
+    results["llm.stream"] = stream
+    print(f"  llm.stream: first token p50 {stream['ttft_p50_ms']:.1f} ms", flush=True)
+    return results
+
+
+# --------------------------------------------------------------------------- #
+# Baseline comparison
+# --------------------------------------------------------------------------- #
+
+
+def _primary(metrics: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+    for key in _PRIMARY_METRICS:
+        if key in metrics:
+            return key, float(metrics[key])
+    return None
+
+
+def compare_to_baseline(current: Results, baseline: Results, threshold: float) -> List[str]:
+    """Print a comparison table; returns the names that regressed."""
+    regressions: List[str] = []
+    print(f"\n{'benchmark':<55} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(current):
+        now, before = _primary(current[name]), _primary(baseline.get(name, {}))
+        if now is None or before is None or now[0] != before[0] or before[1] <= 0:
+            continue
+        change = (now[1] - before[1]) / before[1]
+        flag = "  REGRESSION" if change > threshold else ""
+        if flag:
+            regressions.append(name)
+        unit = now[0].split("_")[-1]
+        print(f"{name:<55} {before[1]:>9.2f} {unit:<2} {now[1]:>9.2f} {unit:<2} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --------------------------------------------------------------------------- #
+# Entry point
+# --------------------------------------------------------------------------- #
+
+
+def _configure_app(args: argparse.Namespace, ollama_url: str) -> None:
+    """Point the app at the fake server; must run before `app` is imported."""
+    os.environ["OLLAMA_HOST"] = ollama_url
+    os.environ["OLLAMA_BACKEND"] = "http"
+    os.environ["OLLAMA_MANAGE_DAEMON"] = "false"
+    os.environ["LLM_CACHE_ENABLED"] = "true" if args.llm_cache else "false"
+    os.environ["LLM_CACHE_DB_PATH"] = ""
+    os.environ["LLM_MAX_QUEUE"] = str(max(args.concurrency, args.llm_concurrency) * 4)
+    os.environ["CHECKLIST_WARMUP_ENABLED"] = "false"
+    os.environ["OLLAMA_WARMUP_ENABLED"] = "false"
+    os.environ["CHECKLIST_TEMPLATE_DB_PATH"] = ""
+
+
+async def _run_async_groups(args: argparse.Namespace, results: Results) -> None:
+    from app.core.ai_client import close_http_client
+
+    try:
+        if "routes" in args.group:
+            print("routes:", flush=True)
+            results.update(await run_routes(args))
+        if "llm" in args.group:
+            print("llm:", flush=True)
+            results.update(await run_llm(args))
+    finally:
+        await close_http_client()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the backend benchmark suite.")
+    parser.add_argument("--group", choices=GROUPS, action="append", help="Repeatable; default all")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Also write results to --baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Regression threshold (0.15 = +15%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--repeat", type=int, default=7, help="timeit repeats for micro benchmarks")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per compute route")
+    parser.add_argument("--llm-requests", type=int, default=20, help="Requests per LLM route / call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake model prefill latency")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Fake model decode rate")
+    parser.add_argument("--output-tokens", type=int, default=64, help="Fake model tokens per answer")
+    parser.add_argument("--llm-cache", action="store_true", help="Leave the LLM response cache on")
+    args = parser.parse_args(argv)
+    args.group = args.group or list(GROUPS)
+
+    results: Results = {}
+    with FakeOllamaServer(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+    ) as server:
+        _configure_app(args, server.url)
+        if "micro" in args.group:
+            print("micro:", flush=True)
+            results.update(run_micro(args))
+        asyncio.run(_run_async_groups(args, results))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+    print(f"\nresults written to {args.output}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    regressions = compare_to_baseline(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
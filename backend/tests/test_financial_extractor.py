@@ -0,0 +1,52 @@
+from app.services.financial_extractor import extract_financial_info, parse_amounts
+
+THRESHOLD = 0.8  # ANALYZE_FAST_PATH_MIN_CONFIDENCE default
+
+
+def _labels(extraction, category):
+    return extraction.structured.get(category, [])
+
+
+def test_plain_statement_is_extracted_confidently():
+    extraction = extract_financial_info("I earn 12 lakh salary and invested 1.5L in PPF")
+    assert _labels(extraction, "income_sources") == ["Salary: ₹12,00,000"]
+    assert _labels(extraction, "deductions") == ["80C: PPF: ₹1,50,000"]
+    assert extraction.confidence >= THRESHOLD
+
+
+def test_negated_deductions_are_not_extracted():
+    extraction = extract_financial_info("I earn 18 LPA. No home loan, no insurance.")
+    assert _labels(extraction, "income_sources") == ["Salary: ₹18,00,000"]
+    assert "deductions" not in extraction.structured
+    assert "24(b): Home loan interest" in extraction.structured["notes"]
+
+
+def test_do_not_have_80c():
+    extraction = extract_financial_info("I do not have any 80C investments")
+    assert "deductions" not in extraction.structured
+    assert "Stated as not applicable: 80C" in extraction.structured["notes"]
+
+
+def test_contracted_negation():
+    extraction = extract_financial_info("I don't have a home loan; salary 10 lakh")
+    assert "deductions" not in extraction.structured
+    assert _labels(extraction, "income_sources") == ["Salary: ₹10,00,000"]
+
+
+def test_negated_clause_with_amount_escalates():
+    extraction = extract_financial_info("Not sure about home loan interest, maybe 2L")
+    assert "deductions" not in extraction.structured
+    assert extraction.confidence < THRESHOLD
+
+
+def test_malformed_amount_escalates():
+    extraction = extract_financial_info("salary 1,20,0000")
+    assert "income_sources" not in extraction.structured
+    assert extraction.confidence < THRESHOLD
+
+
+def test_well_grouped_amounts():
+    assert [amount for _, amount in parse_amounts("paid 1,20,000 and 1,200,000")] == [
+        120000.0,
+        1200000.0,
+    ]